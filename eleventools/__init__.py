@@ -0,0 +1,7 @@
+"""ElevenTools - motore di scansione per il rilevamento di executor Roblox.
+
+Il pacchetto contiene la parte di scansione indipendente dall'interfaccia grafica,
+in modo che possa essere usata anche senza display.
+"""
+
+__version__ = "0.1"
@@ -0,0 +1,7 @@
+"""Permette l'avvio con: python -m eleventools scan"""
+import sys
+
+from eleventools.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,569 @@
+"""Benchmark delle fasi di scansione su una macchina sintetica riproducibile.
+
+generate_machine() crea in una cartella una macchina finta, uguale a parità di
+dimensione e seme: un albero di file con artefatti di un executor di prova
+(cartelle, eseguibili e file con hash noto, più file della stessa dimensione da
+leggere per intero), una tabella dei processi nel formato di /proc letta con il
+backend procfs e un registro in formato JSON per MemoryRegistry. Non serve
+Windows: tutto gira anche su Linux.
+
+run_benchmark() esegue ogni fase e la scansione completa sulla macchina, ogni
+ripetizione in un processo nuovo così il picco di memoria (RSS) è quello della
+sola misura, e ne riporta la mediana: durata, latenza del primo rilevamento,
+voci esaminate al secondo, byte letti per l'hashing al secondo, picco di
+memoria e numero di rilevamenti. La fase dei file usa un indice del
+filesystem nuovo, come alla prima scansione, e il suo picco di memoria deve
+restare sotto FILES_RSS_CAP_KIB qualunque sia la dimensione. Il caso "startup"
+misura invece l'avvio a freddo della riga di comando: una scansione senza
+interfaccia dei processi, del registro e di una cartella vuota, in un
+interprete nuovo, che deve restare
+entro STARTUP_BUDGET secondi (interprete compreso), e il caso "signatures" il
+caricamento dalla cache compilata di un database di SIGNATURE_EXECUTORS
+executor generato a caso, che deve restare entro SIGNATURES_BUDGET secondi
+(import esclusi, già misurati da startup). compare() confronta i
+risultati con un riferimento JSON salvato in precedenza e restituisce le
+regressioni oltre la soglia.
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import itertools
+import logging
+import platform
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from eleventools import events
+
+# Numero di file della macchina sintetica per ogni dimensione
+SIZES = {"small": 2000, "medium": 20000, "large": 200000}
+DEFAULT_SIZES = ("small", "medium")
+STARTUP_CASE = "startup"
+SIGNATURES_CASE = "signatures"
+# Casi che non dipendono dalla dimensione della macchina
+GLOBAL_CASES = (STARTUP_CASE, SIGNATURES_CASE)
+CASES = ("files", "processes", "registry", "full") + GLOBAL_CASES
+DEFAULT_REPEAT = 3
+DEFAULT_SEED = 1
+# Peggioramento tollerato rispetto al riferimento (0.25: 25%)
+DEFAULT_THRESHOLD = 0.25
+
+DEFAULT_WORKDIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "bench")
+DEFAULT_BASELINE = os.path.join(DEFAULT_WORKDIR, "baseline.json")
+
+# Versione del generatore: va incrementata se cambia la macchina generata
+GENERATOR_VERSION = 2
+BASELINE_SCHEMA = 1
+
+# Executor di prova aggiunto alle firme reali
+BENCH_EXECUTOR = "ElevenBench"
+BENCH_EXE = "elevenbench.exe"
+# Dimensione dei file con l'hash dell'executor di prova e dei file esca della stessa dimensione
+BLOB_SIZE = 256 * 1024
+# Un file ogni DECOY_EVERY ha la dimensione di una firma hash e viene quindi letto
+DECOY_EVERY = 200
+FILES_PER_DIR = 25
+DIRS_PER_DIR = 8
+PLANTED = 5
+
+_WORDS = ("report", "setup", "data", "cache", "config", "readme", "image", "library", "backup", "notes",
+          "invoice", "photo", "music", "render", "shader", "texture", "update", "install", "driver", "archive")
+_EXTENSIONS = (".txt", ".dat", ".dll", ".exe", ".png", ".log", ".json", ".tmp")
+_PROCESS_NAMES = ("svchost.exe", "explorer.exe", "chrome.exe", "discord.exe", "steam.exe", "code.exe",
+                  "python.exe", "bash", "systemd", "sshd", "nginx", "postgres")
+
+# Metriche confrontate con il riferimento: nome e True se un valore più alto è peggiore
+COMPARED = (
+    ("elapsed", True),
+    ("entries_per_second", False),
+    ("bytes_hashed_per_second", False),
+    ("peak_rss_kib", True),
+)
+# Differenze sotto questi valori sono rumore di misura e non vengono considerate
+MIN_TIMED = 0.02
+MIN_RSS_DELTA_KIB = 4096
+# Picco di memoria massimo della fase dei file, uguale per ogni dimensione: la visita non deve crescere con i file
+FILES_RSS_CAP_KIB = 64 * 1024
+# Tempo massimo dell'avvio a freddo di una scansione senza interfaccia, interprete compreso
+STARTUP_BUDGET = 0.150
+# Executor del database di firme sintetico e tempo massimo del suo caricamento dalla cache compilata
+SIGNATURE_EXECUTORS = 10000
+SIGNATURES_BUDGET = 0.050
+
+# Voci esaminate da ogni fase, dai contatori della copertura
+_ENTRY_COUNTERS = {"files": "entries_seen", "processes": "processes_listed", "registry": "values_seen"}
+
+
+def _machine_dir(workdir, size, seed):
+    return os.path.join(os.path.abspath(workdir), f"{size}-{seed}")
+
+
+def _random_bytes(rng, size):
+    """size byte casuali da rng (Random.randbytes esiste solo da Python 3.9; getrandbits(0) fallisce fino alla 3.8)"""
+    return rng.getrandbits(8 * size).to_bytes(size, "little") if size else b""
+
+
+def _write_file(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _generate_files(root, files, rng, blob, planted):
+    """Albero di file con gli artefatti dell'executor di prova e i file esca da leggere per l'hashing"""
+    os.makedirs(root)
+    directories = [root]
+    written = 0
+    while written < files:
+        # Albero con DIRS_PER_DIR sottocartelle per cartella, riempito in ampiezza
+        parent = directories[(len(directories) - 1) // DIRS_PER_DIR]
+        path = os.path.join(parent, f"dir_{len(directories):05d}")
+        os.makedirs(path)
+        directories.append(path)
+        for _ in range(min(FILES_PER_DIR, files - written)):
+            written += 1
+            name = f"{rng.choice(_WORDS)}_{written:06d}{rng.choice(_EXTENSIONS)}"
+            if written % DECOY_EVERY == 0:
+                # Stessa dimensione della firma ma contenuto diverso: letto e scartato
+                data = _random_bytes(rng, BLOB_SIZE)
+            else:
+                data = _random_bytes(rng, rng.randrange(0, 4096))
+            _write_file(os.path.join(path, name), data)
+
+    # Artefatti dell'executor di prova in cartelle scelte a caso
+    for index in range(planted):
+        parent = rng.choice(directories)
+        folder = os.path.join(parent, BENCH_EXECUTOR)
+        os.makedirs(folder, exist_ok=True)
+        _write_file(os.path.join(folder, BENCH_EXE), b"MZ" + _random_bytes(rng, 1024))
+        _write_file(os.path.join(rng.choice(directories), f"payload_{index}.bin"), blob)
+
+
+def _generate_processes(root, processes, rng, planted):
+    """Tabella dei processi nel formato di /proc: stat ed exe di ogni PID"""
+    for pid in range(1, processes + 1):
+        name = BENCH_EXE if pid % (processes // planted) == 0 else rng.choice(_PROCESS_NAMES)
+        base = os.path.join(root, str(pid))
+        os.makedirs(base)
+        # Il kernel tronca il nome a 15 caratteri
+        with open(os.path.join(base, "stat"), "w", encoding="utf-8") as f:
+            f.write(f"{pid} ({name[:15]}) S {max(1, pid // 2)} {pid} {pid} 0 -1 4194560\n")
+        os.symlink(f"/opt/programs/{pid}/{name}", os.path.join(base, "exe"))
+
+
+def _generate_registry(path, values, rng, planted):
+    """Registro per MemoryRegistry con programmi installati, avvio automatico e tracce dell'executor di prova"""
+    cv = "SOFTWARE\\Microsoft\\Windows\\CurrentVersion"
+    data = {}
+    for index in range(values // 8):
+        hive = "HKLM" if index % 3 else "HKCU"
+        word = rng.choice(_WORDS)
+        data[f"{hive}\\{cv}\\Uninstall\\{{{index:08d}-{word}}}"] = {
+            "DisplayName": f"{word.title()} {index}",
+            "DisplayVersion": f"{rng.randrange(1, 20)}.{rng.randrange(0, 100)}",
+            "Publisher": f"{rng.choice(_WORDS).title()} Software",
+            "InstallLocation": f"C:\\Program Files\\{word.title()} {index}",
+            "UninstallString": f"C:\\Program Files\\{word.title()} {index}\\uninstall.exe",
+            "EstimatedSize": rng.randrange(100, 100000),
+            "NoModify": 1,
+            "NoRepair": 1,
+        }
+    run = {f"{rng.choice(_WORDS)}{index}": f"C:\\Program Files\\{rng.choice(_WORDS)}\\{index}.exe"
+           for index in range(values % 8 + 8)}
+    data[f"HKCU\\{cv}\\Run"] = run
+    data[f"HKCU\\SOFTWARE\\{BENCH_EXECUTOR}"] = {}
+    data[f"HKLM\\{cv}\\Run"] = {f"Bench{index}": f"C:\\Tools\\{BENCH_EXECUTOR}\\{BENCH_EXE}"
+                                for index in range(planted)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def generate_machine(workdir, size, seed=DEFAULT_SEED, logger=None):
+    """Crea (o riusa, se già generata) la macchina sintetica; restituisce la sua descrizione"""
+    logger = logger or logging.getLogger("ElevenTools")
+    path = _machine_dir(workdir, size, seed)
+    manifest_path = os.path.join(path, "manifest.json")
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("generator") == GENERATOR_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+
+    if os.path.exists(path):
+        # Generazione precedente interrotta o di un'altra versione
+        shutil.rmtree(path)
+    files = SIZES[size]
+    processes = max(100, files // 20)
+    values = max(200, files // 4)
+    logger.info(f"Generazione della macchina sintetica {size} ({files} file) in {path}")
+    start_time = time.time()
+    rng = random.Random(f"{seed}-{size}")
+    blob = _random_bytes(rng, BLOB_SIZE)
+    _generate_files(os.path.join(path, "fs"), files, rng, blob, PLANTED)
+    _generate_processes(os.path.join(path, "proc"), processes, rng, PLANTED)
+    _generate_registry(os.path.join(path, "registry.json"), values, rng, PLANTED)
+
+    manifest = {
+        "generator": GENERATOR_VERSION,
+        "size": size,
+        "seed": seed,
+        "path": path,
+        "files": files,
+        "processes": processes,
+        "registry_values": values,
+        "blob": {"md5": hashlib.md5(blob).hexdigest(), "size": BLOB_SIZE},
+        # Rilevamenti minimi attesi per ogni fase: cartelle ed eseguibili, file con l'hash, processi, chiave e valori
+        "planted": {"files": PLANTED * 2, "processes": PLANTED, "registry": 1 + PLANTED},
+    }
+    # Il manifest viene scritto per ultimo: la sua presenza indica una generazione completa
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info(f"Macchina sintetica {size} generata in {time.time() - start_time:.1f} secondi")
+    return manifest
+
+
+def bench_signatures(manifest, signatures_path=None):
+    """Firme reali più l'executor di prova con l'hash dei file piantati"""
+    from eleventools.signatures import CompiledSignatures, read_database, DEFAULT_DATABASE
+
+    version, executors = read_database(signatures_path or DEFAULT_DATABASE)
+    executors = dict(executors)
+    executors[BENCH_EXECUTOR] = {
+        "files": [BENCH_EXE],
+        "folders": [BENCH_EXECUTOR],
+        "processes": [BENCH_EXE],
+        "registry": [f"SOFTWARE\\{BENCH_EXECUTOR}"],
+        "hashes": [manifest["blob"]],
+    }
+    return CompiledSignatures.compile(version, executors)
+
+
+def _peak_rss_kib():
+    """Picco di memoria del processo in KiB, oppure None se la piattaforma non lo fornisce"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS riporta byte, Linux KiB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _run_case(manifest, case, signatures_path):
+    """Esegue una misura in un processo dedicato e ne restituisce le metriche"""
+    import tempfile
+    from eleventools.engine import ScanEngine
+    from eleventools.processes import ProcfsBackend
+    from eleventools.registry import MemoryRegistry
+
+    logger = logging.getLogger("ElevenTools")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    signatures = bench_signatures(manifest, signatures_path)
+    path = manifest["path"]
+    # Solo le sorgenti usate dal caso, così il picco di memoria è quello delle fasi misurate
+    processes = ProcfsBackend(os.path.join(path, "proc")) if case in ("processes", "full") else None
+    registry = MemoryRegistry.from_json(os.path.join(path, "registry.json")) if case in ("registry", "full") else None
+    # Indice del filesystem nuovo a ogni misura: la prima visita, che scrive tutte le cartelle, è il caso peggiore
+    index_dir = tempfile.mkdtemp(prefix="fsindex-", dir=manifest["path"])
+    engine = ScanEngine(signatures, scan_roots=[os.path.join(path, "fs")], hash_cache_path=None,
+                        max_scan_time=None, process_backend=processes, registry=registry, logger=logger,
+                        fs_index_path=os.path.join(index_dir, "fsindex.sqlite"),
+                        phases=None if case == "full" else (case,))
+    first = []
+    detections = itertools.count()
+    start_time = time.perf_counter()
+
+    def emit(event):
+        if isinstance(event, events.Detection):
+            # Solo il conteggio: come nella riga di comando, i rilevamenti non vengono conservati
+            if next(detections) == 0:
+                first.append(time.perf_counter() - start_time)
+
+    try:
+        finished = engine.run(emit)
+    finally:
+        shutil.rmtree(index_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - start_time
+    coverage = finished.coverage
+    entries = sum(coverage[phase].get(counter, 0) for phase, counter in _ENTRY_COUNTERS.items())
+    bytes_hashed = coverage["files"].get("bytes_hashed", 0)
+    return {
+        "elapsed": elapsed,
+        "first_detection": first[0] if first else None,
+        "entries": entries,
+        "entries_per_second": entries / elapsed if elapsed else 0.0,
+        "bytes_hashed": bytes_hashed,
+        "bytes_hashed_per_second": bytes_hashed / elapsed if elapsed else 0.0,
+        "peak_rss_kib": _peak_rss_kib(),
+        "detections": next(detections),
+        "complete": all(phase_cov["status"] == events.COVERAGE_COMPLETE
+                        for phase, phase_cov in coverage.items() if case in ("full", phase)),
+    }
+
+
+def _median(samples, key):
+    values = [sample[key] for sample in samples if sample[key] is not None]
+    return statistics.median_low(values) if values else None
+
+
+def measure(manifest, case, repeat=DEFAULT_REPEAT, signatures_path=None):
+    """Mediana di repeat misure di un caso, ciascuna in un processo nuovo"""
+    context = multiprocessing.get_context("spawn")
+    samples = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            samples.append(pool.submit(_run_case, manifest, case, signatures_path).result())
+    result = {key: _median(samples, key) for key in samples[0] if key != "complete"}
+    result["detections"] = samples[0]["detections"]
+    result["stable"] = len({sample["detections"] for sample in samples}) == 1
+    result["complete"] = all(sample["complete"] for sample in samples)
+    return result
+
+
+def _run_cli(arguments, cwd):
+    import subprocess
+
+    command = [sys.executable] + arguments
+    start_time = time.perf_counter()
+    returncode = subprocess.run(command, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL).returncode
+    elapsed = time.perf_counter() - start_time
+    # 1: la scansione ha trovato qualcosa tra i processi della macchina, non è un errore
+    if returncode not in (0, 1):
+        raise subprocess.CalledProcessError(returncode, command)
+    return elapsed
+
+
+def measure_startup(workdir, repeat=DEFAULT_REPEAT, signatures_path=None):
+    """Mediana dell'avvio a freddo di "python -m eleventools scan" con una sola radice vuota.
+
+    È una scansione normale, con i processi, il registro, la cache degli hash
+    e l'indice del filesystem (questi ultimi nella cartella di lavoro). La prima
+    esecuzione scalda la cache dei file .pyc e delle firme compilate e non
+    viene contata; "interpreter" è il tempo del solo interprete, per
+    distinguere il costo degli import del pacchetto da quello della macchina.
+    """
+    empty = os.path.join(workdir, "empty")
+    os.makedirs(empty, exist_ok=True)
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    arguments = ["-m", "eleventools", "scan", "--only-roots", "--root", empty,
+                 "--hash-cache", os.path.join(workdir, "startup-hashes.sqlite"),
+                 "--fs-index", os.path.join(workdir, "startup-fsindex.sqlite")]
+    if signatures_path:
+        arguments += ["--signatures", signatures_path]
+    _run_cli(arguments, cwd)
+    samples = [_run_cli(arguments, cwd) for _ in range(repeat)]
+    interpreter = [_run_cli(["-c", "pass"], cwd) for _ in range(repeat)]
+    return {
+        "elapsed": statistics.median_low(samples),
+        "interpreter": statistics.median_low(interpreter),
+        "budget": STARTUP_BUDGET,
+        "detections": None,
+        "stable": True,
+        "complete": True,
+    }
+
+
+def generate_signature_database(workdir, seed=DEFAULT_SEED, executors=SIGNATURE_EXECUTORS):
+    """Scrive (o riusa) un database di firme con la composizione di quello reale ma executors voci"""
+    path = os.path.join(os.path.abspath(workdir), f"signatures-{executors}-{seed}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            if json.load(f).get("version") == GENERATOR_VERSION:
+                return path
+    except (OSError, ValueError):
+        pass
+
+    rng = random.Random(f"{seed}-signatures")
+    database = {}
+    for index in range(executors):
+        word = rng.choice(_WORDS).title()
+        name = f"{word} {rng.choice(_WORDS).title()} {index}" if index % 2 else f"{word}{index}"
+        base = f"{word}{index}"
+        extras = rng.sample(("UI", "Injector", "Bootstrap"), rng.randrange(0, 3))
+        exe_names = [f"{base}.exe"] + [f"{base}{extra}.exe" for extra in extras]
+        entry = {
+            "files": exe_names + ([f"bin/{base}.dll"] if rng.random() < 0.3 else []),
+            "folders": [name] + ([base] if name != base and rng.random() < 0.5 else []),
+            "processes": exe_names[:rng.randrange(1, len(exe_names) + 1)],
+        }
+        if rng.random() < 0.2:
+            entry["patterns"] = [f"{base}.*\\.exe"]
+        if rng.random() < 0.2:
+            entry["registry"] = [f"SOFTWARE\\{base}"]
+        if rng.random() < 0.3:
+            entry["hashes"] = [{"md5": f"{rng.getrandbits(128):032x}", "size": rng.randrange(1 << 16, 1 << 24)}]
+        database[name] = entry
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"schema": 1, "version": GENERATOR_VERSION, "executors": database}, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _load_signatures_case(path, cache_path):
+    from eleventools.cli import load_startup_signatures
+
+    start_time = time.perf_counter()
+    signatures = load_startup_signatures(path, cache_path)
+    return {"elapsed": time.perf_counter() - start_time, "executors": signatures.executor_count,
+            "peak_rss_kib": _peak_rss_kib()}
+
+
+def measure_signatures(workdir, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED):
+    """Mediana del caricamento dalla cache compilata del database sintetico, ogni volta in un processo nuovo.
+
+    Le firme vengono caricate come all'avvio del comando scan (eleventools.cli.load_startup_signatures).
+
+    La prima esecuzione compila il database e scrive la cache, e non viene contata.
+    """
+    path = generate_signature_database(workdir, seed)
+    cache_path = f"{path[:-len('.json')]}.bin"
+    context = multiprocessing.get_context("spawn")
+    samples = []
+    for _ in range(repeat + 1):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            samples.append(pool.submit(_load_signatures_case, path, cache_path).result())
+    samples = samples[1:]
+    return {
+        "elapsed": _median(samples, "elapsed"),
+        "peak_rss_kib": _median(samples, "peak_rss_kib"),
+        "executors": samples[0]["executors"],
+        "budget": SIGNATURES_BUDGET,
+        "detections": None,
+        "stable": True,
+        "complete": True,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Regressioni di una misura rispetto al riferimento, come testi"""
+    regressions = []
+    if current.get("detections") != baseline.get("detections"):
+        regressions.append(f"rilevamenti: {current['detections']} invece di {baseline['detections']}")
+    timed = max(current["elapsed"], baseline["elapsed"]) >= MIN_TIMED
+    for metric, higher_is_worse in COMPARED:
+        now, before = current.get(metric), baseline.get(metric)
+        if not now or not before:
+            continue
+        if metric == "peak_rss_kib":
+            if abs(now - before) < MIN_RSS_DELTA_KIB:
+                continue
+        elif not timed:
+            continue
+        ratio = now / before if higher_is_worse else before / now
+        if ratio > 1 + threshold:
+            regressions.append(f"{metric}: {now:.4g} invece di {before:.4g} ({(ratio - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def check(result, manifest, case):
+    """Problemi di correttezza di una misura: artefatti non trovati, fasi incomplete, risultati instabili"""
+    problems = []
+    if case == STARTUP_CASE:
+        if result["elapsed"] > STARTUP_BUDGET:
+            problems.append(f"avvio a freddo: {result['elapsed']:.3f} s, massimo {STARTUP_BUDGET:.3f} s")
+        return problems
+    if case == SIGNATURES_CASE:
+        if result["elapsed"] > SIGNATURES_BUDGET:
+            problems.append(f"caricamento delle firme: {result['elapsed']:.3f} s, massimo {SIGNATURES_BUDGET:.3f} s")
+        return problems
+    planted = sum(count for phase, count in manifest["planted"].items() if case in ("full", phase))
+    if result["detections"] < planted:
+        problems.append(f"rilevamenti: {result['detections']}, attesi almeno {planted}")
+    if not result["complete"]:
+        problems.append("scansione non completata")
+    if case == "files" and result["peak_rss_kib"] and result["peak_rss_kib"] > FILES_RSS_CAP_KIB:
+        problems.append(f"picco di memoria: {result['peak_rss_kib']} KiB, massimo {FILES_RSS_CAP_KIB} KiB")
+    if not result["stable"]:
+        problems.append("numero di rilevamenti diverso tra le ripetizioni")
+    return problems
+
+
+def read_baseline(path):
+    """Riferimento salvato, oppure None se non esiste"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        return None
+    if baseline.get("schema") != BASELINE_SCHEMA:
+        raise ValueError(f"{path}: formato del riferimento non supportato")
+    return baseline
+
+
+def write_baseline(path, results, seed):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    baseline = {
+        "schema": BASELINE_SCHEMA,
+        "generator": GENERATOR_VERSION,
+        "seed": seed,
+        "created": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, cases=CASES, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED,
+                  workdir=DEFAULT_WORKDIR, baseline=None, threshold=DEFAULT_THRESHOLD, signatures_path=None,
+                  emit=None, logger=None):
+    """Misura ogni caso su ogni dimensione; emit riceve (dimensione, caso, metriche, problemi) appena pronto.
+
+    I casi startup e signatures non dipendono dalla dimensione: vengono misurati
+    una volta sola e riportati con la dimensione None (nei risultati sotto la
+    chiave del caso).
+    Restituisce {dimensione: {caso: metriche}} e il numero di casi con problemi o regressioni.
+    """
+    logger = logger or logging.getLogger("ElevenTools")
+    emit = emit or (lambda size, case, result, problems: None)
+    if baseline is not None and (baseline.get("generator") != GENERATOR_VERSION or baseline.get("seed") != seed):
+        logger.warning("Il riferimento è stato misurato su un'altra macchina sintetica: confronto ignorato")
+        baseline = None
+    results = {}
+    failures = 0
+    for case in GLOBAL_CASES:
+        if case not in cases:
+            continue
+        logger.info(f"Benchmark {case}: {repeat} ripetizioni")
+        if case == STARTUP_CASE:
+            result = measure_startup(workdir, repeat, signatures_path)
+        else:
+            result = measure_signatures(workdir, repeat, seed)
+        problems = check(result, None, case)
+        previous = (baseline or {}).get("results", {}).get(case)
+        if previous is not None:
+            problems.extend(compare(result, previous, threshold))
+        if problems:
+            failures += 1
+        results[case] = result
+        emit(None, case, result, problems)
+    for size in sizes:
+        manifest = generate_machine(workdir, size, seed, logger)
+        for case in cases:
+            if case in GLOBAL_CASES:
+                continue
+            logger.info(f"Benchmark {size}/{case}: {repeat} ripetizioni")
+            result = measure(manifest, case, repeat, signatures_path)
+            problems = check(result, manifest, case)
+            previous = (baseline or {}).get("results", {}).get(size, {}).get(case)
+            if previous is not None:
+                problems.extend(compare(result, previous, threshold))
+            if problems:
+                failures += 1
+            results.setdefault(size, {})[case] = result
+            emit(size, case, result, problems)
+    return results, failures
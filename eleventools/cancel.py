@@ -0,0 +1,91 @@
+"""Scadenze e annullamento cooperativi della scansione.
+
+Un CancelToken viene passato a ogni fase e a ogni worker, che lo controllano
+nei cicli interni con check() (solleva ScanCancelled) o con la proprietà
+cancelled. Un token può avere una scadenza propria ed essere figlio di un
+altro: il budget di una fase è un figlio del token della scansione, quindi
+scade al termine del budget della fase, alla scadenza globale o quando
+l'utente annulla, a seconda di cosa avviene prima.
+"""
+import time
+import threading
+
+# Motivi dell'interruzione
+TIMEOUT = "timeout"
+CANCELLED = "cancelled"
+
+# Intervallo massimo di attesa passiva tra due controlli del token, in secondi
+POLL_INTERVAL = 0.05
+
+
+class ScanCancelled(Exception):
+    """La scansione (o la fase) è stata interrotta per scadenza o su richiesta"""
+
+    def __init__(self, reason=CANCELLED):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancelToken:
+    """Token di annullamento con scadenza opzionale, condivisibile tra thread"""
+
+    __slots__ = ("_event", "_deadline", "_parent", "_reason")
+
+    def __init__(self, timeout=None, parent=None):
+        self._event = threading.Event()
+        self._deadline = time.monotonic() + timeout if timeout is not None else None
+        self._parent = parent
+        self._reason = None
+
+    def child(self, timeout=None):
+        """Token figlio: scade dopo timeout secondi o quando scade o viene annullato questo token"""
+        return CancelToken(timeout, parent=self)
+
+    def cancel(self, reason=CANCELLED):
+        if not self._event.is_set():
+            self._reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self):
+        if self._event.is_set():
+            return True
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            self.cancel(TIMEOUT)
+            return True
+        if self._parent is not None and self._parent.cancelled:
+            self.cancel(self._parent.reason)
+            return True
+        return False
+
+    @property
+    def reason(self):
+        """TIMEOUT o CANCELLED se il token è scaduto o annullato, altrimenti None"""
+        return self._reason if self.cancelled else None
+
+    def remaining(self):
+        """Secondi alla scadenza più vicina tra questo token e i suoi antenati, None se nessuna"""
+        remaining = None
+        token = self
+        now = time.monotonic()
+        while token is not None:
+            if token._deadline is not None:
+                left = max(0.0, token._deadline - now)
+                remaining = left if remaining is None else min(remaining, left)
+            token = token._parent
+        return remaining
+
+    def check(self):
+        """Solleva ScanCancelled se il token è scaduto o annullato"""
+        if self.cancelled:
+            raise ScanCancelled(self._reason)
+
+    def wait(self, timeout):
+        """Attende fino a timeout secondi, svegliandosi entro POLL_INTERVAL dall'annullamento; True se annullato"""
+        end = time.monotonic() + timeout
+        while not self.cancelled:
+            left = end - time.monotonic()
+            if left <= 0:
+                return False
+            self._event.wait(min(left, POLL_INTERVAL))
+        return True
@@ -0,0 +1,619 @@
+"""Interfaccia a riga di comando di ElevenTools, senza dipendenze grafiche.
+
+Esempi:
+    python -m eleventools scan --root D:\\Giochi --format ndjson
+    python -m eleventools scan --image /mnt/immagine --reg-file utente.reg
+    python -m eleventools watch --interval 0.5
+    python -m eleventools watch --update-dir C:\\ElevenTools\\aggiornamenti
+    python -m eleventools fleet /mnt/img1 /mnt/img2 --workers 8 --format json
+    python -m eleventools bench --size small --size medium --save-baseline
+
+Codici di uscita:
+    0  nessuna minaccia rilevata
+    1  almeno un elemento sospetto rilevato
+    2  errore durante la scansione
+    3  scansione interrotta per timeout senza rilevamenti
+    4  scansione annullata (Ctrl+C) senza rilevamenti
+    5  benchmark: regressione rispetto al riferimento, artefatti non rilevati o avvio troppo lento
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+
+EXIT_CLEAN = 0
+EXIT_DETECTED = 1
+EXIT_ERROR = 2
+EXIT_TIMEOUT = 3
+EXIT_CANCELLED = 4
+EXIT_REGRESSION = 5
+
+
+def add_signature_arguments(parser):
+    parser.add_argument("--signatures", default=None, metavar="FILE",
+                        help="database delle firme in formato JSON (predefinito: eleventools/data/executors.json)")
+    parser.add_argument("--no-signature-cache", action="store_true",
+                        help="ricompila sempre le firme senza usare la cache compilata")
+
+
+def add_log_arguments(parser):
+    parser.add_argument("-v", "--verbose", action="count", default=0,
+                        help="mostra il log su stderr (-v informazioni, -vv debug)")
+    parser.add_argument("--log-dir", default=None, metavar="CARTELLA",
+                        help="scrive anche un log completo, con rotazione, in CARTELLA/eleventools.log")
+    parser.add_argument("--log-detections", type=int, default=None, metavar="N",
+                        help="rilevamenti scritti uno per uno nel log per scansione o giro di sorveglianza "
+                             "(predefinito: tutti, oppure variabile ELEVENTOOLS_DETECTION_LOG)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="eleventools", description="Rilevatore Avanzato di Executor")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    scan = subparsers.add_parser("scan", help="Esegue una scansione completa senza interfaccia grafica")
+    scan.add_argument("--root", action="append", default=[], metavar="PERCORSO",
+                      help="radice aggiuntiva da scansionare (ripetibile)")
+    scan.add_argument("--only-roots", action="store_true",
+                      help="scansiona solo le radici indicate con --root")
+    scan.add_argument("--format", choices=("ndjson", "json"), default="ndjson",
+                      help="ndjson: un rilevamento per riga man mano che arrivano; json: un unico documento finale")
+    scan.add_argument("--max-time", type=float, default=None, metavar="SECONDI",
+                      help="timeout globale della scansione")
+    scan.add_argument("--hash-cache", default=None, metavar="FILE",
+                      help="percorso della cache degli hash (predefinito: cache/hashes.sqlite)")
+    scan.add_argument("--no-hash-cache", action="store_true", help="non usare la cache degli hash")
+    scan.add_argument("--fs-index", default=None, metavar="FILE",
+                      help="indice del filesystem per le scansioni incrementali (predefinito: cache/fsindex.sqlite)")
+    scan.add_argument("--no-fs-index", action="store_true",
+                      help="rilegge tutte le cartelle senza usare né aggiornare l'indice del filesystem")
+    scan.add_argument("--process-backend", choices=("psutil", "procfs", "wmic"), default=None,
+                      help="backend di enumerazione dei processi (predefinito: il primo disponibile)")
+    scan.add_argument("--sequential", action="store_true",
+                      help="esegue le fasi una dopo l'altra invece che in parallelo")
+    scan.add_argument("--phase", action="append", choices=("files", "processes", "registry"), default=None,
+                      help="fase da eseguire (ripetibile; predefinito: tutte, file e registro nella scansione offline)")
+    scan.add_argument("--registry-json", default=None, metavar="FILE",
+                      help="usa un registro in memoria caricato da JSON invece di quello di sistema")
+    scan.add_argument("--image", default=None, metavar="PERCORSO",
+                      help="scansione offline della radice di un'immagine montata di Windows, con i suoi hive")
+    scan.add_argument("--reg-file", action="append", default=[], metavar="FILE",
+                      help="scansione offline di un registro esportato in formato .reg (ripetibile)")
+    scan.add_argument("--hive", action="append", default=[], metavar="CHIAVE=FILE",
+                      help="monta un file hive nella chiave indicata, ad esempio HKU\\mario=NTUSER.DAT (ripetibile)")
+    scan.add_argument("--metrics-file", default=None, metavar="FILE",
+                      help="scrive le metriche della scansione in formato Prometheus (predefinito: variabile "
+                           "ELEVENTOOLS_METRICS_FILE)")
+    scan.add_argument("--profile", default=None, metavar="FILE",
+                      help="profila la scansione con cProfile e salva le statistiche (leggibili con pstats)")
+    scan.add_argument("--trace-memory", action="store_true",
+                      help="traccia le allocazioni con tracemalloc e riporta le principali nel riepilogo")
+    add_signature_arguments(scan)
+    add_log_arguments(scan)
+
+    watch = subparsers.add_parser("watch", help="Sorveglia di continuo i processi appena avviati")
+    watch.add_argument("--interval", type=float, default=None, metavar="SECONDI",
+                       help="intervallo tra due letture della tabella dei processi (predefinito: 0.5)")
+    watch.add_argument("--duration", type=float, default=None, metavar="SECONDI",
+                       help="termina dopo il tempo indicato (predefinito: fino a Ctrl+C)")
+    watch.add_argument("--process-backend", choices=("psutil", "procfs", "wmic"), default=None,
+                       help="backend di enumerazione dei processi (predefinito: il primo disponibile)")
+    add_signature_arguments(watch)
+    watch.add_argument("--update-dir", default=None, metavar="CARTELLA",
+                       help="cartella di aggiornamenti: viene usato il database *.json con la versione più alta")
+    watch.add_argument("--reload-interval", type=float, default=None, metavar="SECONDI",
+                       help="intervallo tra due controlli dei file delle firme (predefinito: 5)")
+    add_log_arguments(watch)
+
+    fleet = subparsers.add_parser("fleet", help="Scansiona più destinazioni (immagini montate, condivisioni, "
+                                                "copie esportate) su un pool di processi")
+    fleet.add_argument("targets", nargs="*", metavar="DESTINAZIONE", help="cartella da scansionare come radice")
+    fleet.add_argument("--targets-file", default=None, metavar="FILE",
+                       help="file con una destinazione per riga (le righe vuote o che iniziano con # sono ignorate)")
+    fleet.add_argument("--workers", type=int, default=None, metavar="N",
+                       help="destinazioni scansionate in parallelo (predefinito: numero di core)")
+    fleet.add_argument("--max-time", type=float, default=None, metavar="SECONDI",
+                       help="timeout della scansione di ogni destinazione (predefinito: nessuno)")
+    fleet.add_argument("--format", choices=("ndjson", "json"), default="ndjson",
+                       help="ndjson: i risultati di ogni destinazione appena pronti; json: un unico documento finale")
+    add_signature_arguments(fleet)
+    fleet.add_argument("-v", "--verbose", action="count", default=0,
+                       help="mostra il log su stderr (-v informazioni, -vv debug)")
+
+    bench = subparsers.add_parser("bench", help="Misura le fasi di scansione su una macchina sintetica e le "
+                                                "confronta con un riferimento")
+    bench.add_argument("--size", action="append", default=[], choices=("small", "medium", "large"),
+                       help="dimensione della macchina sintetica (ripetibile; predefinito: small e medium)")
+    bench.add_argument("--case", action="append", default=[],
+                       choices=("files", "processes", "registry", "full", "startup", "signatures"),
+                       help="fase da misurare, full per la scansione completa, startup per l'avvio a freddo o "
+                            "signatures per il caricamento di un grande database di firme "
+                            "(ripetibile; predefinito: tutte)")
+    bench.add_argument("--repeat", type=int, default=None, metavar="N",
+                       help="ripetizioni di ogni misura, di cui viene riportata la mediana (predefinito: 3)")
+    bench.add_argument("--seed", type=int, default=None, metavar="N",
+                       help="seme della macchina sintetica (predefinito: 1)")
+    bench.add_argument("--workdir", default=None, metavar="CARTELLA",
+                       help="cartella delle macchine sintetiche generate (predefinito: cache/bench)")
+    bench.add_argument("--baseline", default=None, metavar="FILE",
+                       help="riferimento con cui confrontare i risultati (predefinito: cache/bench/baseline.json)")
+    bench.add_argument("--save-baseline", action="store_true",
+                       help="salva i risultati come nuovo riferimento invece di confrontarli")
+    bench.add_argument("--threshold", type=float, default=None, metavar="FRAZIONE",
+                       help="peggioramento tollerato rispetto al riferimento (predefinito: 0.25, cioè 25%%)")
+    add_signature_arguments(bench)
+    bench.add_argument("-v", "--verbose", action="count", default=0,
+                       help="mostra il log su stderr (-v informazioni, -vv debug)")
+    return parser
+
+
+def setup_logging(verbosity, log_dir=None):
+    """Invia il log su stderr, lasciando stdout ai soli risultati; con log_dir anche su file, attraverso una coda"""
+    logger = logging.getLogger("ElevenTools")
+    level = {0: logging.ERROR, 1: logging.INFO}.get(verbosity, logging.DEBUG)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger.propagate = False
+    if not log_dir:
+        logger.addHandler(handler)
+        logger.setLevel(level)
+        return logger
+    from eleventools.logs import file_handler, prune_logs, start_logging
+
+    handler.setLevel(level)
+    removed = prune_logs(log_dir)
+    start_logging(logger, [handler, file_handler(log_dir)])
+    logger.setLevel(logging.DEBUG)
+    if removed:
+        logger.info(f"Cancellati {removed} log più vecchi del periodo di conservazione")
+    return logger
+
+
+def write_line(record, stream):
+    stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+    stream.flush()
+
+
+def detection_record(detection):
+    """Riga JSON di un rilevamento: campi strutturati più il testo leggibile"""
+    from eleventools.formatting import detection_text
+
+    record = {"event": "detection", "phase": detection.phase, "text": detection_text(detection)}
+    record.update(detection.as_dict())
+    return record
+
+
+def exit_code(finished):
+    if finished.error is not None:
+        return EXIT_ERROR
+    if finished.detections:
+        return EXIT_DETECTED
+    if finished.cancelled:
+        return EXIT_CANCELLED
+    if finished.timed_out:
+        return EXIT_TIMEOUT
+    return EXIT_CLEAN
+
+
+def _signature_paths(args):
+    from eleventools.signatures import DEFAULT_DATABASE, DEFAULT_COMPILED_CACHE
+
+    path = args.signatures or DEFAULT_DATABASE
+    if args.no_signature_cache:
+        cache_path = None
+    elif args.signatures:
+        # La cache predefinita appartiene al database predefinito: ne usa una accanto al file indicato
+        cache_path = args.signatures + ".bin"
+    else:
+        cache_path = DEFAULT_COMPILED_CACHE
+    return path, cache_path
+
+
+def detection_log_limit(args):
+    from eleventools.logs import default_detection_log_limit
+
+    return args.log_detections if args.log_detections is not None else default_detection_log_limit()
+
+
+def load_startup_signatures(path, cache_path):
+    """Carica le firme che il processo userà fino all'uscita e le esclude dal garbage collector.
+
+    Il caricamento crea centinaia di migliaia di oggetti: con il garbage collector
+    spento fino alla fine e gc.freeze, né il caricamento né le raccolte della
+    scansione li riesaminano. gc.freeze sposta nella generazione permanente tutto
+    ciò che è vivo in quel momento, quindi va chiamato una volta sola all'avvio e
+    mai dalla libreria, che ricarica le firme nei processi di lunga durata.
+    """
+    import gc
+    from eleventools.signatures import load_signatures
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        signatures = load_signatures(path, cache_path=cache_path)
+        gc.freeze()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return signatures
+
+
+def load_cli_signatures(args, startup=False):
+    """Carica le firme indicate da --signatures, oppure il database predefinito.
+
+    Con startup le firme sono quelle usate dal comando fino all'uscita (vedi load_startup_signatures).
+    """
+    from eleventools.signatures import load_signatures, SignatureDatabaseError
+
+    path, cache_path = _signature_paths(args)
+    try:
+        if startup:
+            return load_startup_signatures(path, cache_path)
+        return load_signatures(path, cache_path=cache_path)
+    except OSError as e:
+        raise SignatureDatabaseError(str(e))
+
+
+def open_cli_signature_store(args, logger):
+    """Crea un SignatureStore che ricarica le firme in background mentre il comando è in esecuzione"""
+    from eleventools.signatures import SignatureStore, SignatureDatabaseError, DEFAULT_RELOAD_INTERVAL
+
+    path, cache_path = _signature_paths(args)
+    try:
+        store = SignatureStore(path, update_dir=args.update_dir, cache_path=cache_path,
+                               interval=args.reload_interval or DEFAULT_RELOAD_INTERVAL, logger=logger)
+    except OSError as e:
+        raise SignatureDatabaseError(str(e))
+    return store.start()
+
+
+def open_offline_registry(args, matcher, logger):
+    """Registro offline composto dagli hive dell'immagine, dai file .reg e dagli hive indicati"""
+    from eleventools.offline import OfflineRegistry
+    from eleventools.registry_scan import offline_key_filter
+
+    registry = OfflineRegistry.from_image(args.image, logger) if args.image else OfflineRegistry(logger)
+    try:
+        for spec in args.hive:
+            key, separator, path = spec.partition("=")
+            if not separator or not path:
+                raise OSError(f"--hive richiede CHIAVE=FILE: {spec}")
+            hive, prefix = OfflineRegistry.map_key(key)
+            registry.mount_hive(hive, path, prefix)
+        wanted = offline_key_filter(matcher)
+        for path in args.reg_file:
+            registry.add_reg_file(path, wanted)
+    except OSError:
+        registry.close()
+        raise
+    return registry
+
+
+def missing_offline_source(args):
+    """Messaggio d'errore se l'immagine non è una cartella o un hive o un file .reg non esiste, altrimenti None"""
+    if args.image and not os.path.isdir(args.image):
+        return f"immagine non trovata o non è una cartella: {args.image}"
+    for spec in args.hive:
+        path = spec.partition("=")[2]
+        if path and not os.path.isfile(path):
+            return f"hive non trovato: {path}"
+    for path in args.reg_file:
+        if not os.path.isfile(path):
+            return f"file .reg non trovato: {path}"
+    return None
+
+
+def run_scan(args, stream=None):
+    """Esegue la scansione e scrive i risultati su stream; restituisce il codice di uscita"""
+    from eleventools import events
+    from eleventools.engine import ScanEngine, ScanWorker, DEFAULT_HASH_CACHE, DEFAULT_FS_INDEX, MAX_SCAN_TIME
+    from eleventools.filesystem import default_scan_roots, normalize_roots
+    from eleventools.metrics import default_metrics_path
+    from eleventools.processes import get_process_backend
+    from eleventools.registry import MemoryRegistry
+
+    missing = missing_offline_source(args)
+    if missing:
+        sys.stderr.write(f"ERRORE: {missing}\n")
+        return EXIT_ERROR
+    stream = stream or sys.stdout
+    logger = setup_logging(args.verbose, args.log_dir)
+    signatures = load_cli_signatures(args, startup=True)
+
+    offline = bool(args.image or args.reg_file or args.hive)
+    phases = None
+    if offline:
+        # Solo la copia indicata: i processi e le cartelle sarebbero quelli della macchina che analizza
+        roots = normalize_roots(([args.image] if args.image else []) + args.root)
+        phases = ("files", "registry") if roots else ("registry",)
+        try:
+            registry = open_offline_registry(args, signatures.matcher, logger)
+        except OSError as e:
+            sys.stderr.write(f"ERRORE: impossibile leggere il registro offline: {str(e)}\n")
+            return EXIT_ERROR
+    else:
+        roots = normalize_roots(args.root) if args.only_roots else default_scan_roots(args.root)
+        try:
+            registry = MemoryRegistry.from_json(args.registry_json) if args.registry_json else None
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"ERRORE: impossibile leggere il registro JSON: {str(e)}\n")
+            return EXIT_ERROR
+    if args.phase:
+        # Le fasi richieste, tra quelle possibili per la sorgente indicata
+        phases = tuple(phase for phase in args.phase if phases is None or phase in phases)
+    if args.no_hash_cache:
+        hash_cache = None
+    else:
+        hash_cache = args.hash_cache or DEFAULT_HASH_CACHE
+    if args.no_fs_index or (offline and not args.fs_index):
+        fs_index = None
+    else:
+        fs_index = args.fs_index or DEFAULT_FS_INDEX
+    engine = ScanEngine(
+        signatures=signatures,
+        scan_roots=roots,
+        hash_cache_path=hash_cache,
+        max_scan_time=args.max_time if args.max_time is not None else MAX_SCAN_TIME,
+        process_backend=get_process_backend(args.process_backend) if args.process_backend else None,
+        registry=registry,
+        logger=logger,
+        fs_index_path=fs_index,
+        concurrent=not args.sequential,
+        phases=phases,
+        metrics_path=args.metrics_file or default_metrics_path(),
+        profile_path=args.profile,
+        trace_memory=args.trace_memory,
+        detection_log_limit=detection_log_limit(args),
+    )
+
+    detections = []
+    errors = []
+
+    def emit(event):
+        if isinstance(event, events.Detection):
+            record = detection_record(event)
+            # In ndjson i rilevamenti vengono scritti subito e non serve tenerli
+            if args.format == "ndjson":
+                write_line(record, stream)
+            else:
+                detections.append(record)
+        elif isinstance(event, events.ScanError):
+            errors.append({"phase": event.phase, "message": event.message})
+            sys.stderr.write(f"ERRORE: {event.message}\n")
+
+    # Il motore gira in un thread: il thread principale resta libero di ricevere Ctrl+C e annullare
+    worker = ScanWorker(engine)
+    worker.start()
+    finished = None
+    while finished is None:
+        try:
+            event = worker.events.get()
+        except KeyboardInterrupt:
+            worker.cancel.cancel()
+            continue
+        if isinstance(event, events.ScanFinished):
+            finished = event
+        else:
+            emit(event)
+    if offline:
+        registry.close()
+    summary = {
+        "event": "summary",
+        "detections": finished.detections,
+        "elapsed": round(finished.elapsed, 3),
+        "timed_out": finished.timed_out,
+        "cancelled": finished.cancelled,
+        "error": finished.error,
+        "errors": errors,
+        "roots": roots,
+        "coverage": finished.coverage,
+        "metrics": finished.metrics,
+    }
+    if args.format == "ndjson":
+        write_line(summary, stream)
+    else:
+        summary["results"] = detections
+        stream.write(json.dumps(summary, ensure_ascii=False, indent=2) + "\n")
+        stream.flush()
+    return exit_code(finished)
+
+
+def run_watch(args, stream=None):
+    """Sorveglia i processi scrivendo un rilevamento NDJSON per riga; restituisce il codice di uscita"""
+    import threading
+    from eleventools import events
+    from eleventools.processes import get_process_backend
+    from eleventools.watch import ProcessWatcher, DEFAULT_INTERVAL
+
+    stream = stream or sys.stdout
+    logger = setup_logging(args.verbose, args.log_dir)
+    store = open_cli_signature_store(args, logger)
+    watcher = ProcessWatcher(
+        store,
+        backend=get_process_backend(args.process_backend),
+        interval=args.interval if args.interval is not None else DEFAULT_INTERVAL,
+        logger=logger,
+        detection_log_limit=detection_log_limit(args),
+    )
+
+    def emit(event):
+        if isinstance(event, events.Detection):
+            write_line(detection_record(event), stream)
+        elif isinstance(event, events.ScanError):
+            sys.stderr.write(f"ERRORE: {event.message}\n")
+
+    stop_event = threading.Event()
+    try:
+        watcher.run(emit, stop_event, duration=args.duration)
+    except KeyboardInterrupt:
+        # Ctrl+C arrivato fuori dal ciclo di sorveglianza: i rilevamenti restano contati nel watcher
+        stop_event.set()
+    finally:
+        store.stop()
+    return EXIT_DETECTED if watcher.detections else EXIT_CLEAN
+
+
+def read_targets(args):
+    """Destinazioni dalla riga di comando e da --targets-file"""
+    targets = list(args.targets)
+    if args.targets_file:
+        with open(args.targets_file, encoding="utf-8") as f:
+            targets.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#"))
+    return targets
+
+
+def run_fleet(args, stream=None):
+    """Scansiona più destinazioni in parallelo e scrive un unico rapporto; restituisce il codice di uscita"""
+    import queue
+    import threading
+    from eleventools.cancel import CancelToken
+    from eleventools.fleet import FleetCoordinator, FleetReport
+
+    stream = stream or sys.stdout
+    logger = setup_logging(args.verbose)
+    try:
+        targets = read_targets(args)
+    except OSError as e:
+        sys.stderr.write(f"ERRORE: impossibile leggere l'elenco delle destinazioni: {str(e)}\n")
+        return EXIT_ERROR
+    if not targets:
+        sys.stderr.write("ERRORE: nessuna destinazione indicata\n")
+        return EXIT_ERROR
+
+    # Le firme vengono validate qui e salvate nella cache compilata, da cui i worker le caricano
+    load_cli_signatures(args)
+    path, cache_path = _signature_paths(args)
+    coordinator = FleetCoordinator(targets, max_workers=args.workers, signatures_path=path, cache_path=cache_path,
+                                   max_scan_time=args.max_time, logger=logger)
+
+    def target_record(result):
+        return {
+            "event": "target", "target": result.target, "detections": len(result.detections),
+            "elapsed": round(result.elapsed, 3), "timed_out": result.timed_out, "cancelled": result.cancelled,
+            "error": result.error, "errors": result.errors, "coverage": result.coverage,
+        }
+
+    def emit(result):
+        if args.format == "ndjson":
+            for detection in result.detections:
+                record = detection_record(detection)
+                record["target"] = result.target
+                write_line(record, stream)
+            write_line(target_record(result), stream)
+        for message in result.errors:
+            sys.stderr.write(f"ERRORE: {result.target}: {message}\n")
+
+    # Come per scan, il coordinatore gira in un thread e il thread principale resta libero per Ctrl+C
+    cancel = CancelToken()
+    results = queue.Queue()
+
+    def run():
+        try:
+            results.put(coordinator.run(results.put, cancel))
+        except Exception as e:
+            logger.error(f"Errore durante la scansione delle destinazioni: {str(e)}", exc_info=True)
+            results.put(e)
+
+    threading.Thread(target=run, name="FleetCoordinator", daemon=True).start()
+    report = None
+    while report is None:
+        try:
+            item = results.get()
+        except KeyboardInterrupt:
+            cancel.cancel()
+            continue
+        if isinstance(item, Exception):
+            sys.stderr.write(f"ERRORE: {str(item)}\n")
+            return EXIT_ERROR
+        if isinstance(item, FleetReport):
+            report = item
+        else:
+            emit(item)
+
+    summary = {
+        "event": "summary",
+        "targets": len(report.results),
+        "detections": len(report.detections),
+        "elapsed": round(report.elapsed, 3),
+        "timed_out": report.timed_out,
+        "cancelled": report.cancelled,
+        "error": report.error,
+        "executors": report.executors(),
+    }
+    if args.format == "ndjson":
+        write_line(summary, stream)
+    else:
+        summary["results"] = []
+        for result in report.results:
+            record = target_record(result)
+            record["results"] = [detection_record(detection) for detection in result.detections]
+            summary["results"].append(record)
+        stream.write(json.dumps(summary, ensure_ascii=False, indent=2) + "\n")
+        stream.flush()
+    return exit_code(report)
+
+
+def run_bench(args, stream=None):
+    """Esegue il benchmark scrivendo una riga NDJSON per misura; restituisce il codice di uscita"""
+    from eleventools import bench
+
+    stream = stream or sys.stdout
+    logger = setup_logging(args.verbose)
+    seed = args.seed if args.seed is not None else bench.DEFAULT_SEED
+    baseline_path = args.baseline or bench.DEFAULT_BASELINE
+    baseline = None
+    if not args.save_baseline:
+        try:
+            baseline = bench.read_baseline(baseline_path)
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"ERRORE: impossibile leggere il riferimento: {str(e)}\n")
+            return EXIT_ERROR
+        if baseline is None:
+            logger.warning(f"Nessun riferimento in {baseline_path}: i risultati non vengono confrontati")
+
+    def emit(size, case, result, problems):
+        record = {"event": "bench", "size": size, "case": case}
+        record.update(result)
+        record["problems"] = problems
+        write_line(record, stream)
+        for problem in problems:
+            sys.stderr.write(f"REGRESSIONE: {f'{size}/{case}' if size else case}: {problem}\n")
+
+    # Il database delle firme viene validato prima di generare le macchine
+    load_cli_signatures(args)
+    results, failures = bench.run_benchmark(
+        sizes=args.size or bench.DEFAULT_SIZES,
+        cases=args.case or bench.CASES,
+        repeat=args.repeat or bench.DEFAULT_REPEAT,
+        seed=seed,
+        workdir=args.workdir or bench.DEFAULT_WORKDIR,
+        baseline=baseline,
+        threshold=args.threshold if args.threshold is not None else bench.DEFAULT_THRESHOLD,
+        signatures_path=args.signatures,
+        emit=emit,
+        logger=logger,
+    )
+    if args.save_baseline:
+        bench.write_baseline(baseline_path, results, seed)
+    write_line({"event": "summary", "failures": failures, "baseline": baseline_path,
+                "compared": baseline is not None, "saved": args.save_baseline}, stream)
+    return EXIT_REGRESSION if failures else EXIT_CLEAN
+
+
+def main(argv=None):
+    from eleventools.signatures import SignatureDatabaseError
+
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "scan":
+            return run_scan(args)
+        if args.command == "watch":
+            return run_watch(args)
+        if args.command == "fleet":
+            return run_fleet(args)
+        if args.command == "bench":
+            return run_bench(args)
+    except SignatureDatabaseError as e:
+        sys.stderr.write(f"ERRORE: impossibile caricare il database delle firme: {str(e)}\n")
+    return EXIT_ERROR
@@ -0,0 +1,523 @@
+"""Motore di scansione indipendente dall'interfaccia grafica.
+
+Le tre fasi (file, processi, registro) pubblicano eventi tipizzati tramite una
+funzione emit; ScanWorker esegue il motore in un thread separato e inserisce
+gli eventi in una coda che l'interfaccia svuota al proprio ritmo.
+
+Le fasi usano risorse indipendenti (disco, tabella dei processi, registro) e
+vengono eseguite in parallelo, ognuna in un proprio thread: la durata della
+scansione è quella della fase più lenta. Gli eventi delle fasi confluiscono
+nella stessa funzione emit.
+
+Il tempo massimo della scansione è un unico CancelToken condiviso: ogni fase
+riceve un token figlio e lo controlla nei cicli interni, quindi si ferma entro
+pochi decimi di secondo dalla scadenza o dall'annullamento. In modalità
+sequenziale ogni fase riceve invece la propria quota del tempo rimanente.
+Ogni fase riporta la copertura effettiva (cosa è stato esaminato e cosa no)
+nell'evento PhaseFinished e in ScanFinished; le fasi escluse con phases
+risultano non eseguite.
+
+Il motore non conserva i rilevamenti: ognuno viene pubblicato con emit e
+scritto nel log dei rilevamenti, e ScanFinished riporta solo quanti ne sono
+stati trovati, in totale e per executor. Chi vuole l'elenco completa (la
+tabella dei risultati, il formato json) lo raccoglie dagli eventi Detection,
+così la memoria della scansione non cresce con il numero dei rilevamenti.
+
+ScanFinished riporta anche le metriche della scansione (eleventools.metrics):
+tempo di ogni fase e di ogni radice, contatori e uso delle cache, più il
+profilo cProfile e tracemalloc se richiesto; con metrics_path le stesse
+metriche vengono scritte in un file per il monitoraggio.
+"""
+import os
+import time
+import queue
+import collections
+import logging
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from eleventools import events
+from eleventools.cancel import CancelToken, ScanCancelled, TIMEOUT, CANCELLED
+from eleventools.filesystem import FileWalker, default_scan_roots
+from eleventools.fsindex import FsIndex
+from eleventools.hashing import HashStage
+from eleventools.metrics import ScanMetrics, Profiler, hit_rate, write_metrics_file
+from eleventools.logs import DetectionLog
+from eleventools.processes import get_process_backend, process_location
+from eleventools.registry import get_registry_provider
+from eleventools.registry_scan import RegistryScanner, HIVES, VALUE_KEYS
+from eleventools.signatures import load_signatures
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_HASH_CACHE = os.path.join(BASE_DIR, "cache", "hashes.sqlite")
+DEFAULT_FS_INDEX = os.path.join(BASE_DIR, "cache", "fsindex.sqlite")
+
+# Timeout globale della scansione completa, in secondi
+MAX_SCAN_TIME = 120
+
+# Fasi della scansione: identificativo, descrizione e nome breve per i messaggi
+PHASES = (
+    ("files", "Ricerca di file sospetti", "file"),
+    ("processes", "Controllo dei processi in esecuzione", "processi"),
+    ("registry", "Analisi del registro di sistema", "registro"),
+)
+PHASE_TITLES = {phase: title for phase, title, _ in PHASES}
+PHASE_LABELS = {phase: label for phase, _, label in PHASES}
+_PHASE_ERRORS = {"files": "dei file", "processes": "dei processi", "registry": "del registro"}
+
+# Quota del tempo rimanente assegnata a ogni fase in modalità sequenziale; il tempo non usato passa alle fasi successive
+PHASE_SHARES = {"files": 0.6, "processes": 0.15, "registry": 0.25}
+_PHASE_TIMEOUTS = {
+    "files": "Timeout durante la ricerca dei file. Limitazione della scansione...",
+    "processes": "Timeout durante l'analisi dei processi. Limitazione della scansione...",
+    "registry": "Timeout durante l'analisi del registro. Limitazione della scansione...",
+}
+
+
+def throttled_progress(emit, phase, min_interval=0.1):
+    """Callback di avanzamento che pubblica al massimo un evento ogni min_interval secondi"""
+    last = [0.0]
+
+    def callback(fraction):
+        now = time.time()
+        if now - last[0] >= min_interval or fraction >= 1.0:
+            last[0] = now
+            emit(events.Progress(phase, fraction, None))
+
+    return callback
+
+
+class ScanEngine:
+    """Esegue le fasi di scansione e ne pubblica i risultati come eventi"""
+
+    def __init__(self, signatures=None, scan_roots=None, hash_cache_path=DEFAULT_HASH_CACHE,
+                 max_scan_time=MAX_SCAN_TIME, process_backend=None, registry=None, logger=None,
+                 fs_index_path=DEFAULT_FS_INDEX, concurrent=True, phases=None, metrics_path=None,
+                 profile_path=None, trace_memory=False, detection_log_limit=None):
+        self.logger = logger or logging.getLogger("ElevenTools")
+        # Firme compilate (vedi eleventools.signatures); se None viene caricato il database predefinito
+        self.signatures = signatures if signatures is not None else load_signatures()
+        self.matcher = self.signatures.matcher
+        self.scan_roots = scan_roots if scan_roots is not None else default_scan_roots()
+        self.hash_cache_path = hash_cache_path
+        # Indice del filesystem per le scansioni incrementali; None per rileggere sempre tutte le cartelle
+        self.fs_index_path = fs_index_path
+        self.max_scan_time = max_scan_time
+        # Backend di enumerazione dei processi; se None viene scelto al primo uso
+        self.process_backend = process_backend
+        # Provider del registro (reale o in memoria); se None viene scelto al primo uso
+        self.registry = registry
+        # Fasi in parallelo (predefinito) o una dopo l'altra con il tempo diviso tra le fasi
+        self.concurrent = concurrent
+        # Fasi da eseguire (predefinito: tutte); le altre risultano non eseguite nella copertura
+        names = [name for name, _, _ in PHASES]
+        if phases is not None and set(phases) - set(names):
+            raise ValueError(f"Fasi sconosciute: {', '.join(sorted(set(phases) - set(names)))}")
+        self.phases = tuple(name for name in names if phases is None or name in phases)
+        # File delle metriche per il monitoraggio (None: non scritto), profilo cProfile e tracciamento della memoria
+        self.metrics_path = metrics_path
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        self.metrics = ScanMetrics(max_scan_time)
+        # Rilevamenti scritti uno per uno nel log a ogni scansione (None: tutti)
+        self.detection_log = DetectionLog(self.logger, detection_log_limit)
+
+    def phase_budget(self, phase, token):
+        """Secondi assegnati alla fase: la sua quota del tempo rimanente rispetto alle fasi non ancora eseguite"""
+        remaining = token.remaining()
+        if remaining is None:
+            return None
+        later = sum(PHASE_SHARES[name] for name in self.phases[self.phases.index(phase):])
+        return remaining * PHASE_SHARES[phase] / later
+
+    def _run_phase(self, phase, index, emit, token):
+        """Esegue una fase pubblicandone inizio e fine; restituisce (numero di rilevamenti, copertura)"""
+        emit(events.PhaseStarted(phase, index, len(self.phases)))
+        phase_methods = {
+            "files": self.scan_files,
+            "processes": self.scan_processes,
+            "registry": self.scan_registry,
+        }
+        found = 0
+        started = time.perf_counter()
+        try:
+            found, coverage = phase_methods[phase](emit, token)
+        except Exception as e:
+            error_msg = f"Errore durante la scansione {_PHASE_ERRORS[phase]}: {str(e)}"
+            emit(events.ScanError(phase, error_msg))
+            self.logger.error(error_msg, exc_info=True)
+            coverage = events.phase_coverage(events.COVERAGE_INTERRUPTED, "error")
+        self.metrics.phase(phase)["seconds"] = round(time.perf_counter() - started, 4)
+        emit(events.PhaseFinished(phase, found, coverage))
+        return found, coverage
+
+    def _run_concurrent(self, emit, scan_token):
+        # Ogni fase ha il tempo intero della scansione: il limite è solo quello globale
+        with ThreadPoolExecutor(max_workers=max(1, len(self.phases)), thread_name_prefix="phase") as pool:
+            futures = [(phase, pool.submit(self._run_phase, phase, index, emit, scan_token.child()))
+                       for index, phase in enumerate(self.phases, 1)]
+            return {phase: future.result() for phase, future in futures}
+
+    def _run_sequential(self, emit, scan_token):
+        results = {}
+        for index, phase in enumerate(self.phases, 1):
+            if scan_token.cancelled:
+                results[phase] = 0, events.phase_coverage(events.COVERAGE_SKIPPED, scan_token.reason)
+                continue
+            phase_token = scan_token.child(self.phase_budget(phase, scan_token))
+            results[phase] = found, coverage = self._run_phase(phase, index, emit, phase_token)
+            if coverage["reason"] == TIMEOUT and not scan_token.cancelled:
+                # Scaduto solo il budget della fase: la scansione prosegue con la fase successiva
+                emit(events.Info(phase, _PHASE_TIMEOUTS[phase]))
+                self.logger.warning(f"Tempo a disposizione per la scansione {_PHASE_ERRORS[phase]} esaurito")
+        return results
+
+    def run(self, emit, cancel=None):
+        """Esegue tutte le fasi e restituisce l'evento ScanFinished.
+
+        cancel è un CancelToken opzionale con cui il chiamante può annullare la
+        scansione. emit può essere chiamata da più thread, ma mai in
+        contemporanea: le chiamate vengono serializzate.
+        """
+        start_time = time.time()
+        self.metrics = ScanMetrics(self.max_scan_time)
+        for phase in self.phases:
+            # Metriche nell'ordine delle fasi, indipendentemente da quale termini prima
+            self.metrics.phase(phase)
+        profiler = Profiler(self.profile_path, self.trace_memory)
+        if profiler.enabled:
+            profiler.start()
+        self.logger.info(f"Avvio scansione completa (database delle firme v{self.signatures.version}, "
+                         f"{self.signatures.executor_count} executor, fasi "
+                         f"{'in parallelo' if self.concurrent else 'in sequenza'})")
+        scan_token = (cancel or CancelToken()).child(self.max_scan_time)
+        emit_lock = threading.Lock()
+        # Rilevamenti per executor: i rilevamenti stessi passano solo da emit
+        executors = collections.Counter()
+
+        def safe_emit(event):
+            with emit_lock:
+                if isinstance(event, events.Detection):
+                    executors[event.executor] += 1
+                emit(event)
+
+        coverage = {}
+        error = None
+        try:
+            if self.concurrent:
+                results = self._run_concurrent(safe_emit, scan_token)
+            else:
+                results = self._run_sequential(safe_emit, scan_token)
+            # Copertura nell'ordine delle fasi, indipendentemente da quale sia terminata prima
+            for phase, _, _ in PHASES:
+                _, coverage[phase] = results.get(
+                    phase, (0, events.phase_coverage(events.COVERAGE_SKIPPED, "disabled")))
+
+            last_phase = self.phases[-1] if self.phases else PHASES[-1][0]
+            if scan_token.reason == CANCELLED:
+                safe_emit(events.Info(last_phase, "Scansione annullata dall'utente."))
+                self.logger.warning("Scansione annullata dall'utente")
+            elif scan_token.reason == TIMEOUT:
+                safe_emit(events.Info(last_phase, "Timeout globale raggiunto. Interruzione della scansione."))
+                self.logger.warning("Timeout durante la scansione: Timeout globale della scansione")
+        except Exception as e:
+            error = str(e)
+            self.logger.error(f"Errore durante la scansione: {error}", exc_info=True)
+
+        elapsed_time = time.time() - start_time
+        timed_out = any(phase_cov["reason"] == TIMEOUT for phase_cov in coverage.values())
+        cancelled = scan_token.reason == CANCELLED
+        detections = sum(executors.values())
+        self.detection_log.flush()
+        if not detections and not timed_out and not cancelled and error is None:
+            self.logger.info("Scansione completata senza rilevamenti")
+        self.logger.info(f"Scansione completata in {elapsed_time:.2f} secondi")
+        for phase, phase_cov in coverage.items():
+            self.logger.info(f"Copertura {PHASE_LABELS[phase]}: {phase_cov}")
+
+        if profiler.enabled:
+            try:
+                self.metrics.profile = profiler.stop()
+            except OSError as e:
+                self.logger.warning(f"Impossibile salvare il profilo: {str(e)}")
+        self.metrics.elapsed = elapsed_time
+        metrics = self.metrics.as_dict()
+        self.log_metrics(metrics)
+        finished = events.ScanFinished(detections, elapsed_time, timed_out, error, cancelled, coverage, metrics,
+                                       dict(executors))
+        if self.metrics_path:
+            try:
+                write_metrics_file(self.metrics_path, finished)
+            except OSError as e:
+                self.logger.warning(f"Impossibile scrivere il file delle metriche: {str(e)}")
+        safe_emit(finished)
+        return finished
+
+    def log_metrics(self, metrics):
+        """Riassume nel log dove è andato il tempo della scansione"""
+        budget = metrics["budget"]
+        for phase, values in metrics["phases"].items():
+            share = f" ({values['budget_share'] * 100:.0f}% del tempo massimo)" if budget else ""
+            self.logger.info(f"Tempo {PHASE_LABELS[phase]}: {values.get('seconds', 0):.2f} secondi{share}")
+        for root in sorted(metrics["roots"], key=lambda r: r["read_seconds"], reverse=True)[:5]:
+            self.logger.info(f"Radice {root['root']}: {root['dirs']} cartelle, {root['entries']} voci, "
+                             f"lettura {root['read_seconds']:.2f} secondi, terminata dopo {root['finished_at']:.2f}")
+        for row in metrics.get("profile", {}).get("top", [])[:5]:
+            self.logger.info(f"Profilo: {row['function']} {row['seconds']:.3f} secondi in {row['calls']} chiamate")
+        memory = metrics.get("memory")
+        if memory:
+            self.logger.info(f"Memoria: picco {memory['peak_bytes'] / 1048576:.1f} MB allocati durante la scansione")
+
+    def scan_files(self, emit, cancel=None):
+        """Scansiona il filesystem cercando file e cartelle degli executor per nome, pattern e hash"""
+        found = 0
+        self.logger.info(f"Avvio scansione file su {len(self.scan_roots)} radici")
+
+        def report(executor_name, kind, location, signature):
+            nonlocal found
+            detection = events.Detection(executor_name, kind, location, signature)
+            found += 1
+            self.detection_log(detection)
+            emit(detection)
+
+        def report_hashes(results):
+            for path, digest, matches in results:
+                for executor_name, _ in matches:
+                    report(executor_name, events.EVIDENCE_HASH, path, digest)
+
+        hash_stage = HashStage(self.signatures.hash_index, cache_path=self.hash_cache_path, logger=self.logger,
+                               cancel=cancel)
+        fs_index = None
+        if self.fs_index_path:
+            import sqlite3
+            try:
+                fs_index = FsIndex(self.fs_index_path, self.signatures.fingerprint, logger=self.logger)
+            except (sqlite3.Error, OSError) as e:
+                self.logger.warning(f"Indice del filesystem non disponibile, scansione completa: {str(e)}")
+
+        # Chiamate al matcher dai thread della visita (next su itertools.count è atomico)
+        keep_calls = itertools.count()
+
+        def keep(entry):
+            # Voci da ricordare nell'indice: quelle che la scansione usa anche quando la cartella non cambia
+            next(keep_calls)
+            return bool(self.matcher.match_file(entry.name)) or hash_stage.wants(entry)
+
+        name_calls = itertools.count()
+
+        def match_names(entries):
+            # Confronta i nomi delle voci visitate e passa avanti i soli file, con le corrispondenze trovate
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+
+                next(name_calls)
+                if is_dir:
+                    for executor_name, signature in self.matcher.match_folder(entry.name):
+                        report(executor_name, events.EVIDENCE_FOLDER, entry.path, signature)
+                    continue
+
+                matches = self.matcher.match_file(entry.name)
+                for executor_name, signature in matches:
+                    report(executor_name, events.EVIDENCE_FILE, entry.path, signature)
+                yield entry, matches
+
+        # Catena di generatori (visita -> nomi -> dimensione e hash -> rilevamenti): ogni voce attraversa tutti gli
+        # stadi prima che venga letta la successiva, e gli stadi con thread (letture delle cartelle e hashing)
+        # hanno code limitate che fermano la visita quando sono piene, quindi la memoria resta costante
+        walker = FileWalker(self.scan_roots, logger=self.logger, index=fs_index, keep=keep, cancel=cancel)
+        walk = walker.walk(throttled_progress(emit, "files"))
+        interrupted = None
+        hash_wait = 0.0
+        try:
+            for entry, matches in match_names(walk):
+                # Fase di hashing: solo per i file candidati per dimensione o per nome
+                hash_stage.consider(entry, matches)
+                report_hashes(hash_stage.poll())
+        except ScanCancelled as e:
+            interrupted = e.reason
+        finally:
+            # Chiude subito la visita, così l'indice viene salvato prima di chiuderlo
+            walk.close()
+            try:
+                waited = time.perf_counter()
+                report_hashes(hash_stage.finish())
+                hash_wait = time.perf_counter() - waited
+            finally:
+                if fs_index is not None:
+                    fs_index.close()
+
+        stats = walker.stats
+        self.logger.info(f"Scansione file completata: {stats.dirs_visited} cartelle "
+                         f"({stats.dirs_unchanged} invariate dall'ultima scansione), {stats.entries_seen} voci "
+                         f"esaminate, {stats.entries_skipped} saltate, {stats.errors} errori di accesso")
+        hstats = hash_stage.stats
+        self.logger.info(f"Hashing completato: {hstats.files_hashed} file letti ({hstats.bytes_hashed} byte), "
+                         f"{hstats.cache_hits} risultati dalla cache")
+        if interrupted is None and hstats.files_abandoned and cancel is not None:
+            # Visita completa ma tempo scaduto durante gli ultimi hash
+            interrupted = cancel.reason
+        coverage = events.phase_coverage(
+            events.COVERAGE_INTERRUPTED if interrupted else events.COVERAGE_COMPLETE, interrupted,
+            dirs_visited=stats.dirs_visited, dirs_not_visited=stats.dirs_pending, entries_seen=stats.entries_seen,
+            files_hashed=hstats.files_hashed + hstats.cache_hits, hashes_abandoned=hstats.files_abandoned,
+            bytes_hashed=hstats.bytes_hashed,
+        )
+        self.metrics.phase("files").update(
+            dirs_visited=stats.dirs_visited, dirs_unchanged=stats.dirs_unchanged, entries_seen=stats.entries_seen,
+            entries_skipped=stats.entries_skipped, access_errors=stats.errors,
+            matcher_calls=next(name_calls) + next(keep_calls),
+            files_hashed=hstats.files_hashed, bytes_read=hstats.bytes_hashed,
+            hash_read_seconds=round(hstats.read_seconds, 4), hash_wait_seconds=round(hash_wait, 4),
+            hash_cache_hits=hstats.cache_hits, hash_cache_hit_rate=hit_rate(hstats.cache_hits, hstats.cache_lookups),
+            fs_index_hit_rate=hit_rate(stats.dirs_unchanged, stats.dirs_visited) if fs_index is not None else None,
+        )
+        self.metrics.roots = [root.as_dict() for root in stats.roots.values()]
+        return found, coverage
+
+    def scan_processes(self, emit, cancel=None):
+        """Scansiona i processi in esecuzione alla ricerca di executor"""
+        found = 0
+        self.logger.info("Avvio scansione processi")
+        start_time = time.time()
+        processes = []
+        checked = 0
+        list_seconds = None
+        interrupted = None
+
+        try:
+            emit(events.Info("processes", "Analisi dei processi in esecuzione..."))
+
+            if self.process_backend is None:
+                self.process_backend = get_process_backend()
+            processes = self.process_backend.list_processes(cancel)
+            list_seconds = time.time() - start_time
+            self.logger.info(f"Elencati {len(processes)} processi con il backend {self.process_backend.name} "
+                             f"in {list_seconds * 1000:.0f} ms")
+
+            # Ogni processo viene confrontato con l'intero database in una sola ricerca
+            progress = throttled_progress(emit, "processes")
+            for process in processes:
+                if cancel is not None:
+                    cancel.check()
+                progress(checked / len(processes))
+                for executor_name, signature in self.matcher.match_process(process.name):
+                    detection = events.Detection(executor_name, events.EVIDENCE_PROCESS, process_location(process),
+                                                 signature)
+                    found += 1
+                    self.detection_log(detection)
+                    emit(detection)
+                checked += 1
+            emit(events.Progress("processes", 1.0, None))
+        except ScanCancelled as e:
+            interrupted = e.reason
+        except Exception as e:
+            error_msg = f"Errore durante la scansione dei processi: {str(e)}"
+            self.logger.error(error_msg)
+            emit(events.ScanError("processes", error_msg))
+            interrupted = "error"
+
+        self.logger.info(f"Scansione processi completata. Trovati {found} elementi")
+        coverage = events.phase_coverage(
+            events.COVERAGE_INTERRUPTED if interrupted else events.COVERAGE_COMPLETE, interrupted,
+            processes_listed=len(processes), processes_checked=checked,
+        )
+        self.metrics.phase("processes").update(
+            list_seconds=round(list_seconds, 4) if list_seconds is not None else None,
+            processes_listed=len(processes), matcher_calls=checked,
+        )
+        return found, coverage
+
+    def scan_registry(self, emit, cancel=None):
+        """Scansiona il registro di sistema alla ricerca di tracce di executor"""
+        found = 0
+        self.logger.info("Avvio scansione registro di sistema")
+
+        def report(executor_name, kind, location, signature):
+            nonlocal found
+            detection = events.Detection(executor_name, kind, location, signature)
+            found += 1
+            self.detection_log(detection)
+            emit(detection)
+
+        if self.registry is None:
+            self.registry = get_registry_provider()
+        if self.registry is None:
+            emit(events.Info("registry", "Registro di sistema non disponibile su questa piattaforma."))
+            return found, events.phase_coverage(events.COVERAGE_SKIPPED, "unavailable")
+        registry = self.registry
+        if not any(registry.hive_instances(hive) for hive in HIVES):
+            # Registro offline senza hive: l'immagine non contiene un'installazione di Windows
+            emit(events.Info("registry", "Nessun hive del registro da analizzare."))
+            return found, events.phase_coverage(events.COVERAGE_SKIPPED, "unavailable")
+
+        scanner = RegistryScanner(self.matcher, registry, cancel=cancel, logger=self.logger)
+        interrupted = None
+
+        try:
+            emit(events.Info("registry", "Analisi del registro di sistema..."))
+
+            # Prima fase: chiavi specifiche degli executor, una enumerazione per chiave padre
+            scanner.scan_executor_keys(
+                lambda executor_name, location, signature: report(executor_name, events.EVIDENCE_REGISTRY_KEY,
+                                                                  location, signature))
+            emit(events.Progress("registry", 0.5, None))
+
+            # Seconda fase: avvio automatico e tracce lasciate dagli executor (Uninstall, App Paths,
+            # MUICache, UserAssist, file recenti), visitate in parallelo
+            emit(events.Info("registry", "Controllo delle chiavi di avvio automatico e delle tracce di utilizzo..."))
+            progress = throttled_progress(emit, "registry")
+            scanner.scan_value_keys(
+                lambda executor_name, location, signature: report(executor_name, events.EVIDENCE_REGISTRY_TRACE,
+                                                                  location, signature),
+                progress=lambda fraction: progress(0.5 + fraction / 2))
+            emit(events.Progress("registry", 1.0, None))
+        except ScanCancelled as e:
+            interrupted = e.reason
+        except Exception as e:
+            error_msg = f"Errore durante la scansione del registro: {str(e)}"
+            self.logger.error(error_msg)
+            emit(events.ScanError("registry", error_msg))
+            interrupted = "error"
+
+        stats = scanner.stats
+        self.logger.info(f"Registro: {stats.keys_opened} chiavi aperte, {stats.subkeys_seen} sottochiavi "
+                         f"e {stats.values_seen} valori esaminati")
+        for timing in sorted(stats.key_timings, key=lambda t: t.seconds, reverse=True)[:3]:
+            self.logger.info(f"Chiave più lenta: {timing.location} ({timing.values} valori, {timing.seconds * 1000:.1f} ms)")
+        self.logger.info(f"Scansione registro completata. Trovati {found} elementi")
+        coverage = events.phase_coverage(
+            events.COVERAGE_INTERRUPTED if interrupted else events.COVERAGE_COMPLETE, interrupted,
+            executor_keys_checked=stats.executor_parents_done, executor_keys_total=len(self.matcher.registry_keys),
+            trace_keys_checked=stats.value_keys_done, trace_keys_total=scanner.value_key_count(VALUE_KEYS),
+            values_seen=stats.values_seen,
+        )
+        self.metrics.phase("registry").update(
+            keys_opened=stats.keys_opened, subkeys_seen=stats.subkeys_seen, values_seen=stats.values_seen,
+            matcher_calls=stats.matcher_calls,
+            slowest_keys=[{"location": timing.location, "seconds": round(timing.seconds, 4)}
+                          for timing in sorted(stats.key_timings, key=lambda t: t.seconds, reverse=True)[:3]],
+        )
+        return found, coverage
+
+
+class ScanWorker(threading.Thread):
+    """Thread che esegue il motore di scansione e pubblica gli eventi su una coda"""
+
+    def __init__(self, engine, event_queue=None, cancel=None):
+        super().__init__(name="ScanWorker", daemon=True)
+        self.engine = engine
+        self.events = event_queue if event_queue is not None else queue.Queue()
+        # Token con cui il chiamante può annullare la scansione (pulsante Annulla, Ctrl+C)
+        self.cancel = cancel if cancel is not None else CancelToken()
+
+    def run(self):
+        try:
+            self.engine.run(self.events.put, self.cancel)
+        except Exception as e:
+            # Garantisce che il consumatore riceva sempre la fine della scansione
+            self.engine.logger.error(f"Errore durante la scansione: {str(e)}", exc_info=True)
+            self.events.put(events.ScanFinished(0, 0.0, False, str(e)))
@@ -0,0 +1,116 @@
+"""Eventi prodotti dal motore di scansione.
+
+Il motore non conosce l'interfaccia: ogni fase pubblica eventi tipizzati
+che l'interfaccia grafica (o la riga di comando) consuma da una coda.
+"""
+import time
+from collections import namedtuple
+
+# Inizio di una fase: nome della fase, indice (da 1) e numero totale di fasi
+PhaseStarted = namedtuple("PhaseStarted", "phase index total")
+
+# Avanzamento di una fase: frazione completata (0-1) e messaggio opzionale
+Progress = namedtuple("Progress", "phase fraction message")
+
+# Messaggio informativo da mostrare all'utente
+Info = namedtuple("Info", "phase message")
+
+# Errore non fatale durante una fase
+ScanError = namedtuple("ScanError", "phase message")
+
+# Fine di una fase con il numero di elementi trovati e la copertura (vedi COVERAGE_*)
+PhaseFinished = namedtuple("PhaseFinished", "phase count coverage", defaults=(None,))
+
+# Fine della scansione: numero di rilevamenti, durata, timeout, eventuale errore fatale, annullamento
+# da parte dell'utente, copertura di ogni fase, metriche (vedi eleventools.metrics) e rilevamenti per
+# executor. I rilevamenti stessi arrivano solo come eventi Detection: chi ne vuole l'elenco lo raccoglie
+ScanFinished = namedtuple("ScanFinished", "detections elapsed timed_out error cancelled coverage metrics executors",
+                          defaults=(False, None, None, None))
+
+# Stato di una fase nella copertura: completata, interrotta (per scadenza o annullamento) o non eseguita
+COVERAGE_COMPLETE = "complete"
+COVERAGE_INTERRUPTED = "interrupted"
+COVERAGE_SKIPPED = "skipped"
+
+# Tipi di prova di un rilevamento
+EVIDENCE_FILE = "file"
+EVIDENCE_FOLDER = "folder"
+EVIDENCE_HASH = "hash"
+EVIDENCE_PROCESS = "process"
+EVIDENCE_REGISTRY_KEY = "registry_key"
+EVIDENCE_REGISTRY_TRACE = "registry_trace"
+
+# Affidabilità di ogni tipo di prova (3 alta, 2 media, 1 bassa): un hash o un processo in esecuzione
+# identificano l'executor, un nome di file o una traccia nel registro possono essere coincidenze o residui
+CONFIDENCE = {
+    EVIDENCE_HASH: 3,
+    EVIDENCE_PROCESS: 3,
+    EVIDENCE_REGISTRY_KEY: 2,
+    EVIDENCE_FILE: 2,
+    EVIDENCE_FOLDER: 2,
+    EVIDENCE_REGISTRY_TRACE: 1,
+}
+
+# Fase che produce ogni tipo di prova
+EVIDENCE_PHASES = {
+    EVIDENCE_FILE: "files",
+    EVIDENCE_FOLDER: "files",
+    EVIDENCE_HASH: "files",
+    EVIDENCE_PROCESS: "processes",
+    EVIDENCE_REGISTRY_KEY: "registry",
+    EVIDENCE_REGISTRY_TRACE: "registry",
+}
+
+
+class Detection:
+    """Elemento sospetto rilevato, pubblicato così com'è sulla coda degli eventi.
+
+    Contiene solo dati: executor, tipo di prova (EVIDENCE_*), posizione (file,
+    chiave di registro o processo), firma corrispondente e istante. Il testo da
+    mostrare viene composto da eleventools.formatting. Due rilevamenti sono
+    uguali se differiscono solo per l'istante, così si possono deduplicare con
+    un set.
+    """
+
+    __slots__ = ("executor", "kind", "location", "signature", "timestamp")
+
+    def __init__(self, executor, kind, location, signature=None, timestamp=None):
+        self.executor = executor
+        self.kind = kind
+        self.location = location
+        self.signature = signature
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    @property
+    def phase(self):
+        return EVIDENCE_PHASES.get(self.kind)
+
+    @property
+    def confidence(self):
+        return CONFIDENCE.get(self.kind, 0)
+
+    def key(self):
+        return (self.executor, self.kind, self.location, self.signature)
+
+    def __eq__(self, other):
+        if not isinstance(other, Detection):
+            return NotImplemented
+        return self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def as_dict(self):
+        """Campi del rilevamento per l'esportazione (JSON, CSV)"""
+        return {"executor": self.executor, "kind": self.kind, "location": self.location,
+                "signature": self.signature, "timestamp": self.timestamp}
+
+    def __repr__(self):
+        return f"Detection({self.executor!r}, {self.kind!r}, {self.location!r}, {self.signature!r})"
+
+
+def phase_coverage(status=COVERAGE_COMPLETE, reason=None, **counters):
+    """Copertura di una fase: stato, motivo dell'interruzione e contatori di ciò che è stato esaminato"""
+    coverage = {"status": status, "reason": reason}
+    coverage.update(counters)
+    return coverage
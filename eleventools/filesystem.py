@@ -0,0 +1,265 @@
+"""Motore di scansione del filesystem basato su os.scandir e un pool di thread"""
+import os
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from eleventools.cancel import POLL_INTERVAL
+from eleventools.fsindex import IndexedEntry, decode_entries
+
+# Variabile d'ambiente con radici aggiuntive separate da os.pathsep
+ROOTS_ENV_VAR = "ELEVENTOOLS_SCAN_ROOTS"
+
+
+def default_scan_roots(extra_roots=None):
+    """Restituisce le radici da scansionare: profilo utente, AppData, Download, Program Files e radici configurate"""
+    candidates = []
+    home = os.path.expanduser("~")
+    candidates.append(os.environ.get("USERPROFILE") or home)
+    for var in ("APPDATA", "LOCALAPPDATA"):
+        if os.environ.get(var):
+            candidates.append(os.environ[var])
+    candidates.append(os.path.join(home, "Downloads"))
+    for var in ("ProgramFiles", "ProgramFiles(x86)", "ProgramW6432"):
+        if os.environ.get(var):
+            candidates.append(os.environ[var])
+
+    configured = os.environ.get(ROOTS_ENV_VAR, "")
+    candidates.extend(p for p in configured.split(os.pathsep) if p)
+    if extra_roots:
+        candidates.extend(extra_roots)
+
+    return normalize_roots(candidates)
+
+
+def normalize_roots(paths):
+    """Rimuove duplicati, radici inesistenti e radici contenute in altre radici"""
+    roots = {}
+    for path in paths:
+        try:
+            real = os.path.realpath(path)
+        except OSError:
+            continue
+        key = os.path.normcase(real)
+        if key not in roots and os.path.isdir(real):
+            roots[key] = real
+
+    # Ordina per lunghezza così le radici "padre" vengono considerate per prime
+    result = []
+    for key in sorted(roots, key=len):
+        if not any(_is_inside(key, os.path.normcase(parent)) for parent in result):
+            result.append(roots[key])
+    return result
+
+
+def _is_inside(path, parent):
+    parent = parent.rstrip(os.sep) + os.sep
+    return path.startswith(parent)
+
+
+class RootStats:
+    """Contatori di una singola radice: le radici vengono visitate insieme, quindi i tempi sono separati"""
+
+    __slots__ = ("root", "dirs", "entries", "read_seconds", "finished_at")
+
+    def __init__(self, root):
+        self.root = root
+        self.dirs = 0
+        self.entries = 0
+        # Somma dei tempi di lettura delle cartelle (nei thread del pool) e istante dell'ultima cartella letta
+        self.read_seconds = 0.0
+        self.finished_at = 0.0
+
+    def as_dict(self):
+        return {"root": self.root, "dirs": self.dirs, "entries": self.entries,
+                "read_seconds": round(self.read_seconds, 4), "finished_at": round(self.finished_at, 4)}
+
+
+class WalkStats:
+    """Contatori raccolti durante la visita del filesystem"""
+
+    __slots__ = ("dirs_visited", "entries_seen", "errors", "dirs_unchanged", "entries_skipped", "dirs_pending",
+                 "roots")
+
+    def __init__(self):
+        self.dirs_visited = 0
+        self.entries_seen = 0
+        self.errors = 0
+        # Cartelle riprese dall'indice senza rileggerle e voci non restituite perché non interessanti
+        self.dirs_unchanged = 0
+        self.entries_skipped = 0
+        # Cartelle trovate ma non visitate perché la visita è stata interrotta
+        self.dirs_pending = 0
+        # Radice -> RootStats
+        self.roots = {}
+
+
+class FileWalker:
+    """Visita in parallelo le radici indicate leggendo ogni cartella una sola volta.
+
+    Le cartelle vengono lette con os.scandir da un pool di thread di dimensione
+    limitata; il thread chiamante coordina il lavoro e restituisce le voci
+    (os.DirEntry) man mano che arrivano, sia file che cartelle.
+
+    La memoria usata non dipende dal numero di file: le letture in corso sono
+    al più il doppio dei thread, il pool non ne avvia altre finché il chiamante
+    non ha consumato le voci già lette, e le cartelle da visitare vengono prese
+    in profondità (l'ultima trovata per prima), così quelle in attesa sono
+    proporzionali alla profondità dell'albero e non alla sua ampiezza.
+
+    Con un indice (eleventools.fsindex.FsIndex) le cartelle il cui mtime non è
+    cambiato dall'ultima visita non vengono rilette: vengono restituite solo le
+    sottocartelle e i file per cui keep(voce) era vero, come IndexedEntry.
+
+    Con un token di annullamento (eleventools.cancel.CancelToken) la visita si
+    interrompe sollevando ScanCancelled entro POLL_INTERVAL dalla scadenza.
+    """
+
+    def __init__(self, roots, max_workers=None, max_depth=None, follow_symlinks=False, logger=None,
+                 index=None, keep=None, cancel=None):
+        self.roots = normalize_roots(roots)
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.max_depth = max_depth
+        self.follow_symlinks = follow_symlinks
+        self.logger = logger or logging.getLogger("ElevenTools")
+        self.index = index
+        self.keep = keep
+        self.cancel = cancel
+        self.stats = WalkStats()
+
+    def _replay(self, path, depth, record):
+        """Voci salvate nell'indice per una cartella non modificata"""
+        entries = [IndexedEntry(path, name, is_dir) for name, is_dir in decode_entries(record.entries)]
+        subdirs = [(entry.path, depth + 1) for entry in entries
+                   if entry.is_dir() and (self.max_depth is None or depth < self.max_depth)]
+        return path, entries, subdirs, False, record
+
+    def _read_dir(self, path, depth):
+        """Legge una singola cartella e separa file e sottocartelle"""
+        mtime = None
+        if self.index is not None:
+            try:
+                # mtime letto prima di scandir: una modifica durante la lettura viene vista alla prossima scansione
+                mtime = os.stat(path).st_mtime_ns
+            except OSError as e:
+                self.logger.debug(f"Impossibile leggere {path}: {str(e)}")
+                return path, [], [], True, None
+            record = self.index.lookup(path, mtime)
+            if record is not None:
+                return self._replay(path, depth, record)
+
+        entries = []
+        subdirs = []
+        kept = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    # Le cartelle molto grandi vengono abbandonate senza attendere la fine della lettura
+                    if self.cancel is not None and len(entries) % 1024 == 1023 and self.cancel.cancelled:
+                        return path, [], [], None, None
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=self.follow_symlinks)
+                    except OSError:
+                        is_dir = False
+                    entries.append(entry)
+                    if is_dir and (self.max_depth is None or depth < self.max_depth):
+                        subdirs.append((entry.path, depth + 1))
+                    if mtime is not None and (is_dir or self.keep is None or self.keep(entry)):
+                        kept.append((entry.name, is_dir))
+        except OSError as e:
+            # Cartelle senza permessi o rimosse durante la scansione
+            self.logger.debug(f"Impossibile leggere {path}: {str(e)}")
+            return path, entries, subdirs, True, None
+        if mtime is not None:
+            self.index.record(path, mtime, len(entries), kept)
+        return path, entries, subdirs, False, None
+
+    def _timed_read(self, path, depth, root, share):
+        started = time.perf_counter()
+        result = self._read_dir(path, depth)
+        return root, share, time.perf_counter() - started, result
+
+    def walk(self, progress_callback=None):
+        """Generatore che restituisce tutte le voci trovate sotto le radici.
+
+        L'avanzamento è stimato dividendo la quota di ogni cartella in parti
+        uguali tra le sue sottocartelle: una cartella senza sottocartelle
+        completa la propria quota.
+        """
+        # (percorso, profondità, radice, quota dell'avanzamento)
+        pending = deque((root, 0, root, 1.0 / len(self.roots)) for root in self.roots)
+        # Senza seguire i collegamenti ogni cartella si raggiunge una sola volta, da quella che la contiene:
+        # l'insieme delle cartelle già visitate serve solo seguendo i collegamenti, che possono creare cicli
+        visited = set() if self.follow_symlinks else None
+        in_flight = set()
+        done_share = 0.0
+        # Limita le cartelle in coda al pool per non accumulare future in memoria
+        max_in_flight = self.max_workers * 2
+        self.stats = WalkStats()
+        self.stats.roots = {root: RootStats(root) for root in self.roots}
+        started = time.perf_counter()
+        complete = False
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="walker") as pool:
+                try:
+                    while pending or in_flight:
+                        while pending and len(in_flight) < max_in_flight:
+                            path, depth, root, share = pending.pop()
+                            if visited is not None:
+                                key = os.path.normcase(path)
+                                if key in visited:
+                                    done_share += share
+                                    continue
+                                visited.add(key)
+                            in_flight.add(pool.submit(self._timed_read, path, depth, root, share))
+
+                        if not in_flight:
+                            continue
+
+                        # Attesa a intervalli brevi per accorgersi subito di un annullamento
+                        done, in_flight = wait(in_flight, timeout=POLL_INTERVAL if self.cancel else None,
+                                               return_when=FIRST_COMPLETED)
+                        for future in done:
+                            root, share, seconds, (path, entries, subdirs, failed, record) = future.result()
+                            root_stats = self.stats.roots[root]
+                            root_stats.read_seconds += seconds
+                            root_stats.finished_at = time.perf_counter() - started
+                            if failed is None:
+                                # Lettura abbandonata per annullamento: la cartella resta da visitare
+                                self.stats.dirs_pending += 1
+                                continue
+                            self.stats.dirs_visited += 1
+                            root_stats.dirs += 1
+                            root_stats.entries += len(entries)
+                            if failed:
+                                self.stats.errors += 1
+                            if record is not None:
+                                self.stats.dirs_unchanged += 1
+                                self.stats.entries_skipped += record.entry_count - len(entries)
+                            if subdirs:
+                                subshare = share / len(subdirs)
+                                pending.extend((subdir, subdepth, root, subshare) for subdir, subdepth in subdirs)
+                            else:
+                                done_share += share
+                            for entry in entries:
+                                self.stats.entries_seen += 1
+                                if self.cancel is not None and self.stats.entries_seen % 1024 == 0:
+                                    self.cancel.check()
+                                yield entry
+                        if self.cancel is not None:
+                            self.cancel.check()
+
+                        if progress_callback:
+                            progress_callback(min(done_share, 1.0) if pending or in_flight else 1.0)
+                    complete = True
+                finally:
+                    # Visita interrotta dal chiamante: non avvia le letture ancora in coda
+                    for future in in_flight:
+                        future.cancel()
+                    self.stats.dirs_pending += len(pending) + len(in_flight)
+        finally:
+            if self.index is not None:
+                # Le cartelle mai raggiunte vengono rimosse solo se la visita è arrivata in fondo
+                self.index.save(self.roots, complete)
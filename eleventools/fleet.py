@@ -0,0 +1,204 @@
+"""Scansione di più destinazioni (immagini montate, condivisioni di rete, copie esportate).
+
+FleetCoordinator esegue il motore su un pool di processi, una destinazione per
+worker, così una pila di immagini raccolte può essere analizzata con tutti i
+core occupati. Ogni worker carica le firme una sola volta (dalla cache
+compilata) e scansiona la destinazione come radice unica, senza cache degli
+hash né indice del filesystem: le immagini vengono analizzate una volta sola.
+
+Le destinazioni sono copie di altre macchine, quindi per impostazione
+predefinita vengono eseguite le fasi dei file e del registro, letto offline
+dagli hive trovati nella destinazione (eleventools.offline): i processi in
+esecuzione sarebbero quelli della macchina che analizza.
+
+I risultati arrivano al chiamante man mano che le destinazioni terminano
+(TargetResult) e vengono riuniti in un unico FleetReport.
+"""
+import os
+import time
+import signal
+import logging
+import threading
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from eleventools import events
+from eleventools.cancel import CancelToken, CANCELLED, POLL_INTERVAL
+from eleventools.signatures import DEFAULT_DATABASE, DEFAULT_COMPILED_CACHE
+
+# Fasi eseguite su ogni destinazione
+DEFAULT_FLEET_PHASES = ("files", "registry")
+# Timeout della scansione di una singola destinazione, in secondi (None: nessun limite)
+DEFAULT_TARGET_TIME = None
+
+# Risultato di una destinazione: rilevamenti (events.Detection), durata, timeout, errore fatale,
+# annullamento, copertura delle fasi ed errori non fatali
+TargetResult = namedtuple("TargetResult", "target detections elapsed timed_out error cancelled coverage errors")
+
+# Stato del processo worker, impostato da _init_worker
+_worker = {}
+
+
+def _init_worker(signatures_path, cache_path, stop_event, log_level):
+    """Inizializza un processo del pool: firme, log e annullamento condiviso"""
+    # Ctrl+C arriva a tutto il gruppo di processi: l'annullamento passa solo dal coordinatore
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    logger = logging.getLogger("ElevenTools")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(processName)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(log_level)
+    logger.propagate = False
+
+    from eleventools.signatures import load_signatures
+    cancel = CancelToken()
+
+    def watch_stop():
+        stop_event.wait()
+        cancel.cancel(CANCELLED)
+
+    threading.Thread(target=watch_stop, name="FleetStop", daemon=True).start()
+    _worker.update(signatures=load_signatures(signatures_path, cache_path), cancel=cancel, logger=logger)
+
+
+def _scan_target(target, phases, max_scan_time):
+    """Scansiona una destinazione nel processo worker"""
+    from eleventools.engine import ScanEngine
+    from eleventools.offline import OfflineRegistry
+
+    detections = []
+    errors = []
+
+    def emit(event):
+        # Il motore non conserva i rilevamenti: il risultato della destinazione li raccoglie dagli eventi
+        if isinstance(event, events.Detection):
+            detections.append(event)
+        elif isinstance(event, events.ScanError):
+            errors.append(event.message)
+
+    registry = OfflineRegistry.from_image(target, _worker["logger"]) if "registry" in phases else None
+    try:
+        engine = ScanEngine(_worker["signatures"], scan_roots=[target], hash_cache_path=None,
+                            max_scan_time=max_scan_time, registry=registry, logger=_worker["logger"],
+                            fs_index_path=None, phases=phases)
+        finished = engine.run(emit, _worker["cancel"].child())
+    finally:
+        if registry is not None:
+            registry.close()
+    return TargetResult(target, detections, finished.elapsed, finished.timed_out, finished.error,
+                        finished.cancelled, finished.coverage, errors)
+
+
+def skipped_result(target, phases, error=None):
+    """Risultato di una destinazione non scansionata (annullata prima dell'avvio o non accessibile)"""
+    coverage = {phase: events.phase_coverage(events.COVERAGE_SKIPPED, "error" if error else CANCELLED)
+                for phase in phases}
+    return TargetResult(target, [], 0.0, False, error, error is None, coverage, [])
+
+
+class FleetReport:
+    """Risultati riuniti di tutte le destinazioni, nell'ordine in cui sono state indicate"""
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed
+
+    @property
+    def detections(self):
+        return [detection for result in self.results for detection in result.detections]
+
+    @property
+    def error(self):
+        failed = [result.target for result in self.results if result.error is not None]
+        return f"{len(failed)} destinazioni non scansionate: {', '.join(failed)}" if failed else None
+
+    @property
+    def timed_out(self):
+        return any(result.timed_out for result in self.results)
+
+    @property
+    def cancelled(self):
+        return any(result.cancelled for result in self.results)
+
+    def executors(self):
+        """Per ogni executor rilevato, le destinazioni in cui compare"""
+        found = {}
+        for result in self.results:
+            for detection in result.detections:
+                targets = found.setdefault(detection.executor, [])
+                if not targets or targets[-1] != result.target:
+                    targets.append(result.target)
+        return found
+
+
+class FleetCoordinator:
+    """Esegue la scansione di più destinazioni su un pool di processi, una destinazione per worker"""
+
+    def __init__(self, targets, max_workers=None, signatures_path=DEFAULT_DATABASE,
+                 cache_path=DEFAULT_COMPILED_CACHE, phases=DEFAULT_FLEET_PHASES,
+                 max_scan_time=DEFAULT_TARGET_TIME, logger=None):
+        self.targets = list(dict.fromkeys(os.path.abspath(target) for target in targets))
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.signatures_path = signatures_path
+        self.cache_path = cache_path
+        self.phases = tuple(phases)
+        self.max_scan_time = max_scan_time
+        self.logger = logger or logging.getLogger("ElevenTools")
+
+    def run(self, emit=None, cancel=None):
+        """Scansiona tutte le destinazioni; emit riceve ogni TargetResult appena pronto. Restituisce un FleetReport"""
+        start_time = time.time()
+        emit = emit or (lambda result: None)
+        cancel = cancel or CancelToken()
+        results = {}
+
+        def done(result):
+            results[result.target] = result
+            self.logger.info(f"Destinazione {result.target}: {len(result.detections)} rilevamenti "
+                             f"in {result.elapsed:.2f} secondi")
+            emit(result)
+
+        targets = []
+        for target in self.targets:
+            if os.path.isdir(target):
+                targets.append(target)
+            else:
+                done(skipped_result(target, self.phases, f"Destinazione non trovata: {target}"))
+
+        # spawn anche su Linux: i worker non ereditano i thread e i lock del processo principale
+        context = multiprocessing.get_context("spawn")
+        stop_event = context.Event()
+        workers = max(1, min(self.max_workers, len(targets)))
+        self.logger.info(f"Avvio scansione di {len(targets)} destinazioni con {workers} processi")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(self.signatures_path, self.cache_path, stop_event,
+                                           self.logger.getEffectiveLevel())) as pool:
+            pending = {pool.submit(_scan_target, target, self.phases, self.max_scan_time): target
+                       for target in targets}
+            while pending:
+                finished, _ = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    target = pending.pop(future)
+                    if future.cancelled():
+                        done(skipped_result(target, self.phases))
+                        continue
+                    try:
+                        done(future.result())
+                    except Exception as e:
+                        self.logger.error(f"Errore durante la scansione di {target}: {str(e)}")
+                        done(skipped_result(target, self.phases, str(e)))
+                if cancel.cancelled and not stop_event.is_set():
+                    # Le destinazioni in corso terminano con i risultati parziali, quelle in coda non partono
+                    self.logger.warning("Scansione delle destinazioni annullata")
+                    stop_event.set()
+                    for future in pending:
+                        future.cancel()
+
+        report = FleetReport([results[target] for target in self.targets], time.time() - start_time)
+        self.logger.info(f"Scansione di {len(self.targets)} destinazioni completata in {report.elapsed:.2f} secondi: "
+                         f"{len(report.detections)} rilevamenti")
+        return report
@@ -0,0 +1,21 @@
+"""Testi dei rilevamenti per l'interfaccia, la riga di comando e il log.
+
+I rilevamenti (events.Detection) contengono solo dati: il testo viene
+composto qui, al momento di mostrarlo, a partire dal tipo di prova.
+"""
+from eleventools import events
+
+DETECTION_FORMATS = {
+    events.EVIDENCE_FILE: "File di {executor} trovato: {location}",
+    events.EVIDENCE_FOLDER: "Cartella di {executor} trovata: {location}",
+    events.EVIDENCE_HASH: "Hash di {executor} corrispondente ({signature}): {location}",
+    events.EVIDENCE_PROCESS: "Processo di {executor} in esecuzione: {location}",
+    events.EVIDENCE_REGISTRY_KEY: "Chiave di registro per {executor} trovata: {location}",
+    events.EVIDENCE_REGISTRY_TRACE: "Riferimento a {executor} trovato nel registro: {location}",
+}
+
+
+def detection_text(detection):
+    """Testo di un rilevamento, come mostrato all'utente"""
+    template = DETECTION_FORMATS.get(detection.kind, "{executor}: {location}")
+    return template.format(executor=detection.executor, location=detection.location, signature=detection.signature)
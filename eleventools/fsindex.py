@@ -0,0 +1,159 @@
+"""Indice persistente del filesystem per le scansioni incrementali.
+
+Per ogni cartella visitata vengono salvati su SQLite l'mtime, il numero di voci
+e i nomi delle sole voci che servono alla scansione: le sottocartelle e i file
+che il chiamante ha ritenuto interessanti (corrispondenze per nome e candidati
+all'hashing). Alla scansione successiva, se l'mtime di una cartella non è
+cambiato, le sue voci non vengono rilette: si riprendono quelle salvate e si
+scende comunque nelle sottocartelle, il cui mtime viene controllato a sua volta.
+
+L'mtime di una cartella cambia quando vi si aggiungono, rimuovono o rinominano
+voci, non quando un file esistente viene modificato. I file salvati vengono
+comunque ricontrollati (dimensione, mtime e cache degli hash), mentre un file
+non interessante sovrascritto sul posto viene notato solo alla prima modifica
+della cartella. L'indice è legato all'impronta delle firme: se le firme
+cambiano viene svuotato e la scansione successiva riparte da zero.
+
+La memoria usata non dipende dal numero di cartelle: ogni ricerca è una
+query sulla chiave primaria e le cartelle lette vengono scritte a blocchi di
+WRITE_BATCH. Ogni cartella vista viene marcata con il numero della visita, così
+a fine visita quelle non più presenti si rimuovono con una sola DELETE.
+"""
+import os
+import logging
+import threading
+from collections import namedtuple
+
+# Versione dello schema delle tabelle: va incrementata se cambia il formato delle voci salvate
+SCHEMA_VERSION = 2
+# Cartelle lette o riprese accumulate prima di una scrittura su SQLite
+WRITE_BATCH = 1000
+
+DirRecord = namedtuple("DirRecord", "mtime entry_count entries")
+
+
+def encode_entries(entries):
+    """Codifica [(nome, è_cartella)] in un'unica stringa: il carattere NUL non può comparire nei nomi"""
+    return "\0".join(("d" if is_dir else "f") + name for name, is_dir in entries)
+
+
+def decode_entries(text):
+    return [(item[1:], item[0] == "d") for item in text.split("\0")] if text else []
+
+
+class IndexedEntry:
+    """Voce ripresa dall'indice, con la stessa interfaccia di os.DirEntry usata dalla scansione"""
+
+    __slots__ = ("name", "path", "_is_dir", "_stat")
+
+    def __init__(self, parent, name, is_dir):
+        self.name = name
+        self.path = os.path.join(parent, name)
+        self._is_dir = is_dir
+        self._stat = None
+
+    def is_dir(self, follow_symlinks=True):
+        return self._is_dir
+
+    def is_file(self, follow_symlinks=True):
+        return not self._is_dir
+
+    def is_symlink(self):
+        return False
+
+    def stat(self, follow_symlinks=True):
+        if self._stat is None:
+            self._stat = os.stat(self.path, follow_symlinks=follow_symlinks)
+        return self._stat
+
+    def __fspath__(self):
+        return self.path
+
+    def __repr__(self):
+        return f"<IndexedEntry '{self.name}'>"
+
+
+class FsIndex:
+    """Cartelle visitate nelle scansioni precedenti: percorso -> (mtime, numero di voci, voci salvate).
+
+    Le ricerche arrivano dai thread della visita: la connessione è condivisa e
+    protetta da un lock. Le modifiche vengono scritte a blocchi e da save().
+    """
+
+    def __init__(self, path, fingerprint, logger=None):
+        import sqlite3
+
+        self.path = path
+        self.logger = logger or logging.getLogger("ElevenTools")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._updates = []
+        self._touched = []
+
+        expected = {"schema": str(SCHEMA_VERSION), "fingerprint": fingerprint}
+        stored = dict(self._conn.execute("SELECT key, value FROM meta"))
+        with self._conn:
+            if any(stored.get(key) != value for key, value in expected.items()):
+                if stored:
+                    self.logger.info("Firme o formato dell'indice cambiati: l'indice del filesystem viene ricostruito")
+                self._conn.execute("DROP TABLE IF EXISTS dirs")
+                self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", expected.items())
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime INTEGER NOT NULL, "
+                "entry_count INTEGER NOT NULL, entries TEXT NOT NULL, visit INTEGER NOT NULL)"
+            )
+            # Numero di questa visita: le cartelle marcate con un numero precedente non sono state viste
+            self._visit = int(stored.get("visit", 0)) + 1
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('visit', ?)", (str(self._visit),))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+
+    def lookup(self, path, mtime):
+        """Restituisce il DirRecord della cartella se l'mtime non è cambiato, altrimenti None"""
+        with self._lock:
+            row = self._conn.execute("SELECT mtime, entry_count, entries FROM dirs WHERE path = ?",
+                                     (path,)).fetchone()
+            if row is None or row[0] != mtime:
+                return None
+            self._touched.append((self._visit, path))
+            if len(self._touched) >= WRITE_BATCH:
+                self._flush()
+        return DirRecord(*row)
+
+    def record(self, path, mtime, entry_count, entries):
+        """Memorizza il contenuto di una cartella appena letta; [(nome, è_cartella)]"""
+        update = (path, mtime, entry_count, encode_entries(entries), self._visit)
+        with self._lock:
+            self._updates.append(update)
+            if len(self._updates) >= WRITE_BATCH:
+                self._flush()
+
+    def _flush(self):
+        # Chiamata con il lock già preso
+        with self._conn:
+            if self._updates:
+                self._conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?)", self._updates)
+            if self._touched:
+                self._conn.executemany("UPDATE dirs SET visit = ? WHERE path = ?", self._touched)
+        self._updates = []
+        self._touched = []
+
+    def save(self, roots=None, complete=False):
+        """Scrive le cartelle rimaste e, se la visita è stata completa, rimuove quelle non più presenti sotto le radici"""
+        with self._lock:
+            self._flush()
+            if not complete:
+                return
+            with self._conn:
+                for root in roots or ():
+                    prefix = root.rstrip(os.sep) + os.sep
+                    self._conn.execute(
+                        "DELETE FROM dirs WHERE visit != ? AND (path = ? OR substr(path, 1, ?) = ?)",
+                        (self._visit, root, len(prefix), prefix))
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,260 @@
+"""Fase di hashing dei file con prefiltro per dimensione e cache su disco.
+
+Solo i file che potrebbero corrispondere a una firma vengono letti:
+- file con una dimensione uguale a quella di una firma hash nota;
+- file già riconosciuti per nome, se l'executor ha firme hash senza dimensione.
+I file vuoti non vengono mai letti: il database non accetta l'MD5 di un file
+vuoto, quindi non possono corrispondere a nessuna firma.
+
+Le letture avvengono a blocchi grandi in un buffer riutilizzato per thread e
+i digest calcolati vengono salvati in una cache SQLite indicizzata per
+(percorso, dimensione, mtime), così i file non modificati non vengono riletti.
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from eleventools.cancel import ScanCancelled
+
+# Dimensione dei blocchi letti dal disco
+CHUNK_SIZE = 1024 * 1024
+
+
+def parse_hash_signature(signature):
+    """Restituisce (md5, dimensione) da una firma stringa o dizionario {"md5", "size"}"""
+    if isinstance(signature, dict):
+        size = signature.get("size")
+        return signature["md5"].lower(), int(size) if size is not None else None
+    return signature.lower(), None
+
+
+class HashIndex:
+    """Indice delle firme hash del database"""
+
+    def __init__(self, executors_db=None):
+        # Digest -> nomi degli executor con quella firma
+        self.digests = {}
+        self.sizes = set()
+        # Executor con almeno una firma hash di dimensione sconosciuta
+        self.unsized_executors = set()
+
+        for executor_name, executor_data in (executors_db or {}).items():
+            for signature in executor_data.get("hashes", []):
+                digest, size = parse_hash_signature(signature)
+                self.digests[digest] = self.digests.get(digest, ()) + (executor_name,)
+                if size is None:
+                    self.unsized_executors.add(executor_name)
+                else:
+                    self.sizes.add(size)
+
+    def to_state(self):
+        return self.digests, tuple(self.sizes), tuple(self.unsized_executors)
+
+    @classmethod
+    def from_state(cls, state):
+        index = cls()
+        digests, sizes, unsized = state
+        index.digests = digests
+        index.sizes = set(sizes)
+        index.unsized_executors = set(unsized)
+        return index
+
+    def lookup(self, digest):
+        """Executor la cui firma corrisponde al digest"""
+        return [(executor_name, digest) for executor_name in self.digests.get(digest, ())]
+
+
+class HashCache:
+    """Cache persistente (percorso, dimensione, mtime) -> digest su SQLite"""
+
+    def __init__(self, path):
+        import sqlite3
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime INTEGER NOT NULL, digest TEXT NOT NULL)"
+        )
+        self._pending = []
+
+    def get(self, path, size, mtime):
+        row = self._conn.execute("SELECT size, mtime, digest FROM hashes WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == size and row[1] == mtime:
+            return row[2]
+        return None
+
+    def put(self, path, size, mtime, digest):
+        self._pending.append((path, size, mtime, digest))
+
+    def flush(self):
+        if self._pending:
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)", self._pending)
+            self._pending = []
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+class HashStats:
+    """Contatori della fase di hashing"""
+
+    __slots__ = ("files_hashed", "bytes_hashed", "cache_hits", "cache_lookups", "errors", "files_abandoned",
+                 "read_seconds")
+
+    def __init__(self):
+        self.files_hashed = 0
+        self.bytes_hashed = 0
+        self.cache_hits = 0
+        self.cache_lookups = 0
+        # Somma dei tempi di lettura e calcolo degli hash nei thread del pool
+        self.read_seconds = 0.0
+        self.errors = 0
+        # Candidati non verificati perché la scansione è stata interrotta
+        self.files_abandoned = 0
+
+
+class HashStage:
+    """Calcola in un pool di thread gli MD5 dei file candidati e li confronta con le firme.
+
+    Uso: consider() per ogni file visitato, poll() durante la scansione per
+    raccogliere i risultati pronti e finish() alla fine per attendere gli ultimi.
+    Ogni risultato è una tupla (percorso, digest, corrispondenze).
+
+    Con un token di annullamento le letture si interrompono tra un blocco e
+    l'altro e finish() scarta i file ancora in coda.
+    """
+
+    def __init__(self, index, cache_path=None, max_workers=4, chunk_size=CHUNK_SIZE, logger=None, cancel=None):
+        self.index = index
+        self.cancel = cancel
+        self.cache = HashCache(cache_path) if cache_path else None
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.logger = logger or logging.getLogger("ElevenTools")
+        self.stats = HashStats()
+        self._local = threading.local()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hasher")
+        self._futures = set()
+        self._ready = deque()
+
+    @property
+    def enabled(self):
+        return bool(self.index.digests)
+
+    def _buffer(self):
+        buf = getattr(self._local, "buffer", None)
+        if buf is None:
+            buf = self._local.buffer = bytearray(self.chunk_size)
+        return buf
+
+    def _hash_file(self, path, size, mtime):
+        """Legge il file a blocchi nel buffer del thread e restituisce l'MD5"""
+        # Importato al primo file letto: le scansioni senza candidati all'hashing non lo caricano
+        import hashlib
+
+        started = time.perf_counter()
+        buf = self._buffer()
+        view = memoryview(buf)
+        digest = hashlib.md5()
+        read = 0
+        with open(path, "rb", buffering=0) as f:
+            while True:
+                if self.cancel is not None:
+                    self.cancel.check()
+                n = f.readinto(buf)
+                if not n:
+                    break
+                digest.update(view[:n])
+                read += n
+        return path, size, mtime, digest.hexdigest(), read, time.perf_counter() - started
+
+    def _candidate_stat(self, entry, name_matches):
+        """stat del file se è un candidato all'hashing, altrimenti None"""
+        if not self.enabled:
+            return None
+        by_name = any(executor_name in self.index.unsized_executors for executor_name, _ in name_matches)
+        if not by_name and not self.index.sizes:
+            return None
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            return None
+        if not st.st_size:
+            return None
+        if not by_name and st.st_size not in self.index.sizes:
+            return None
+        return st
+
+    def wants(self, entry, name_matches=()):
+        """Indica se il file verrebbe letto; non modifica lo stato e si può chiamare da qualsiasi thread"""
+        return self._candidate_stat(entry, name_matches) is not None
+
+    def consider(self, entry, name_matches=()):
+        """Valuta un file visitato e, se è un candidato, ne pianifica l'hashing"""
+        st = self._candidate_stat(entry, name_matches)
+        if st is None:
+            return
+
+        mtime = st.st_mtime_ns
+        if self.cache:
+            self.stats.cache_lookups += 1
+            digest = self.cache.get(entry.path, st.st_size, mtime)
+            if digest is not None:
+                self.stats.cache_hits += 1
+                self._ready.append((entry.path, digest, self.index.lookup(digest)))
+                return
+
+        # Evita di accumulare troppi file in attesa rispetto ai thread disponibili
+        if len(self._futures) >= self.max_workers * 4:
+            self._collect(wait(self._futures, return_when=FIRST_COMPLETED).done)
+        self._futures.add(self._pool.submit(self._hash_file, entry.path, st.st_size, mtime))
+
+    def _collect(self, done):
+        for future in done:
+            self._futures.discard(future)
+            if future.cancelled():
+                self.stats.files_abandoned += 1
+                continue
+            try:
+                path, size, mtime, digest, read, seconds = future.result()
+            except ScanCancelled:
+                self.stats.files_abandoned += 1
+                continue
+            except OSError as e:
+                self.stats.errors += 1
+                self.logger.debug(f"Impossibile calcolare l'hash: {str(e)}")
+                continue
+            self.stats.files_hashed += 1
+            self.stats.bytes_hashed += read
+            self.stats.read_seconds += seconds
+            if self.cache:
+                self.cache.put(path, size, mtime, digest)
+            self._ready.append((path, digest, self.index.lookup(digest)))
+
+    def poll(self):
+        """Restituisce i risultati già disponibili senza bloccare"""
+        self._collect([f for f in self._futures if f.done()])
+        while self._ready:
+            yield self._ready.popleft()
+
+    def finish(self):
+        """Attende gli hash in corso, restituisce gli ultimi risultati e salva la cache"""
+        try:
+            if self.cancel is not None and self.cancel.cancelled:
+                # Scansione interrotta: i file non ancora iniziati non vengono letti
+                for future in self._futures:
+                    future.cancel()
+            if self._futures:
+                self._collect(wait(self._futures).done)
+            while self._ready:
+                yield self._ready.popleft()
+        finally:
+            self._pool.shutdown(wait=True)
+            if self.cache:
+                self.cache.close()
@@ -0,0 +1,150 @@
+"""Log su file senza bloccare la scansione, con rotazione e conservazione limitata.
+
+I thread della scansione non scrivono mai sul disco: start_logging() collega
+al logger un QueueHandler che si limita ad accodare i record, e un
+QueueListener in un thread dedicato li passa ai gestori veri. Il file di log
+(logs/eleventools.log) viene ruotato quando supera MAX_LOG_BYTES o quando
+cambia il giorno, ne vengono tenute al più LOG_BACKUPS copie e all'avvio
+vengono cancellati i log e le trascrizioni dei risultati più vecchi di
+RETENTION_DAYS giorni, compresi i log per avvio (scan_*.log) delle versioni
+precedenti.
+
+DetectionLog regola quanti rilevamenti finiscono nel log uno per uno: oltre
+il limite viene scritto solo quanti ne sono stati tralasciati.
+"""
+import os
+import time
+import fnmatch
+import logging
+import threading
+from datetime import date
+
+from eleventools.formatting import detection_text
+
+DEFAULT_LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+LOG_FILE = "eleventools.log"
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 10
+RETENTION_DAYS = 14
+# File cancellati dalla pulizia: le copie ruotate, le trascrizioni dei risultati dell'interfaccia grafica
+# e i log per avvio delle versioni precedenti
+_PRUNED = (f"{LOG_FILE}.*", "risultati_*.txt", "scan_*.log")
+
+# Variabile d'ambiente con il numero massimo di rilevamenti scritti uno per uno (anche per l'interfaccia grafica)
+DETECTION_LOG_ENV_VAR = "ELEVENTOOLS_DETECTION_LOG"
+
+
+def default_detection_log_limit():
+    """Limite dalla variabile d'ambiente; None (tutti i rilevamenti) se assente o non valido"""
+    value = os.environ.get(DETECTION_LOG_ENV_VAR, "").strip()
+    return int(value) if value.isdigit() else None
+
+
+class DetectionLog:
+    """Scrive nel log i rilevamenti uno per uno fino a limit (None: tutti), poi solo quanti ne mancano"""
+
+    def __init__(self, logger, limit=None):
+        self.logger = logger
+        self.limit = limit
+        self.seen = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, detection):
+        with self._lock:
+            self.seen += 1
+            seen = self.seen
+        if self.limit is None or seen <= self.limit:
+            self.logger.warning(detection_text(detection))
+
+    def flush(self):
+        """Riporta i rilevamenti tralasciati e riparte da zero (a fine scansione o a ogni giro della sorveglianza)"""
+        with self._lock:
+            seen, self.seen = self.seen, 0
+        if self.limit is not None and seen > self.limit:
+            self.logger.warning(f"Altri {seen - self.limit} rilevamenti non riportati singolarmente nel log "
+                                f"(limite {self.limit})")
+
+
+def prune_logs(log_dir, retention_days=RETENTION_DAYS):
+    """Cancella i log più vecchi di retention_days giorni; restituisce quanti ne sono stati cancellati"""
+    cutoff = time.time() - retention_days * 86400
+    removed = 0
+    try:
+        names = os.listdir(log_dir)
+    except OSError:
+        return 0
+    for name in names:
+        if not any(fnmatch.fnmatch(name, pattern) for pattern in _PRUNED):
+            continue
+        path = os.path.join(log_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def file_handler(log_dir=DEFAULT_LOG_DIR, max_bytes=MAX_LOG_BYTES, backups=LOG_BACKUPS, level=logging.DEBUG):
+    """Gestore del file di log con rotazione per dimensione e per giorno"""
+    from logging.handlers import RotatingFileHandler
+
+    class DailyRotatingFileHandler(RotatingFileHandler):
+        """Ruota il file anche al primo record di un giorno diverso da quello dell'ultima scrittura"""
+
+        def __init__(self, path):
+            super().__init__(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+            try:
+                self._day = date.fromtimestamp(os.path.getmtime(path))
+            except OSError:
+                self._day = date.today()
+
+        def shouldRollover(self, record):
+            if date.today() != self._day and os.path.exists(self.baseFilename):
+                return True
+            return super().shouldRollover(record)
+
+        def doRollover(self):
+            super().doRollover()
+            self._day = date.today()
+
+    os.makedirs(log_dir, exist_ok=True)
+    handler = DailyRotatingFileHandler(os.path.join(log_dir, LOG_FILE))
+    handler.setLevel(level)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+class LogPipeline:
+    """Coda tra il logger e i suoi gestori; stop() scrive i record rimasti e chiude i gestori"""
+
+    def __init__(self, logger, handlers):
+        import queue
+        from logging.handlers import QueueHandler, QueueListener
+
+        self.logger = logger
+        self.handlers = handlers
+        self.queue_handler = QueueHandler(queue.SimpleQueue())
+        self.listener = QueueListener(self.queue_handler.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        logger.addHandler(self.queue_handler)
+
+    def stop(self):
+        if self.listener is None:
+            return
+        self.logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+        self.listener = None
+        for handler in self.handlers:
+            handler.close()
+
+
+def start_logging(logger, handlers):
+    """Collega i gestori al logger attraverso la coda; la coda viene svuotata anche all'uscita del programma"""
+    import atexit
+
+    pipeline = LogPipeline(logger, handlers)
+    atexit.register(pipeline.stop)
+    return pipeline
@@ -0,0 +1,322 @@
+"""Matcher precompilato delle firme degli executor.
+
+Tutte le firme del database (file, cartelle, processi, pattern e chiavi di
+registro) vengono compilate una sola volta in strutture che permettono di
+confrontare un nome con l'intero database in un'unica ricerca:
+
+- un dizionario con i nomi esatti in minuscolo per ogni tipo di firma;
+- un indice di sottostringhe ancorato sui primi caratteri di ogni firma;
+- i pattern regex indicizzati tramite il loro prefisso letterale, così solo i
+  pattern il cui prefisso compare nel nome vengono effettivamente eseguiti.
+
+Il costo di una ricerca dipende dalla lunghezza del nome e dal numero di
+corrispondenze, non dal numero di executor nel database. Le strutture sono
+semplici dizionari e tuple piatte, quindi la forma compilata si salva e si
+ricarica con marshal in pochi millisecondi (vedi eleventools.signatures).
+"""
+import os
+import re
+
+# Caratteri che interrompono il prefisso letterale di un pattern
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+# Lunghezza dell'ancora usata dall'indice delle sottostringhe
+GRAM = 4
+
+
+class SubstringIndex:
+    """Trova tutte le parole note contenute in un testo.
+
+    Ogni parola è indicizzata con una sola delle sue sottostringhe di GRAM
+    caratteri, scelta tra le meno comuni nel database: per ogni posizione del
+    testo basta una ricerca nel dizionario e un confronto con le poche parole
+    ancorate a quella sottostringa, anche quando molte firme iniziano allo
+    stesso modo. Le parole più corte di GRAM caratteri (rare) vengono
+    confrontate direttamente.
+
+    Le voci sono memorizzate come tuple piatte (parola, posizione dell'ancora,
+    executor, firma, ...) per ridurre il numero di oggetti da ricaricare dalla
+    cache.
+    """
+
+    __slots__ = ("_grams", "_short")
+
+    def __init__(self, grams=None, short=()):
+        self._grams = grams if grams is not None else {}
+        self._short = short
+
+    @classmethod
+    def build(cls, entries):
+        """Crea l'indice da (parola in minuscolo, executor, firma)"""
+        entries = [entry for entry in entries if entry[0]]
+        frequency = {}
+        for word, _, _ in entries:
+            for gram in {word[i:i + GRAM] for i in range(len(word) - GRAM + 1)}:
+                frequency[gram] = frequency.get(gram, 0) + 1
+
+        grams = {}
+        short = []
+        for word, executor_name, signature in entries:
+            if len(word) < GRAM:
+                short.extend((word, executor_name, signature))
+                continue
+            offset = min(range(len(word) - GRAM + 1), key=lambda i: frequency[word[i:i + GRAM]])
+            grams.setdefault(word[offset:offset + GRAM], []).extend((word, offset, executor_name, signature))
+        return cls({gram: tuple(bucket) for gram, bucket in grams.items()}, tuple(short))
+
+    def to_state(self):
+        return self._grams, self._short
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(*state)
+
+    def search(self, text, whole_words=False):
+        """Restituisce (executor, firma) di tutte le parole contenute nel testo.
+
+        Con whole_words la parola deve essere delimitata da caratteri non
+        alfanumerici (spazi, separatori dei percorsi, punteggiatura) o dai
+        bordi del testo: "sona" non viene trovata in "personal".
+        """
+        grams = self._grams
+        found = []
+        for i in range(len(text) - GRAM + 1):
+            bucket = grams.get(text[i:i + GRAM])
+            if bucket:
+                for j in range(0, len(bucket), 4):
+                    start = i - bucket[j + 1]
+                    word = bucket[j]
+                    if start >= 0 and text.startswith(word, start) and (
+                            not whole_words or _bounded(text, start, start + len(word))):
+                        found.append((bucket[j + 2], bucket[j + 3]))
+        short = self._short
+        for j in range(0, len(short), 3):
+            word = short[j]
+            start = text.find(word)
+            while start >= 0 and whole_words and not _bounded(text, start, start + len(word)):
+                start = text.find(word, start + 1)
+            if start >= 0:
+                found.append((short[j + 1], short[j + 2]))
+        return found
+
+
+def _bounded(text, start, end):
+    return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+def distinctive_name(name):
+    """Indica se il nome di un executor è riconoscibile anche nel testo libero.
+
+    Una sola parola comune scritta normalmente (Comet, Delta, Electron) compare
+    anche nei nomi di programmi e documenti qualsiasi; sono invece riconoscibili
+    i nomi di più parole (Synapse X), con cifre (Sk8r) o con maiuscole interne
+    (KRNL, ScriptWare).
+    """
+    return any(ch.isspace() or ch.isdigit() for ch in name) or any(ch.isupper() for ch in name[1:])
+
+
+def _has_alternation(pattern):
+    """Indica se il pattern contiene un'alternativa (|) non preceduta da escape"""
+    i = 0
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+            continue
+        if pattern[i] == "|":
+            return True
+        i += 1
+    return False
+
+
+def literal_prefix(pattern):
+    """Estrae il prefisso letterale iniziale di un pattern regex (in minuscolo).
+
+    Con un'alternativa il prefisso vale solo per il primo ramo: viene restituita
+    la stringa vuota, così il pattern viene provato su ogni nome.
+    """
+    if _has_alternation(pattern):
+        return ""
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            # Escape di un carattere non alfanumerico: è un letterale
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                prefix.append(pattern[i + 1])
+                i += 2
+                continue
+            break
+        if ch in _REGEX_META:
+            # Un quantificatore rende opzionale l'ultimo carattere letto
+            if ch in "*?{" and prefix:
+                prefix.pop()
+            break
+        prefix.append(ch)
+        i += 1
+    return "".join(prefix).lower()
+
+
+def unique_matches(matches):
+    """Rimuove le corrispondenze duplicate dello stesso executor mantenendo l'ordine"""
+    seen = set()
+    result = []
+    for executor_name, signature in matches:
+        if executor_name not in seen:
+            seen.add(executor_name)
+            result.append((executor_name, signature))
+    return result
+
+
+class SignatureMatcher:
+    """Confronta nomi di file, cartelle, processi e testi con tutte le firme del database"""
+
+    # Attributi salvati nella forma compilata
+    _STATE = ("executor_count", "_files", "_folders", "_processes", "_names", "_unindexed_patterns",
+              "registry_keys")
+    _INDEXES = ("_process_substrings", "_text_substrings", "_pattern_index")
+
+    def __init__(self, executors_db=None):
+        self.executor_count = 0
+        # Nome esatto in minuscolo -> (executor, firma, executor, firma, ...)
+        self._files = {}
+        self._folders = {}
+        self._processes = {}
+        # Nomi di executor poco riconoscibili, trovati nel testo libero solo come testo intero
+        self._names = {}
+        self._process_substrings = SubstringIndex()
+        self._text_substrings = SubstringIndex()
+        self._pattern_index = SubstringIndex()
+        self._unindexed_patterns = ()
+        # Regex compilate al primo uso, per non pagarne la compilazione all'avvio
+        self._regex_cache = {}
+        # Chiavi di registro degli executor raggruppate per chiave padre: padre -> {figlia: (executor, firma, ...)}
+        self.registry_keys = {}
+        if executors_db:
+            self._compile(executors_db)
+
+    def _compile(self, executors_db):
+        # Le voci vengono raccolte in liste e convertite in tuple alla fine
+        files, folders, processes, names, registry_keys = {}, {}, {}, {}, {}
+        process_words, text_words, pattern_prefixes, unindexed = [], [], [], []
+
+        for executor_name, executor_data in executors_db.items():
+            self.executor_count += 1
+            for file in executor_data.get("files", []):
+                self._add(files, os.path.basename(file.replace("\\", "/")), executor_name)
+            for folder in executor_data.get("folders", []):
+                self._add(folders, folder, executor_name)
+            for process in executor_data.get("processes", []):
+                self._add(processes, process, executor_name)
+                process_words.append((process.lower(), executor_name, process))
+            for pattern in executor_data.get("patterns", []):
+                prefix = literal_prefix(pattern)
+                if len(prefix) >= GRAM:
+                    pattern_prefixes.append((prefix, executor_name, pattern))
+                else:
+                    unindexed.extend((executor_name, pattern))
+            for reg_path in executor_data.get("registry", []):
+                parts = [part for part in reg_path.replace("/", "\\").split("\\") if part]
+                if parts:
+                    parent = "\\".join(parts[:-1])
+                    children = registry_keys.setdefault(parent.lower(), {})
+                    self._add(children, parts[-1], executor_name, "\\".join(parts))
+
+            # Riferimenti testuali (ad esempio valori di registro): nomi dei suoi eseguibili e, se riconoscibile,
+            # nome dell'executor
+            words = {executor_name} if distinctive_name(executor_name) else set()
+            if not words:
+                self._add(names, executor_name, executor_name)
+            words.update(executor_data.get("processes", []))
+            words.update(os.path.basename(file.replace("\\", "/")) for file in executor_data.get("files", []))
+            text_words.extend((word.lower(), executor_name, word) for word in sorted(words))
+
+        self._files = self._freeze(files)
+        self._folders = self._freeze(folders)
+        self._processes = self._freeze(processes)
+        self._names = self._freeze(names)
+        self.registry_keys = {parent: self._freeze(children) for parent, children in registry_keys.items()}
+        self._process_substrings = SubstringIndex.build(process_words)
+        self._text_substrings = SubstringIndex.build(text_words)
+        self._pattern_index = SubstringIndex.build(pattern_prefixes)
+        self._unindexed_patterns = tuple(unindexed)
+
+    def to_state(self):
+        """Forma compilata composta solo da tipi predefiniti (dict, tuple, str, int)"""
+        state = {name: getattr(self, name) for name in self._STATE}
+        state.update((name, getattr(self, name).to_state()) for name in self._INDEXES)
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        matcher = cls()
+        for name in cls._STATE:
+            setattr(matcher, name, state[name])
+        for name in cls._INDEXES:
+            setattr(matcher, name, SubstringIndex.from_state(state[name]))
+        return matcher
+
+    @staticmethod
+    def _add(index, signature, executor_name, stored_signature=None):
+        index.setdefault(signature.lower(), []).extend((executor_name, stored_signature or signature))
+
+    @staticmethod
+    def _freeze(index):
+        return {key: tuple(flat) for key, flat in index.items()}
+
+    @staticmethod
+    def _pairs(flat):
+        return [(flat[i], flat[i + 1]) for i in range(0, len(flat), 2)]
+
+    def registry_children(self, parent):
+        """Sottochiavi note della chiave padre: nome in minuscolo -> [(executor, firma)]"""
+        return {name: self._pairs(flat) for name, flat in self.registry_keys.get(parent, {}).items()}
+
+    def _regex(self, pattern):
+        regex = self._regex_cache.get(pattern)
+        if regex is None:
+            regex = self._regex_cache[pattern] = re.compile(pattern, re.IGNORECASE)
+        return regex
+
+    def _match_patterns(self, name):
+        candidates = self._pattern_index.search(name.lower()) + self._pairs(self._unindexed_patterns)
+        matches = []
+        for executor_name, pattern in candidates:
+            if self._regex(pattern).fullmatch(name):
+                matches.append((executor_name, pattern))
+        return matches
+
+    def match_file(self, name):
+        """Executor a cui corrisponde un nome di file (nome esatto o pattern)"""
+        matches = self._pairs(self._files.get(name.lower(), ()))
+        matches.extend(self._match_patterns(name))
+        return unique_matches(matches)
+
+    def match_folder(self, name):
+        """Executor a cui corrisponde un nome di cartella"""
+        return unique_matches(self._pairs(self._folders.get(name.lower(), ())))
+
+    def match_process(self, name):
+        """Executor a cui corrisponde un processo (nome esatto o contenuto nel nome)"""
+        lowered = name.lower()
+        matches = self._pairs(self._processes.get(lowered, ()))
+        matches.extend(self._process_substrings.search(lowered))
+        return unique_matches(matches)
+
+    def match_text(self, text):
+        """Executor citati in un testo libero, ad esempio il nome o il dato di un valore di registro.
+
+        Le firme vanno trovate come parole intere: "krnl.exe" in "C:\\Giochi\\krnl.exe,0" sì, "Delta" in
+        "Deltarune" no. I nomi di executor poco riconoscibili (vedi distinctive_name) contano solo se
+        occupano un'intera riga del testo, come il nome visualizzato di un programma installato.
+        """
+        lowered = text.lower()
+        matches = self._text_substrings.search(lowered, whole_words=True)
+        if self._names:
+            for line in lowered.split("\n"):
+                line = line.strip()
+                # Sottochiavi di disinstallazione create da Inno Setup: "<nome>_is1"
+                if line.endswith("_is1"):
+                    line = line[:-4]
+                matches.extend(self._pairs(self._names.get(line, ())))
+        return unique_matches(matches)
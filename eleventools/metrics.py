@@ -0,0 +1,216 @@
+"""Metriche delle scansioni: tempi e contatori per fase e per radice, profilazione opzionale.
+
+ScanMetrics raccoglie durante la scansione il tempo di ogni fase e i suoi
+contatori (cartelle e voci visitate, byte letti, chiavi di registro, chiamate
+al matcher, uso delle cache); as_dict() produce il riepilogo strutturato che
+il motore pubblica in ScanFinished.metrics. write_metrics_file() salva lo
+stesso riepilogo nel formato testuale di Prometheus, adatto al textfile
+collector di node_exporter o a qualsiasi strumento che legga quel formato.
+
+Profiler attiva su richiesta cProfile in tutti i thread della scansione e
+tracemalloc, e ne riassume i risultati nel riepilogo.
+"""
+import os
+import sys
+import time
+import threading
+
+# Variabili d'ambiente con il file delle metriche e il file del profilo (anche per l'interfaccia grafica)
+METRICS_ENV_VAR = "ELEVENTOOLS_METRICS_FILE"
+PROFILE_ENV_VAR = "ELEVENTOOLS_PROFILE"
+
+# Da Python 3.12 cProfile usa sys.monitoring, che vale per tutto il processo: un solo profilo vede tutti i thread
+# e un secondo profilo attivo non è ammesso
+_PROCESS_WIDE_PROFILE = sys.version_info >= (3, 12)
+
+# Righe dei profili riportate nel riepilogo
+PROFILE_TOP = 15
+
+_PREFIX = "eleventools"
+
+
+def default_metrics_path():
+    return os.environ.get(METRICS_ENV_VAR) or None
+
+
+def default_profile_path():
+    return os.environ.get(PROFILE_ENV_VAR) or None
+
+
+def hit_rate(hits, total):
+    """Frazione di successi di una cache, None se non è stata consultata"""
+    return round(hits / total, 4) if total else None
+
+
+class ScanMetrics:
+    """Metriche di una scansione; ogni fase scrive solo nel proprio dizionario"""
+
+    def __init__(self, budget=None):
+        # Tempo massimo della scansione, per la quota usata da ogni fase
+        self.budget = budget
+        self.elapsed = None
+        self.phases = {}
+        self.roots = []
+        self.profile = None
+        self._lock = threading.Lock()
+
+    def phase(self, name):
+        with self._lock:
+            return self.phases.setdefault(name, {})
+
+    def as_dict(self):
+        phases = {}
+        for name, values in self.phases.items():
+            phase = dict(values)
+            if self.budget and "seconds" in phase:
+                phase["budget_share"] = round(phase["seconds"] / self.budget, 4)
+            phases[name] = phase
+        summary = {
+            "elapsed": round(self.elapsed, 4) if self.elapsed is not None else None,
+            "budget": self.budget,
+            "phases": phases,
+            "roots": self.roots,
+        }
+        if self.profile:
+            summary.update(self.profile)
+        return summary
+
+
+class Profiler:
+    """cProfile su tutti i thread avviati durante la misura e tracemalloc, entrambi opzionali"""
+
+    def __init__(self, profile_path=None, trace_memory=False, top=PROFILE_TOP):
+        self.profile_path = profile_path
+        self.trace_memory = trace_memory
+        self.top = top
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.profile_path or self.trace_memory)
+
+    def _start_thread(self, frame, event, arg):
+        # Primo evento di un nuovo thread: il profilo del thread sostituisce questa funzione
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Un altro strumento di profilazione è già attivo: il thread prosegue senza profilo
+            sys.setprofile(None)
+            return
+        with self._lock:
+            self._profiles.append(profile)
+
+    def start(self):
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+        if self.profile_path:
+            import cProfile
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Il processo è già profilato da un altro strumento: la scansione procede senza profilo
+                return
+            self._profiles.append(profile)
+            if not _PROCESS_WIDE_PROFILE:
+                threading.setprofile(self._start_thread)
+
+    def stop(self):
+        """Ferma la misura e restituisce il riepilogo (profile e memory)"""
+        summary = {}
+        if self.profile_path and self._profiles:
+            import pstats
+            self._profiles[0].disable()
+            if not _PROCESS_WIDE_PROFILE:
+                threading.setprofile(None)
+            with self._lock:
+                profiles = list(self._profiles)
+            stats = pstats.Stats(*profiles)
+            os.makedirs(os.path.dirname(os.path.abspath(self.profile_path)), exist_ok=True)
+            stats.dump_stats(self.profile_path)
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+            summary["profile"] = {
+                "file": self.profile_path,
+                "threads": len(profiles),
+                "top": [{"function": f"{path}:{line}({name})", "calls": calls, "seconds": round(own, 4),
+                         "cumulative_seconds": round(cumulative, 4)}
+                        for (path, line, name), (_, calls, own, cumulative, _) in rows],
+            }
+        if self.trace_memory:
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            summary["memory"] = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top": [{"location": str(stat.traceback[0]), "bytes": stat.size, "blocks": stat.count}
+                        for stat in snapshot.statistics("lineno")[:self.top]],
+            }
+        return summary
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return int(value)
+    return value if isinstance(value, (int, float)) else None
+
+
+def prometheus_text(finished, timestamp=None):
+    """Metriche di una scansione terminata (events.ScanFinished) nel formato testuale di Prometheus"""
+    metrics = finished.metrics or {}
+    families = {}
+
+    def add(name, help_text, value, **labels):
+        value = _number(value)
+        if value is None:
+            return
+        family = families.setdefault(name, (help_text, []))
+        label_text = ",".join(f'{key}="{_label(label)}"' for key, label in labels.items())
+        family[1].append(f"{_PREFIX}_{name}{{{label_text}}} {value}" if labels else f"{_PREFIX}_{name} {value}")
+
+    add("scan_timestamp_seconds", "Fine dell'ultima scansione (epoch)", timestamp or time.time())
+    add("scan_duration_seconds", "Durata dell'ultima scansione", finished.elapsed)
+    add("scan_budget_seconds", "Tempo massimo della scansione", metrics.get("budget"))
+    add("scan_detections", "Rilevamenti dell'ultima scansione", finished.detections)
+    add("scan_timed_out", "1 se la scansione è stata interrotta per timeout", finished.timed_out)
+    add("scan_cancelled", "1 se la scansione è stata annullata", finished.cancelled)
+    add("scan_error", "1 se la scansione è terminata con un errore", finished.error is not None)
+    for phase, coverage in (finished.coverage or {}).items():
+        add("phase_complete", "1 se la fase ha esaminato tutto", coverage["status"] == "complete", phase=phase)
+    for phase, values in metrics.get("phases", {}).items():
+        add("phase_duration_seconds", "Durata della fase", values.get("seconds"), phase=phase)
+        for name, value in values.items():
+            if name != "seconds":
+                add("phase_value", "Contatori e rapporti della fase", value, phase=phase, metric=name)
+    for root in metrics.get("roots", []):
+        add("root_read_seconds", "Tempo di lettura delle cartelle della radice (somma dei thread)",
+            root["read_seconds"], root=root["root"])
+        add("root_finished_seconds", "Istante in cui la visita della radice è terminata",
+            root["finished_at"], root=root["root"])
+        add("root_dirs", "Cartelle visitate nella radice", root["dirs"], root=root["root"])
+        add("root_entries", "Voci esaminate nella radice", root["entries"], root=root["root"])
+
+    lines = []
+    for name, (help_text, samples) in families.items():
+        lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {_PREFIX}_{name} gauge")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path, finished):
+    """Scrive le metriche in modo atomico: chi le legge non vede mai un file a metà"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write(prometheus_text(finished))
+    os.replace(tmp_path, path)
@@ -0,0 +1,167 @@
+"""Scansione offline di immagini montate e di registri esportati.
+
+OfflineRegistry è un provider del registro che non legge il registro della
+macchina corrente ma file raccolti da un'altra: hive grezzi (SOFTWARE,
+NTUSER.DAT, UsrClass.dat) letti con eleventools.regf ed esportazioni .reg
+lette in streaming con eleventools.regexport. Ogni sorgente viene montata in
+un punto dell'albero: per esempio il file SOFTWARE sotto HKLM\\SOFTWARE e il
+NTUSER.DAT di ogni utente sotto HKU\\<utente>. Gli utenti compaiono come
+istanze dell'hive HKCU, così la scansione li esamina tutti e i percorsi dei
+rilevamenti indicano a quale utente appartengono.
+
+from_image() trova da solo gli hive nella radice di un'immagine montata di
+Windows (anche su Linux, dove i nomi sono sensibili alle maiuscole).
+"""
+import os
+import logging
+
+from eleventools.registry import RegistryProvider, MemoryRegistry, split_key_path, HKCU, HKLM
+from eleventools.regf import HiveFile
+from eleventools.regexport import iter_reg_file
+
+# Hive di sistema nella cartella Windows\System32\config: nome del file e punto di montaggio
+SYSTEM_HIVES = (("SOFTWARE", HKLM, "SOFTWARE"),)
+# Hive di ogni utente, relativi alla cartella del profilo
+USER_HIVES = (
+    (("NTUSER.DAT",), ""),
+    (("AppData", "Local", "Microsoft", "Windows", "UsrClass.dat"), "SOFTWARE\\Classes"),
+    # Windows XP
+    (("Local Settings", "Application Data", "Microsoft", "Windows", "UsrClass.dat"), "SOFTWARE\\Classes"),
+)
+PROFILE_DIRS = ("Users", "Documents and Settings")
+
+# Radice fittizia degli alberi in memoria creati dai file .reg
+_TREE = "R"
+
+
+def find_path(root, *parts):
+    """Percorso sotto root con i componenti indicati, ignorando le maiuscole; None se non esiste"""
+    current = root
+    for part in parts:
+        try:
+            names = os.listdir(current)
+        except OSError:
+            return None
+        match = next((name for name in names if name.lower() == part.lower()), None)
+        if match is None:
+            return None
+        current = os.path.join(current, match)
+    return current
+
+
+def user_hive(user):
+    """Nome dell'istanza dell'hive di un utente"""
+    return f"HKU\\{user}"
+
+
+class OfflineRegistry(RegistryProvider):
+    """Registro composto da hive e file .reg montati in punti dell'albero"""
+
+    name = "offline"
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger("ElevenTools")
+        # hive -> [(prefisso in minuscolo come tupla, prefisso, funzione di apertura, descrizione)]
+        self._mounts = {}
+        self._trees = {}
+        self._files = []
+
+    def __len__(self):
+        return sum(len(mounts) for mounts in self._mounts.values())
+
+    def _mount(self, hive, prefix, opener, source):
+        parts = tuple(part.lower() for part in prefix.split("\\") if part)
+        mounts = self._mounts.setdefault(hive, [])
+        mounts.append((parts, opener, source))
+        # Il montaggio più specifico viene provato per primo
+        mounts.sort(key=lambda mount: len(mount[0]), reverse=True)
+        self.logger.info(f"Registro offline: {source} montato in {hive}\\{prefix}".rstrip("\\"))
+
+    def mount_hive(self, hive, path, prefix=""):
+        """Monta un file hive grezzo in hive\\prefix"""
+        hive_file = HiveFile(path)
+        self._files.append(hive_file)
+        self._mount(hive, prefix, hive_file.open_key, path)
+
+    def _tree(self, hive, source):
+        tree = self._trees.get(hive)
+        if tree is None:
+            tree = self._trees[hive] = MemoryRegistry()
+            self._mount(hive, "", lambda path: tree.open_key(_TREE, path), source)
+        return tree
+
+    @staticmethod
+    def map_key(full_path):
+        """Istanza dell'hive e percorso di una chiave di un file .reg ("HKEY_USERS\\<SID>_Classes\\..." compreso)"""
+        hive, path = split_key_path(full_path)
+        if hive == "HKU":
+            user, _, path = path.partition("\\")
+            if user.lower().endswith("_classes"):
+                user = user[:-len("_classes")]
+                path = "SOFTWARE\\Classes\\" + path if path else "SOFTWARE\\Classes"
+            return user_hive(user), path
+        return hive, path
+
+    def add_reg_file(self, path, wanted=None):
+        """Aggiunge le chiavi di un file .reg; wanted(percorso senza hive) sceglie quali tenere"""
+        def keep(full_path):
+            return wanted is None or wanted(self.map_key(full_path)[1])
+
+        keys = 0
+        for full_path, values in iter_reg_file(path, keep):
+            hive, key_path = self.map_key(full_path)
+            self._tree(hive, path).add_key(f"{_TREE}\\{key_path}", values)
+            keys += 1
+        self.logger.info(f"File .reg {path}: {keys} chiavi caricate")
+        return keys
+
+    def hive_instances(self, hive):
+        if hive == HKCU:
+            users = sorted(name for name in self._mounts if name.startswith("HKU\\"))
+            return ([HKCU] if HKCU in self._mounts else []) + users
+        return [hive] if hive in self._mounts else []
+
+    def open_key(self, hive, path):
+        parts = [part for part in path.split("\\") if part]
+        lowered = tuple(part.lower() for part in parts)
+        for prefix, opener, _ in self._mounts.get(hive, ()):
+            if lowered[:len(prefix)] != prefix:
+                continue
+            try:
+                return opener("\\".join(parts[len(prefix):]))
+            except FileNotFoundError:
+                continue
+        raise FileNotFoundError(f"{hive}\\{path}")
+
+    def close(self):
+        for hive_file in self._files:
+            hive_file.close()
+        self._files = []
+
+    @classmethod
+    def from_image(cls, root, logger=None):
+        """Registro degli hive trovati nella radice di un'immagine di Windows (vuoto se non ce ne sono)"""
+        registry = cls(logger)
+        config = find_path(root, "Windows", "System32", "config")
+        if config is not None:
+            for file_name, hive, prefix in SYSTEM_HIVES:
+                registry._try_mount(hive, find_path(config, file_name), prefix)
+        for profiles_name in PROFILE_DIRS:
+            profiles = find_path(root, profiles_name)
+            if profiles is None:
+                continue
+            for user in sorted(os.listdir(profiles)):
+                profile = os.path.join(profiles, user)
+                if not os.path.isdir(profile):
+                    continue
+                for parts, prefix in USER_HIVES:
+                    registry._try_mount(user_hive(user), find_path(profile, *parts), prefix)
+        return registry
+
+    def _try_mount(self, hive, path, prefix):
+        if path is None or not os.path.isfile(path):
+            return
+        try:
+            self.mount_hive(hive, path, prefix)
+        except OSError as e:
+            self.logger.warning(f"Hive non leggibile, ignorato: {path}: {str(e)}")
@@ -0,0 +1,225 @@
+"""Backend per l'enumerazione dei processi in esecuzione.
+
+Ogni backend restituisce una lista di ProcessInfo (nome, PID, percorso
+dell'eseguibile e PID del padre) leggendo la tabella dei processi
+direttamente nel processo corrente:
+
+- psutil: Windows, Linux e macOS (richiede il modulo psutil);
+- procfs: lettura di /proc su Linux, senza dipendenze;
+- wmic: vecchio metodo basato su sottoprocesso, solo come ultima risorsa.
+
+list_processes accetta un token di annullamento (eleventools.cancel) che
+viene controllato durante l'enumerazione.
+"""
+import os
+import logging
+from collections import namedtuple
+
+ProcessInfo = namedtuple("ProcessInfo", "pid name exe ppid")
+
+
+def process_location(process):
+    """Posizione di un processo nei rilevamenti: PID ed eseguibile (o nome, se il percorso non è noto)"""
+    return f"PID {process.pid}: {process.exe or process.name}"
+
+
+class ProcessBackend:
+    """Interfaccia comune dei backend di enumerazione dei processi"""
+
+    name = None
+
+    @classmethod
+    def available(cls):
+        return False
+
+    def list_processes(self, cancel=None):
+        raise NotImplementedError
+
+    def list_identities(self):
+        """Processi attivi come {PID: identità}; i backend possono fornire una versione più economica.
+
+        L'identità cambia se il PID viene riusato da un altro processo o se il
+        processo esegue un altro programma (exec), così la sorveglianza sa
+        quali processi ricontrollare.
+        """
+        return {process.pid: process.name for process in self.list_processes()}
+
+    def describe(self, pids):
+        """Dettagli dei soli PID indicati (quelli terminati nel frattempo vengono ignorati)"""
+        pids = set(pids)
+        return [process for process in self.list_processes() if process.pid in pids]
+
+
+class PsutilBackend(ProcessBackend):
+    """Enumerazione tramite psutil, una sola passata sulla tabella dei processi"""
+
+    name = "psutil"
+
+    @classmethod
+    def available(cls):
+        try:
+            import psutil  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def __init__(self):
+        import psutil
+        self._psutil = psutil
+
+    def list_processes(self, cancel=None):
+        processes = []
+        for proc in self._psutil.process_iter(["pid", "name", "exe", "ppid"]):
+            if cancel is not None and len(processes) % 64 == 63:
+                cancel.check()
+            info = proc.info
+            processes.append(ProcessInfo(info["pid"], info["name"] or "", info["exe"] or "", info["ppid"]))
+        return processes
+
+    def list_identities(self):
+        identities = {}
+        for proc in self._psutil.process_iter(["name", "create_time"]):
+            identities[proc.pid] = (proc.info["name"], proc.info["create_time"])
+        return identities
+
+    def describe(self, pids):
+        processes = []
+        for pid in pids:
+            try:
+                proc = self._psutil.Process(pid)
+                info = proc.as_dict(["name", "exe", "ppid"])
+            except (self._psutil.NoSuchProcess, self._psutil.AccessDenied):
+                continue
+            processes.append(ProcessInfo(pid, info["name"] or "", info["exe"] or "", info["ppid"]))
+        return processes
+
+
+class ProcfsBackend(ProcessBackend):
+    """Enumerazione leggendo /proc (Linux), usata anche per i test"""
+
+    name = "procfs"
+
+    def __init__(self, proc_root="/proc"):
+        self.proc_root = proc_root
+
+    @classmethod
+    def available(cls):
+        return os.path.isdir("/proc/self")
+
+    def _read_process(self, pid):
+        base = os.path.join(self.proc_root, str(pid))
+        with open(os.path.join(base, "stat"), "rb") as f:
+            stat = f.read().decode("utf-8", "replace")
+        # Il nome è tra parentesi e può contenere spazi o parentesi
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        ppid = int(stat[stat.rindex(")") + 2:].split(" ", 2)[1])
+        try:
+            exe = os.readlink(os.path.join(base, "exe"))
+        except OSError:
+            exe = ""
+        # Il kernel tronca il nome a 15 caratteri: usa quello dell'eseguibile se compatibile
+        exe_name = os.path.basename(exe)
+        if exe_name.startswith(name) and len(exe_name) > len(name):
+            name = exe_name
+        return ProcessInfo(pid, name, exe, ppid)
+
+    def list_processes(self, cancel=None):
+        processes = []
+        for entry in os.scandir(self.proc_root):
+            if not entry.name.isdigit():
+                continue
+            if cancel is not None and len(processes) % 64 == 63:
+                cancel.check()
+            try:
+                processes.append(self._read_process(int(entry.name)))
+            except (OSError, ValueError):
+                # Processo terminato durante la lettura
+                continue
+        return processes
+
+    def list_identities(self):
+        identities = {}
+        for name in os.listdir(self.proc_root):
+            if not name.isdigit():
+                continue
+            try:
+                with open(os.path.join(self.proc_root, name, "stat"), "rb") as f:
+                    stat = f.read().decode("utf-8", "replace")
+            except OSError:
+                continue
+            # Nome (cambia con exec) e istante di avvio (field 22, cambia se il PID viene riusato)
+            end = stat.rfind(")")
+            fields = stat[end + 2:].split(" ")
+            identities[int(name)] = (stat[stat.find("(") + 1:end], fields[19] if len(fields) > 19 else "")
+        return identities
+
+    def describe(self, pids):
+        processes = []
+        for pid in pids:
+            try:
+                processes.append(self._read_process(pid))
+            except (OSError, ValueError):
+                continue
+        return processes
+
+
+class WmicBackend(ProcessBackend):
+    """Vecchio metodo basato su wmic, lento e deprecato: usato solo se non c'è alternativa"""
+
+    name = "wmic"
+
+    @classmethod
+    def available(cls):
+        return os.name == "nt"
+
+    def list_processes(self, cancel=None):
+        import csv
+        import time
+        import subprocess
+        from eleventools.cancel import POLL_INTERVAL
+
+        proc = subprocess.Popen(
+            ["wmic", "process", "get", "Name,ProcessId,ParentProcessId,ExecutablePath", "/format:csv"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+        deadline = time.monotonic() + 10
+        while True:
+            # Attesa a intervalli brevi: il sottoprocesso viene terminato appena la scansione è annullata
+            try:
+                output, _ = proc.communicate(timeout=POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                if (cancel is not None and cancel.cancelled) or time.monotonic() > deadline:
+                    proc.kill()
+                    proc.communicate()
+                    if cancel is not None:
+                        cancel.check()
+                    raise
+        processes = []
+        lines = [line for line in output.splitlines() if line.strip()]
+        for row in csv.DictReader(lines):
+            try:
+                processes.append(ProcessInfo(
+                    int(row.get("ProcessId") or 0), row.get("Name") or "",
+                    row.get("ExecutablePath") or "", int(row.get("ParentProcessId") or 0),
+                ))
+            except ValueError:
+                continue
+        return processes
+
+
+BACKENDS = (PsutilBackend, ProcfsBackend, WmicBackend)
+
+
+def get_process_backend(preferred=None):
+    """Restituisce il backend richiesto o il primo disponibile nell'ordine psutil, procfs, wmic"""
+    logger = logging.getLogger("ElevenTools")
+    for backend in BACKENDS:
+        if preferred and backend.name != preferred:
+            continue
+        if backend.available():
+            logger.debug(f"Backend processi: {backend.name}")
+            return backend()
+    if preferred:
+        raise ValueError(f"Backend processi non disponibile: {preferred}")
+    raise RuntimeError("Nessun backend disponibile per l'enumerazione dei processi")
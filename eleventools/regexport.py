@@ -0,0 +1,119 @@
+"""Lettura in streaming dei file .reg esportati da regedit o reg export.
+
+Il file viene letto una riga alla volta e restituito una chiave alla volta:
+le chiavi scartate dal filtro wanted vengono saltate senza decodificarne i
+valori, così un'esportazione completa di diversi GB si attraversa con memoria
+costante. Sono supportati sia "Windows Registry Editor Version 5.00" (UTF-16
+con BOM, oppure UTF-8) sia "REGEDIT4".
+"""
+from eleventools.regf import decode_value, REG_BINARY
+
+HEADERS = ("Windows Registry Editor Version 5.00", "REGEDIT4")
+
+
+class RegFormatError(OSError):
+    """Il file non è un'esportazione .reg valida"""
+
+
+def _open_text(path):
+    with open(path, "rb") as f:
+        start = f.read(3)
+    if start[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        encoding = "utf-16"
+    elif start == b"\xef\xbb\xbf":
+        encoding = "utf-8-sig"
+    else:
+        encoding = "utf-8"
+    return open(path, encoding=encoding, errors="replace", newline=None)
+
+
+def _unquote(text, start):
+    """Legge una stringa tra virgolette a partire da text[start] == '"'; restituisce (stringa, indice dopo la chiusura)"""
+    chars = []
+    i = start + 1
+    length = len(text)
+    while i < length:
+        c = text[i]
+        if c == "\\" and i + 1 < length:
+            chars.append(text[i + 1])
+            i += 2
+        elif c == '"':
+            return "".join(chars), i + 1
+        else:
+            chars.append(c)
+            i += 1
+    raise ValueError("stringa non terminata")
+
+
+def parse_data(text):
+    """Converte la parte dopo "=" di una riga di valore; None per le cancellazioni ("-")"""
+    if text.startswith('"'):
+        return _unquote(text, 0)[0]
+    if text.startswith("dword:"):
+        return int(text[6:], 16)
+    if text.startswith("hex"):
+        kind, _, data = text.partition(":")
+        data_type = int(kind[4:-1], 16) if kind.startswith("hex(") else REG_BINARY
+        return decode_value(data_type, bytes.fromhex(data.replace(",", "").replace(" ", "")))
+    if text == "-":
+        return None
+    return text
+
+
+def parse_value_line(line):
+    """Restituisce (nome, dato) di una riga di valore, oppure None se la riga non è un valore"""
+    if line.startswith("@="):
+        return "", parse_data(line[2:])
+    if not line.startswith('"'):
+        return None
+    name, end = _unquote(line, 0)
+    if line[end:end + 1] != "=":
+        raise ValueError("manca '=' dopo il nome del valore")
+    return name, parse_data(line[end + 1:])
+
+
+def iter_reg_file(path, wanted=None):
+    """Itera su (percorso completo della chiave, {nome: dato}) nell'ordine del file.
+
+    wanted(percorso) decide quali chiavi restituire; le chiavi cancellate
+    ([-CHIAVE]) e i valori cancellati vengono ignorati.
+    """
+    with _open_text(path) as f:
+        header = f.readline().strip()
+        if header not in HEADERS:
+            raise RegFormatError(f"Non è un file .reg: {path}")
+        key = None
+        values = None
+        pending = None
+        for number, raw in enumerate(f, 2):
+            line = raw.rstrip("\n")
+            if pending is not None:
+                # Continuazione di un dato esadecimale su più righe
+                pending += line.strip()
+                if pending.endswith("\\"):
+                    pending = pending[:-1]
+                    continue
+                line, pending = pending, None
+            elif line.startswith("["):
+                if key is not None:
+                    yield key, values
+                name = line.strip()[1:-1]
+                key = name if not name.startswith("-") and (wanted is None or wanted(name)) else None
+                values = {}
+                continue
+            elif key is None:
+                continue
+            elif line.endswith("\\"):
+                pending = line[:-1]
+                continue
+
+            if key is None or not line or line.startswith(";"):
+                continue
+            try:
+                parsed = parse_value_line(line)
+            except ValueError as e:
+                raise RegFormatError(f"{path}, riga {number}: {str(e)}")
+            if parsed is not None and parsed[1] is not None:
+                values[parsed[0]] = parsed[1]
+        if key is not None:
+            yield key, values
@@ -0,0 +1,224 @@
+"""Lettura dei file hive del registro (formato regf) senza Windows.
+
+Il file viene mappato in memoria con mmap e le celle vengono decodificate solo
+quando servono: aprire una chiave legge i record nk lungo il percorso,
+elencarne le sottochiavi o i valori legge solo le liste e i record di quella
+chiave. Un hive di alcuni GB non viene quindi mai caricato per intero.
+
+Vengono letti i dati presenti nel file principale: le modifiche rimaste nei
+log delle transazioni (.LOG1, .LOG2) di un hive non chiuso correttamente non
+vengono applicate.
+"""
+import mmap
+import struct
+
+from eleventools.registry import RegistryKey
+
+# Inizio della prima hbin: gli offset delle celle sono relativi a questa posizione
+HBIN_START = 0x1000
+
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_DWORD_BIG_ENDIAN = 5
+REG_MULTI_SZ = 7
+REG_QWORD = 11
+
+# Nome della chiave o del valore in ASCII (altrimenti UTF-16)
+_KEY_COMP_NAME = 0x0020
+_VALUE_COMP_NAME = 0x0001
+# Dati lunghi al più 4 byte, memorizzati nel campo dell'offset
+_DATA_INLINE = 0x80000000
+# Dimensione massima di un segmento di dati: oltre si usa un record "db"
+_BIG_DATA_SEGMENT = 16344
+
+_NO_OFFSET = 0xFFFFFFFF
+
+
+class HiveFormatError(OSError):
+    """Il file non è un hive valido o contiene celle danneggiate.
+
+    È un OSError come gli altri errori di accesso al registro, così la
+    scansione segnala la chiave illeggibile e prosegue con le altre.
+    """
+
+
+def decode_value(data_type, data):
+    """Converte i dati grezzi di un valore nello stesso tipo restituito da winreg"""
+    if data_type in (REG_SZ, REG_EXPAND_SZ):
+        return data[:len(data) & ~1].decode("utf-16-le", "replace").split("\x00", 1)[0]
+    if data_type == REG_MULTI_SZ:
+        text = data[:len(data) & ~1].decode("utf-16-le", "replace")
+        return [item for item in text.split("\x00") if item]
+    if data_type == REG_DWORD and len(data) >= 4:
+        return struct.unpack_from("<I", data)[0]
+    if data_type == REG_DWORD_BIG_ENDIAN and len(data) >= 4:
+        return struct.unpack_from(">I", data)[0]
+    if data_type == REG_QWORD and len(data) >= 8:
+        return struct.unpack_from("<Q", data)[0]
+    return bytes(data)
+
+
+class HiveKey(RegistryKey):
+    """Chiave di un hive, con la stessa interfaccia delle chiavi dei provider"""
+
+    def __init__(self, hive, offset):
+        self._hive = hive
+        self._offset = offset
+
+    @property
+    def name(self):
+        return self._hive.key_name(self._offset)
+
+    def subkey_names(self):
+        hive = self._hive
+        return (hive.key_name(offset) for offset in hive.subkey_offsets(self._offset))
+
+    def values(self):
+        return self._hive.key_values(self._offset)
+
+
+class HiveFile:
+    """Hive del registro letto da file; le chiavi si aprono con open_key(percorso relativo alla radice)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise HiveFormatError(f"File hive vuoto: {path}")
+        if self._map[:4] != b"regf" or len(self._map) < HBIN_START:
+            self.close()
+            raise HiveFormatError(f"Non è un file hive del registro: {path}")
+        self.minor_version = struct.unpack_from("<I", self._map, 0x18)[0]
+        self.root_offset = struct.unpack_from("<I", self._map, 0x24)[0]
+        # Nomi delle sottochiavi già elencate: offset della chiave -> {nome minuscolo: offset}
+        self._children = {}
+        self._cell(self.root_offset, b"nk")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _cell(self, offset, signature=None):
+        """Posizione dei dati di una cella (dopo la dimensione), verificandone la firma"""
+        position = HBIN_START + offset
+        if offset == _NO_OFFSET or position + 6 > len(self._map):
+            raise HiveFormatError(f"Offset di cella non valido: {offset:#x}")
+        if signature is not None and self._map[position + 4:position + 6] != signature:
+            raise HiveFormatError(f"Cella {offset:#x}: attesa {signature.decode()}")
+        return position + 4
+
+    def _cell_data(self, offset, size):
+        start = self._cell(offset)
+        return self._map[start:start + size]
+
+    def key_name(self, offset):
+        start = self._cell(offset, b"nk")
+        try:
+            flags = struct.unpack_from("<H", self._map, start + 0x02)[0]
+            length = struct.unpack_from("<H", self._map, start + 0x48)[0]
+        except struct.error:
+            raise HiveFormatError(f"Chiave troncata alla cella {offset:#x}")
+        raw = self._map[start + 0x4C:start + 0x4C + length]
+        return raw.decode("latin-1") if flags & _KEY_COMP_NAME else raw.decode("utf-16-le", "replace")
+
+    def subkey_offsets(self, offset):
+        start = self._cell(offset, b"nk")
+        count, list_offset = struct.unpack_from("<I4xI", self._map, start + 0x14)
+        if not count or list_offset == _NO_OFFSET:
+            return []
+        found = []
+        try:
+            self._read_subkey_list(list_offset, found, 0)
+        except struct.error:
+            raise HiveFormatError(f"Lista di sottochiavi troncata alla cella {list_offset:#x}")
+        return found
+
+    def _read_subkey_list(self, offset, found, depth):
+        if depth > 8:
+            raise HiveFormatError("Liste di sottochiavi annidate troppo in profondità")
+        start = self._cell(offset)
+        signature = self._map[start:start + 2]
+        count = struct.unpack_from("<H", self._map, start + 2)[0]
+        if signature in (b"lf", b"lh"):
+            # Coppie (offset, hash del nome)
+            found.extend(struct.unpack_from(f"<{count * 2}I", self._map, start + 4)[::2])
+        elif signature == b"li":
+            found.extend(struct.unpack_from(f"<{count}I", self._map, start + 4))
+        elif signature == b"ri":
+            for sublist in struct.unpack_from(f"<{count}I", self._map, start + 4):
+                self._read_subkey_list(sublist, found, depth + 1)
+        else:
+            raise HiveFormatError(f"Lista di sottochiavi sconosciuta alla cella {offset:#x}")
+
+    def _child_map(self, offset):
+        children = self._children.get(offset)
+        if children is None:
+            children = {self.key_name(child).lower(): child for child in self.subkey_offsets(offset)}
+            self._children[offset] = children
+        return children
+
+    def open_key(self, path):
+        """Apre una chiave dato il percorso dalla radice dell'hive; FileNotFoundError se non esiste"""
+        offset = self.root_offset
+        for part in filter(None, path.split("\\")):
+            offset = self._child_map(offset).get(part.lower())
+            if offset is None:
+                raise FileNotFoundError(f"{self.path}: {path}")
+        return HiveKey(self, offset)
+
+    def key_values(self, offset):
+        """Itera su (nome, dato) dei valori della chiave"""
+        start = self._cell(offset, b"nk")
+        count, list_offset = struct.unpack_from("<II", self._map, start + 0x24)
+        if not count or list_offset == _NO_OFFSET:
+            return
+        try:
+            value_offsets = struct.unpack_from(f"<{count}I", self._map, self._cell(list_offset))
+        except struct.error:
+            raise HiveFormatError(f"Lista di valori troncata alla cella {list_offset:#x}")
+        for value_offset in value_offsets:
+            try:
+                yield self._read_value(value_offset)
+            except (HiveFormatError, struct.error):
+                # Valore danneggiato: si prosegue con gli altri
+                continue
+
+    def _read_value(self, offset):
+        start = self._cell(offset, b"vk")
+        name_length, size, data_offset, data_type, flags = struct.unpack_from("<HIIIH", self._map, start + 2)
+        raw_name = self._map[start + 0x14:start + 0x14 + name_length]
+        name = raw_name.decode("latin-1") if flags & _VALUE_COMP_NAME else raw_name.decode("utf-16-le", "replace")
+        if size & _DATA_INLINE:
+            data = struct.pack("<I", data_offset)[:size & ~_DATA_INLINE]
+        elif size > _BIG_DATA_SEGMENT and self.minor_version > 3:
+            data = self._read_big_data(data_offset, size)
+        else:
+            data = self._cell_data(data_offset, size)
+        return name, decode_value(data_type, data)
+
+    def _read_big_data(self, offset, size):
+        start = self._cell(offset, b"db")
+        count, segments_offset = struct.unpack_from("<HI", self._map, start + 2)
+        segments_start = self._cell(segments_offset)
+        parts = []
+        left = size
+        for segment in struct.unpack_from(f"<{count}I", self._map, segments_start):
+            part = self._cell_data(segment, min(left, _BIG_DATA_SEGMENT))
+            parts.append(part)
+            left -= len(part)
+            if left <= 0:
+                break
+        return b"".join(parts)
@@ -0,0 +1,209 @@
+"""Accesso al registro di sistema tramite provider intercambiabili.
+
+- WinregProvider: registro reale di Windows (winreg viene importato solo qui);
+- MemoryRegistry: registro in memoria, caricabile da JSON, per i test e i
+  benchmark su Linux.
+
+Le chiavi si aprono con provider.open_key(hive, percorso) e si usano come
+context manager; hive è una stringa come "HKCU" o "HKLM".
+"""
+import json
+import logging
+
+HKCU = "HKCU"
+HKLM = "HKLM"
+
+_HIVE_ALIASES = {
+    "HKEY_CURRENT_USER": HKCU,
+    "HKEY_LOCAL_MACHINE": HKLM,
+    "HKEY_USERS": "HKU",
+    "HKEY_CLASSES_ROOT": "HKCR",
+}
+
+
+def split_key_path(full_path):
+    """Divide "HKCU\\SOFTWARE\\Foo" in ("HKCU", "SOFTWARE\\Foo")"""
+    hive, _, path = full_path.replace("/", "\\").partition("\\")
+    hive = hive.upper()
+    return _HIVE_ALIASES.get(hive, hive), path.strip("\\")
+
+
+class RegistryKey:
+    """Chiave aperta: permette di elencare valori e sottochiavi"""
+
+    def values(self):
+        """Itera su (nome, dato) di tutti i valori della chiave"""
+        raise NotImplementedError
+
+    def subkey_names(self):
+        """Itera sui nomi delle sottochiavi dirette"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RegistryProvider:
+    """Interfaccia comune dei provider del registro"""
+
+    name = None
+
+    def open_key(self, hive, path):
+        """Apre una chiave; solleva FileNotFoundError se non esiste"""
+        raise NotImplementedError
+
+    def hive_instances(self, hive):
+        """Hive da esaminare al posto di hive: i provider offline restituiscono per HKCU un hive per ogni utente"""
+        return [hive]
+
+    def key_exists(self, hive, path):
+        try:
+            with self.open_key(hive, path):
+                return True
+        except FileNotFoundError:
+            return False
+
+
+class _WinregKey(RegistryKey):
+    def __init__(self, winreg, handle):
+        self._winreg = winreg
+        self._handle = handle
+
+    def values(self):
+        # QueryInfoKey restituisce il numero di valori: evita l'eccezione di fine enumerazione
+        _, value_count, _ = self._winreg.QueryInfoKey(self._handle)
+        for i in range(value_count):
+            try:
+                name, value, _ = self._winreg.EnumValue(self._handle, i)
+            except OSError:
+                break
+            yield name, value
+
+    def subkey_names(self):
+        subkey_count, _, _ = self._winreg.QueryInfoKey(self._handle)
+        for i in range(subkey_count):
+            try:
+                yield self._winreg.EnumKey(self._handle, i)
+            except OSError:
+                break
+
+    def close(self):
+        if self._handle is not None:
+            self._winreg.CloseKey(self._handle)
+            self._handle = None
+
+
+class WinregProvider(RegistryProvider):
+    """Registro reale di Windows tramite il modulo winreg"""
+
+    name = "winreg"
+
+    def __init__(self):
+        import winreg
+        self._winreg = winreg
+        self._hives = {
+            HKCU: winreg.HKEY_CURRENT_USER,
+            HKLM: winreg.HKEY_LOCAL_MACHINE,
+            "HKU": winreg.HKEY_USERS,
+            "HKCR": winreg.HKEY_CLASSES_ROOT,
+        }
+
+    @classmethod
+    def available(cls):
+        try:
+            import winreg  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def open_key(self, hive, path):
+        handle = self._winreg.OpenKey(self._hives[hive], path)
+        return _WinregKey(self._winreg, handle)
+
+
+class _MemoryNode:
+    __slots__ = ("name", "values", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.values = {}
+        self.children = {}
+
+
+class _MemoryKey(RegistryKey):
+    def __init__(self, node):
+        self._node = node
+
+    def values(self):
+        return iter(list(self._node.values.items()))
+
+    def subkey_names(self):
+        return iter([child.name for child in self._node.children.values()])
+
+
+class MemoryRegistry(RegistryProvider):
+    """Registro in memoria, con nomi di chiave non sensibili alle maiuscole come in Windows.
+
+    Il formato JSON è un dizionario piatto da percorso completo a valori:
+        {"HKCU\\\\SOFTWARE\\\\Synapse": {}, "HKLM\\\\SOFTWARE\\\\...\\\\Run": {"Nome": "dato"}}
+    """
+
+    name = "memory"
+
+    def __init__(self, data=None):
+        self._hives = {}
+        if data:
+            for full_path, values in data.items():
+                self.add_key(full_path, values)
+
+    @classmethod
+    def from_json(cls, path):
+        """Legge il registro da un file JSON; ValueError se il contenuto non è nel formato atteso"""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or not all(isinstance(values, dict) for values in data.values()):
+            raise ValueError(f"{path}: atteso un oggetto da percorso di chiave a valori")
+        return cls(data)
+
+    def _node(self, hive, path, create=False):
+        node = self._hives.get(hive)
+        if node is None:
+            if not create:
+                raise FileNotFoundError(f"{hive}\\{path}")
+            node = self._hives[hive] = _MemoryNode(hive)
+        for part in filter(None, path.split("\\")):
+            child = node.children.get(part.lower())
+            if child is None:
+                if not create:
+                    raise FileNotFoundError(f"{hive}\\{path}")
+                child = node.children[part.lower()] = _MemoryNode(part)
+            node = child
+        return node
+
+    def add_key(self, full_path, values=None):
+        """Crea una chiave (e le chiavi intermedie) impostandone i valori"""
+        hive, path = split_key_path(full_path)
+        node = self._node(hive, path, create=True)
+        if values:
+            node.values.update(values)
+        return node
+
+    def set_value(self, full_path, name, value):
+        self.add_key(full_path, {name: value})
+
+    def open_key(self, hive, path):
+        return _MemoryKey(self._node(hive, path))
+
+
+def get_registry_provider():
+    """Restituisce il provider del registro reale, oppure None se la piattaforma non lo supporta"""
+    if WinregProvider.available():
+        return WinregProvider()
+    logging.getLogger("ElevenTools").debug("Registro di sistema non disponibile su questa piattaforma")
+    return None
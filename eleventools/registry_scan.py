@@ -0,0 +1,219 @@
+"""Scansione del registro con una sola enumerazione per chiave.
+
+Invece di aprire separatamente ogni chiave di ogni executor, le chiavi del
+database vengono raggruppate per chiave padre: ogni padre viene aperto una
+volta per hive e le sue sottochiavi confrontate con un dizionario. I valori
+delle chiavi da esaminare vengono letti tutti, senza limiti, e confrontati con
+l'intero database tramite il matcher compilato.
+
+Oltre all'avvio automatico vengono esaminate le chiavi in cui restano tracce
+di un programma anche dopo la sua rimozione (programmi installati, App Paths,
+MUICache, UserAssist e file recenti). Le chiavi vengono visitate da un pool di
+thread limitato e il tempo impiegato per ciascuna viene registrato. Il token di
+annullamento viene controllato per ogni chiave e ogni 256 valori.
+
+Ogni hive viene espanso con provider.hive_instances: per un registro offline
+HKCU diventa l'insieme degli utenti dell'immagine.
+"""
+import time
+import codecs
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from eleventools.registry import HKCU, HKLM
+
+HIVES = (HKCU, HKLM)
+
+# Chiave da esaminare: tipo di traccia, hive, percorso, profondità delle sottochiavi e codifica dei nomi dei valori
+KeySpec = namedtuple("KeySpec", "kind hives path depth name_encoding")
+
+_CV = "SOFTWARE\\Microsoft\\Windows\\CurrentVersion"
+
+VALUE_KEYS = (
+    KeySpec("avvio automatico", HIVES, _CV + "\\Run", 0, None),
+    KeySpec("avvio automatico", HIVES, _CV + "\\RunOnce", 0, None),
+    KeySpec("programmi installati", HIVES, _CV + "\\Uninstall", 1, None),
+    KeySpec("programmi installati", (HKLM,), "SOFTWARE\\WOW6432Node\\Microsoft\\Windows\\CurrentVersion\\Uninstall", 1, None),
+    KeySpec("App Paths", HIVES, _CV + "\\App Paths", 1, None),
+    KeySpec("MUICache", (HKCU,), "SOFTWARE\\Classes\\Local Settings\\Software\\Microsoft\\Windows\\Shell\\MuiCache", 0, None),
+    KeySpec("MUICache", (HKCU,), "SOFTWARE\\Microsoft\\Windows\\ShellNoRoam\\MUICache", 0, None),
+    # UserAssist: {GUID}\Count con i nomi dei valori codificati in ROT13
+    KeySpec("UserAssist", (HKCU,), _CV + "\\Explorer\\UserAssist", 2, "rot13"),
+    KeySpec("file recenti", (HKCU,), _CV + "\\Explorer\\RecentDocs", 1, None),
+    KeySpec("file recenti", (HKCU,), _CV + "\\Explorer\\RunMRU", 0, None),
+    KeySpec("file recenti", (HKCU,), _CV + "\\Explorer\\ComDlg32\\OpenSavePidlMRU", 1, None),
+    KeySpec("file recenti", (HKCU,), _CV + "\\Explorer\\ComDlg32\\LastVisitedPidlMRU", 0, None),
+)
+
+KeyTiming = namedtuple("KeyTiming", "location seconds keys values")
+
+
+def offline_key_filter(matcher, specs=VALUE_KEYS):
+    """Filtro delle chiavi da conservare leggendo un registro esportato: solo quelle che la scansione apre.
+
+    Restituisce una funzione che riceve il percorso della chiave senza hive.
+    """
+    parents = {parent.lower() for parent in matcher.registry_keys}
+    roots = [(spec.path.lower(), spec.path.count("\\"), spec.depth) for spec in specs]
+
+    def wanted(path):
+        path = path.lower()
+        if path.rpartition("\\")[0] in parents:
+            return True
+        for root, root_depth, depth in roots:
+            if path == root or (path.startswith(root + "\\") and path.count("\\") - root_depth <= depth):
+                return True
+        return False
+
+    return wanted
+
+
+def value_text(value):
+    """Testo confrontabile di un dato di registro (stringhe, liste di stringhe e binari UTF-16)"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return "\n".join(item for item in value if isinstance(item, str))
+    if isinstance(value, (bytes, bytearray)):
+        # RecentDocs e gli elenchi MRU contengono nomi di file in UTF-16 dentro dati binari
+        return bytes(value[:len(value) & ~1]).decode("utf-16-le", "ignore").replace("\x00", "\n")
+    return ""
+
+
+class RegistryStats:
+    """Contatori della scansione del registro"""
+
+    __slots__ = ("keys_opened", "subkeys_seen", "values_seen", "matcher_calls", "key_timings",
+                 "executor_parents_done", "value_keys_done")
+
+    def __init__(self):
+        self.keys_opened = 0
+        self.subkeys_seen = 0
+        self.values_seen = 0
+        self.matcher_calls = 0
+        self.key_timings = []
+        # Chiavi padre degli executor e chiavi di tracce (per hive) esaminate per intero
+        self.executor_parents_done = 0
+        self.value_keys_done = 0
+
+
+class RegistryScanner:
+    """Confronta le chiavi e i valori del registro con tutte le firme del database.
+
+    I risultati vengono passati alla funzione report(executor, percorso, firma),
+    sempre dal thread chiamante. Se il token di annullamento scade, i metodi di
+    scansione sollevano eleventools.cancel.ScanCancelled.
+    """
+
+    def __init__(self, matcher, provider, cancel=None, max_workers=4, logger=None):
+        self.matcher = matcher
+        self.provider = provider
+        self.cancel = cancel
+        self.max_workers = max_workers
+        self.logger = logger or logging.getLogger("ElevenTools")
+        self.stats = RegistryStats()
+
+    def _check_deadline(self):
+        if self.cancel is not None:
+            self.cancel.check()
+
+    def _instances(self, hives):
+        return [instance for hive in hives for instance in self.provider.hive_instances(hive)]
+
+    def value_key_count(self, specs=VALUE_KEYS):
+        """Numero di chiavi (per istanza di hive) esaminate da scan_value_keys"""
+        return sum(len(self._instances(spec.hives)) for spec in specs)
+
+    def scan_executor_keys(self, report, hives=HIVES):
+        """Cerca le chiavi specifiche degli executor enumerando una volta ogni chiave padre"""
+        hives = self._instances(hives)
+        for parent in self.matcher.registry_keys:
+            children = self.matcher.registry_children(parent)
+            for hive in hives:
+                self._check_deadline()
+                try:
+                    with self.provider.open_key(hive, parent) as key:
+                        self.stats.keys_opened += 1
+                        for name in key.subkey_names():
+                            self.stats.subkeys_seen += 1
+                            for executor_name, signature in children.get(name.lower(), ()):
+                                report(executor_name, f"{hive}\\{signature}", signature)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.logger.error(f"Errore durante l'accesso alla chiave {hive}\\{parent}: {str(e)}")
+            self.stats.executor_parents_done += 1
+
+    def _walk_key(self, hive, spec):
+        """Visita una chiave e le sue sottochiavi fino alla profondità indicata.
+
+        Restituisce le corrispondenze trovate e i contatori della visita.
+        """
+        matches = []
+        stats = RegistryStats()
+        pending = [(spec.path, spec.depth)]
+        while pending:
+            current, remaining = pending.pop()
+            self._check_deadline()
+            try:
+                with self.provider.open_key(hive, current) as key:
+                    stats.keys_opened += 1
+                    for name, value in key.values():
+                        stats.values_seen += 1
+                        if stats.values_seen % 256 == 0:
+                            self._check_deadline()
+                        if spec.name_encoding:
+                            name = codecs.decode(name, spec.name_encoding)
+                        # Nome e dato in un'unica ricerca: le firme non contengono "a capo"
+                        stats.matcher_calls += 1
+                        for executor_name, signature in self.matcher.match_text(f"{name}\n{value_text(value)}"):
+                            # Il valore predefinito ha nome vuoto
+                            matches.append((executor_name, f"{hive}\\{current}\\{name or '(predefinito)'}", signature))
+                    if remaining > 0:
+                        for subkey in key.subkey_names():
+                            stats.subkeys_seen += 1
+                            subpath = f"{current}\\{subkey}"
+                            stats.matcher_calls += 1
+                            for executor_name, signature in self.matcher.match_text(subkey):
+                                matches.append((executor_name, f"{hive}\\{subpath}", signature))
+                            pending.append((subpath, remaining - 1))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.error(f"Errore durante l'accesso alla chiave {hive}\\{current}: {str(e)}")
+        return matches, stats
+
+    def _timed_walk(self, hive, spec):
+        started = time.perf_counter()
+        matches, stats = self._walk_key(hive, spec)
+        return matches, stats, time.perf_counter() - started
+
+    def scan_value_keys(self, report, specs=VALUE_KEYS, progress=None):
+        """Esamina in parallelo le chiavi indicate, riportando i risultati nell'ordine delle chiavi.
+
+        progress, se indicata, riceve la frazione di chiavi completate dopo ognuna.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="registry") as pool:
+            futures = [(hive, spec, pool.submit(self._timed_walk, hive, spec))
+                       for spec in specs for hive in self._instances(spec.hives)]
+            try:
+                for hive, spec, future in futures:
+                    matches, stats, seconds = future.result()
+                    self.stats.keys_opened += stats.keys_opened
+                    self.stats.subkeys_seen += stats.subkeys_seen
+                    self.stats.values_seen += stats.values_seen
+                    self.stats.matcher_calls += stats.matcher_calls
+                    self.stats.value_keys_done += 1
+                    location = f"{hive}\\{spec.path}"
+                    self.stats.key_timings.append(KeyTiming(location, seconds, stats.keys_opened, stats.values_seen))
+                    self.logger.debug(f"Chiave {location} ({spec.kind}): {stats.keys_opened} chiavi, "
+                                      f"{stats.values_seen} valori in {seconds * 1000:.1f} ms")
+                    for executor_name, match_location, signature in matches:
+                        report(executor_name, match_location, signature)
+                    if progress is not None:
+                        progress(self.stats.value_keys_done / len(futures))
+            finally:
+                # In caso di timeout non avvia le visite ancora in attesa
+                for _, _, future in futures:
+                    future.cancel()
@@ -0,0 +1,89 @@
+"""Buffer di visualizzazione dei risultati per l'interfaccia grafica.
+
+Il testo da mostrare non viene inserito nella casella riga per riga: le righe
+si accumulano nel buffer e l'interfaccia le scarica tutte insieme a intervalli
+regolari (FLUSH_INTERVAL). La casella mostra solo le ultime MAX_VISIBLE_LINES
+righe, così non cresce senza limiti con migliaia di rilevamenti; il testo
+completo viene scritto nel file di trascrizione, se indicato; il testo scritto
+con visible=False (per esempio i rilevamenti, mostrati nella tabella) finisce
+solo nella trascrizione.
+
+Il modulo non dipende da tkinter: flush() restituisce il testo da aggiungere
+e il numero di righe da togliere in cima, e l'applicazione alla casella
+spetta al chiamante.
+"""
+import time
+import logging
+
+# Intervallo minimo tra due aggiornamenti della casella, in secondi
+FLUSH_INTERVAL = 0.05
+# Righe mantenute nella casella; le più vecchie restano solo nella trascrizione
+MAX_VISIBLE_LINES = 2000
+
+
+class RenderBuffer:
+    """Accumula le righe da mostrare e le consegna a blocchi, al massimo ogni FLUSH_INTERVAL secondi"""
+
+    def __init__(self, max_visible_lines=MAX_VISIBLE_LINES, transcript_path=None, interval=FLUSH_INTERVAL, logger=None):
+        self.max_visible_lines = max_visible_lines
+        self.transcript_path = transcript_path
+        self.interval = interval
+        self.logger = logger or logging.getLogger("ElevenTools")
+        self._pending = []
+        self._visible = 0
+        self._last_flush = 0.0
+        self._transcript = None
+        # Righe uscite dalla casella (o mai mostrate) perché oltre il limite
+        self.dropped_lines = 0
+        self.total_lines = 0
+
+    def write(self, text, visible=True):
+        """Accoda del testo; le righe devono terminare con un a capo"""
+        if text:
+            self._pending.append((text, visible))
+
+    def due(self):
+        """True se ci sono righe in attesa ed è trascorso l'intervallo dall'ultimo aggiornamento"""
+        return bool(self._pending) and time.monotonic() - self._last_flush >= self.interval
+
+    def flush(self, force=False):
+        """Restituisce (testo da aggiungere, righe da rimuovere in cima), oppure None se non c'è nulla da fare"""
+        if not self._pending or not (force or self.due()):
+            return None
+        pending = self._pending
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._write_transcript("".join(text for text, _ in pending))
+        text = "".join(text for text, visible in pending if visible)
+        if not text:
+            return None
+
+        added = text.count("\n")
+        self.total_lines += added
+        if added > self.max_visible_lines:
+            # Il blocco da solo supera il limite: si mostrano solo le sue ultime righe
+            skipped = added - self.max_visible_lines
+            text = text.split("\n", skipped)[-1]
+            self.dropped_lines += skipped
+            added = self.max_visible_lines
+        trim = max(0, self._visible + added - self.max_visible_lines)
+        self._visible += added - trim
+        self.dropped_lines += trim
+        return text, trim
+
+    def _write_transcript(self, text):
+        if self.transcript_path is None:
+            return
+        try:
+            if self._transcript is None:
+                self._transcript = open(self.transcript_path, "a", encoding="utf-8")
+            self._transcript.write(text)
+            self._transcript.flush()
+        except OSError as e:
+            self.logger.error(f"Impossibile scrivere la trascrizione dei risultati: {str(e)}")
+            self.transcript_path = None
+
+    def close(self):
+        if self._transcript is not None:
+            self._transcript.close()
+            self._transcript = None
@@ -0,0 +1,126 @@
+"""Modello della tabella dei risultati, indipendente dall'interfaccia.
+
+I rilevamenti vengono conservati una sola volta in records; la vista è una
+lista di indici filtrata (per executor, tipo di prova e testo) e ordinata per
+colonna. L'interfaccia chiede solo le righe visibili con rows(), quindi anche
+con decine di migliaia di rilevamenti il costo di un aggiornamento dipende
+dalle righe mostrate e non dal totale.
+
+La vista viene ricostruita per intero solo quando cambiano il filtro o la
+colonna di ordinamento: i rilevamenti che arrivano durante la scansione vengono
+inseriti al loro posto con una ricerca binaria sulle chiavi di ordinamento.
+L'ordine inverso non richiede di riordinare: la vista resta crescente e viene
+letta dalla fine.
+"""
+import bisect
+
+# Colonne della tabella, nell'ordine di visualizzazione
+COLUMNS = ("executor", "kind", "location", "confidence", "timestamp")
+
+
+def sort_value(detection, column):
+    """Chiave di ordinamento di un rilevamento per la colonna indicata"""
+    if column == "confidence":
+        return detection.confidence
+    if column == "timestamp":
+        return detection.timestamp or 0.0
+    return (getattr(detection, column) or "").lower()
+
+
+class ResultsModel:
+    """Rilevamenti della scansione con una vista filtrata e ordinata"""
+
+    def __init__(self):
+        self.records = []
+        self.executors = set()
+        self.kinds = set()
+        self._view = []
+        # Chiavi di ordinamento delle righe della vista, nello stesso ordine (vuota senza ordinamento)
+        self._keys = []
+        self._dirty = False
+        self.executor = None
+        self.kind = None
+        self.text = ""
+        self.sort_column = None
+        self.sort_reverse = False
+
+    def __len__(self):
+        self.refresh()
+        return len(self._view)
+
+    def clear(self):
+        """Svuota i dati mantenendo filtro e ordinamento"""
+        self.records = []
+        self.executors = set()
+        self.kinds = set()
+        self._view = []
+        self._keys = []
+        self._dirty = False
+
+    def add(self, detection):
+        self.records.append(detection)
+        self.executors.add(detection.executor)
+        self.kinds.add(detection.kind)
+        if self._dirty or not self._accepts(detection):
+            return
+        if self.sort_column is None:
+            # Ordine di arrivo: la vista cresce in coda senza essere ricostruita
+            self._view.append(len(self.records) - 1)
+        else:
+            # Dopo le righe con la stessa chiave, come farebbe un ordinamento stabile
+            key = sort_value(detection, self.sort_column)
+            position = bisect.bisect_right(self._keys, key)
+            self._keys.insert(position, key)
+            self._view.insert(position, len(self.records) - 1)
+
+    def set_filter(self, executor=None, kind=None, text=""):
+        """Mostra solo i rilevamenti dell'executor e del tipo indicati il cui percorso contiene text"""
+        self.executor = executor
+        self.kind = kind
+        self.text = text.lower()
+        self._dirty = True
+
+    def sort_by(self, column):
+        """Ordina per colonna; una seconda richiesta sulla stessa colonna inverte l'ordine"""
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+            self._dirty = True
+
+    def _accepts(self, detection):
+        if self.executor is not None and detection.executor != self.executor:
+            return False
+        if self.kind is not None and detection.kind != self.kind:
+            return False
+        if self.text and self.text not in (detection.location or "").lower():
+            return False
+        return True
+
+    def refresh(self):
+        """Ricostruisce la vista se filtro, ordinamento o dati sono cambiati"""
+        if not self._dirty:
+            return
+        records = self.records
+        view = [i for i, detection in enumerate(records) if self._accepts(detection)]
+        keys = []
+        if self.sort_column is not None:
+            column = self.sort_column
+            keys = [sort_value(records[i], column) for i in view]
+            order = sorted(range(len(view)), key=keys.__getitem__)
+            view = [view[j] for j in order]
+            keys = [keys[j] for j in order]
+        self._view = view
+        self._keys = keys
+        self._dirty = False
+
+    def rows(self, offset, count):
+        """Rilevamenti nelle posizioni [offset, offset + count) della vista"""
+        self.refresh()
+        records = self.records
+        view = self._view
+        if self.sort_column is not None and self.sort_reverse:
+            end = max(0, len(view) - offset)
+            return [records[i] for i in reversed(view[max(0, end - count):end])]
+        return [records[i] for i in view[offset:offset + count]]
@@ -0,0 +1,407 @@
+"""Database delle firme degli executor noti.
+
+Le firme si trovano in un file JSON esterno (data/executors.json) con questo
+formato:
+
+    {
+      "schema": 1,
+      "version": 1,
+      "executors": {
+        "Nome executor": {
+          "files": [...], "folders": [...], "processes": [...],
+          "patterns": [...], "registry": [...],
+          "hashes": ["<md5>", {"md5": "<md5>", "size": 12345}]
+        }
+      }
+    }
+
+Al caricamento il file viene validato, gli executor duplicati vengono uniti e
+le firme ripetute rimosse. La forma compilata (matcher e indice degli hash)
+viene salvata in cache con marshal e ricaricata con una sola lettura finché il
+file JSON non cambia.
+
+SignatureStore tiene aggiornate le firme nei processi di lunga durata: controlla
+periodicamente il file (e una eventuale cartella di aggiornamenti), ricompila
+in background e sostituisce le firme in un colpo solo. Chi ha già in mano le
+firme precedenti, ad esempio una scansione in corso, continua a usarle.
+"""
+import os
+import re
+import gc
+import sys
+import json
+import marshal
+import logging
+import threading
+
+from eleventools.hashing import HashIndex
+from eleventools.matcher import SignatureMatcher
+
+SCHEMA_VERSION = 1
+FIELDS = ("files", "folders", "processes", "patterns", "registry", "hashes")
+
+DEFAULT_DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "executors.json")
+DEFAULT_COMPILED_CACHE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "signatures.bin")
+
+# Intervallo predefinito tra due controlli del file delle firme, in secondi
+DEFAULT_RELOAD_INTERVAL = 5.0
+
+# Versione del formato della cache compilata: va incrementata se cambia la struttura salvata
+COMPILED_FORMAT = 4
+
+_MD5_RE = re.compile(r"[0-9a-fA-F]{32}")
+# MD5 di un file vuoto: corrisponderebbe a qualunque file di zero byte, quindi non è una firma
+_EMPTY_MD5 = "d41d8cd98f00b204e9800998ecf8427e"
+
+
+class SignatureDatabaseError(ValueError):
+    """Il file delle firme non è valido"""
+
+
+class CompiledSignatures:
+    """Firme pronte per la scansione: matcher, indice degli hash e versione del database"""
+
+    def __init__(self, version, executors, matcher, hash_index, fingerprint, source=None):
+        self.version = version
+        self.executors = executors
+        self.matcher = matcher
+        self.hash_index = hash_index
+        # Impronta del contenuto: cambia con qualsiasi firma, anche se la versione dichiarata resta uguale
+        self.fingerprint = fingerprint
+        self.source = source
+
+    @property
+    def executor_count(self):
+        return len(self.executors)
+
+    @classmethod
+    def compile(cls, version, executors_db, source=None):
+        import hashlib
+
+        canonical = json.dumps(executors_db, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return cls(version, tuple(executors_db), SignatureMatcher(executors_db), HashIndex(executors_db),
+                   hashlib.sha1(canonical).hexdigest(), source)
+
+    def to_state(self):
+        return {
+            "version": self.version,
+            "executors": self.executors,
+            "matcher": self.matcher.to_state(),
+            "hashes": self.hash_index.to_state(),
+            "fingerprint": self.fingerprint,
+        }
+
+    @classmethod
+    def from_state(cls, state, source=None):
+        return cls(state["version"], state["executors"], SignatureMatcher.from_state(state["matcher"]),
+                   HashIndex.from_state(state["hashes"]), state["fingerprint"], source)
+
+
+def _merge_duplicates(pairs):
+    """object_pairs_hook per json: unisce le chiavi duplicate invece di sovrascriverle"""
+    result = {}
+    for key, value in pairs:
+        if key in result and isinstance(result[key], dict) and isinstance(value, dict):
+            logging.getLogger("ElevenTools").warning(f"Voce duplicata nel database delle firme: {key}")
+            merged = dict(result[key])
+            for field, items in value.items():
+                if isinstance(merged.get(field), list) and isinstance(items, list):
+                    merged[field] = merged[field] + items
+                else:
+                    merged[field] = items
+            result[key] = merged
+        else:
+            result[key] = value
+    return result
+
+
+def _dedupe(items, key):
+    seen = set()
+    result = []
+    for item in items:
+        k = key(item)
+        if k not in seen:
+            seen.add(k)
+            result.append(item)
+    return result
+
+
+def _validate_hash(name, signature):
+    if isinstance(signature, dict):
+        unknown = set(signature) - {"md5", "size"}
+        if unknown:
+            raise SignatureDatabaseError(f"{name}: campi hash sconosciuti {sorted(unknown)}")
+        size = signature.get("size")
+        if size is not None and (not isinstance(size, int) or size <= 0):
+            raise SignatureDatabaseError(f"{name}: dimensione hash non valida {size!r}")
+        digest = signature.get("md5")
+    else:
+        digest = signature
+    if not isinstance(digest, str) or not _MD5_RE.fullmatch(digest):
+        raise SignatureDatabaseError(f"{name}: hash MD5 non valido {digest!r}")
+    if digest.lower() == _EMPTY_MD5:
+        raise SignatureDatabaseError(f"{name}: l'hash {digest} è quello di un file vuoto")
+
+
+def validate_executor(name, data):
+    """Valida la voce di un executor e restituisce una copia normalizzata senza firme ripetute"""
+    if not isinstance(data, dict):
+        raise SignatureDatabaseError(f"{name}: la voce deve essere un oggetto")
+    unknown = set(data) - set(FIELDS)
+    if unknown:
+        raise SignatureDatabaseError(f"{name}: campi sconosciuti {sorted(unknown)}")
+
+    normalized = {}
+    for field in FIELDS:
+        items = data.get(field)
+        if items is None:
+            continue
+        if not isinstance(items, list):
+            raise SignatureDatabaseError(f"{name}: il campo {field} deve essere una lista")
+        if field == "hashes":
+            for signature in items:
+                _validate_hash(name, signature)
+            items = _dedupe(items, lambda s: (s["md5"] if isinstance(s, dict) else s).lower())
+        else:
+            for item in items:
+                if not isinstance(item, str) or not item:
+                    raise SignatureDatabaseError(f"{name}: valore non valido nel campo {field}: {item!r}")
+            if field == "patterns":
+                for pattern in items:
+                    try:
+                        re.compile(pattern)
+                    except re.error as e:
+                        raise SignatureDatabaseError(f"{name}: pattern non valido {pattern!r}: {e}")
+                items = _dedupe(items, lambda s: s)
+            else:
+                # Windows non distingue maiuscole e minuscole in nomi di file, processi e chiavi
+                items = _dedupe(items, str.lower)
+        if items:
+            normalized[field] = items
+    return normalized
+
+
+def read_database(path=DEFAULT_DATABASE):
+    """Legge e valida il file delle firme; restituisce (versione, executor)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            document = json.load(f, object_pairs_hook=_merge_duplicates)
+    except json.JSONDecodeError as e:
+        raise SignatureDatabaseError(f"{path}: JSON non valido: {e}")
+
+    if not isinstance(document, dict):
+        raise SignatureDatabaseError(f"{path}: il documento deve essere un oggetto")
+    if document.get("schema") != SCHEMA_VERSION:
+        raise SignatureDatabaseError(f"{path}: schema {document.get('schema')!r} non supportato "
+                                     f"(atteso {SCHEMA_VERSION})")
+    executors = document.get("executors")
+    if not isinstance(executors, dict):
+        raise SignatureDatabaseError(f"{path}: manca l'oggetto 'executors'")
+
+    return document.get("version"), {name: validate_executor(name, data) for name, data in executors.items()}
+
+
+def load_executors_database(path=DEFAULT_DATABASE):
+    """Carica il database completo degli executor noti come dizionario"""
+    return read_database(path)[1]
+
+
+def _cache_stamp(path):
+    st = os.stat(path)
+    return (COMPILED_FORMAT, sys.version_info[:2], os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def _load_compiled(path, cache_path):
+    """Legge la cache compilata se corrisponde al file delle firme, altrimenti restituisce None"""
+    try:
+        with open(cache_path, "rb") as f:
+            header = f.read(int.from_bytes(f.read(4), "little"))
+            if marshal.loads(header) != _cache_stamp(path):
+                return None
+            # marshal.load su un file esegue una lettura per oggetto: legge tutto in un colpo solo
+            data = f.read()
+        # Il caricamento crea molti piccoli oggetti: il garbage collector lo rallenterebbe inutilmente
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            state = marshal.loads(data)
+        finally:
+            if gc_enabled:
+                gc.enable()
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return CompiledSignatures.from_state(state, source=path)
+
+
+def _share_strings(value, pool):
+    """Copia dello stato in cui le stringhe uguali sono un solo oggetto: marshal le scrive e le ricrea una volta"""
+    if isinstance(value, str):
+        return pool.setdefault(value, value)
+    if isinstance(value, tuple):
+        return tuple(_share_strings(item, pool) for item in value)
+    if isinstance(value, dict):
+        return {_share_strings(key, pool): _share_strings(item, pool) for key, item in value.items()}
+    return value
+
+
+def _save_compiled(path, cache_path, signatures):
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    # Intestazione con lunghezza: se il file JSON è cambiato la cache si scarta senza leggere il resto
+    header = marshal.dumps(_cache_stamp(path))
+    with open(tmp_path, "wb") as f:
+        f.write(len(header).to_bytes(4, "little"))
+        f.write(header)
+        f.write(marshal.dumps(_share_strings(signatures.to_state(), {})))
+    # Sostituzione atomica: un altro processo non legge mai una cache scritta a metà
+    os.replace(tmp_path, cache_path)
+
+
+def load_signatures(path=DEFAULT_DATABASE, cache_path=DEFAULT_COMPILED_CACHE):
+    """Carica le firme compilate, dalla cache se valida o ricompilando il file JSON"""
+    logger = logging.getLogger("ElevenTools")
+    if cache_path:
+        signatures = _load_compiled(path, cache_path)
+        if signatures is not None:
+            return signatures
+
+    version, executors = read_database(path)
+    signatures = CompiledSignatures.compile(version, executors, source=path)
+    logger.info(f"Database delle firme v{version} compilato: {signatures.executor_count} executor")
+    if cache_path:
+        try:
+            _save_compiled(path, cache_path, signatures)
+        except OSError as e:
+            logger.warning(f"Impossibile salvare la cache delle firme: {str(e)}")
+    return signatures
+
+
+def _peek_version(path):
+    """Versione dichiarata da un file delle firme, senza validarlo"""
+    with open(path, encoding="utf-8") as f:
+        version = json.load(f).get("version")
+    return version if isinstance(version, (int, float)) else -1
+
+
+class SignatureStore:
+    """Firme sempre aggiornate per i processi di lunga durata.
+
+    current restituisce le firme in uso; ogni ricaricamento ne crea di nuove e
+    le sostituisce con un solo assegnamento, quindi chi le sta usando non vede
+    mai uno stato intermedio. Se update_dir è indicata, i file *.json al suo
+    interno sono database completi: viene usato quello con la versione più alta
+    (compreso il file principale). Un file non valido viene scartato e segnalato
+    nel log, e si passa al successivo per versione: con un aggiornamento rovinato
+    restano in uso le firme dell'ultimo database valido.
+    """
+
+    def __init__(self, path=DEFAULT_DATABASE, update_dir=None, cache_path=DEFAULT_COMPILED_CACHE,
+                 interval=DEFAULT_RELOAD_INTERVAL, logger=None):
+        self.path = path
+        self.update_dir = update_dir
+        self.cache_path = cache_path
+        self.interval = interval
+        self.logger = logger or logging.getLogger("ElevenTools")
+        self.reloads = 0
+        self._stamps = None
+        self._current = None
+        # Un solo ricaricamento alla volta (thread di sorveglianza o chiamata esplicita)
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.reload()
+
+    @property
+    def current(self):
+        return self._current
+
+    def _sources(self):
+        sources = [self.path]
+        if self.update_dir:
+            import glob
+            sources.extend(sorted(glob.glob(os.path.join(self.update_dir, "*.json"))))
+        return sources
+
+    def _snapshot(self):
+        stamps = {}
+        for source in self._sources():
+            try:
+                st = os.stat(source)
+            except OSError:
+                continue
+            stamps[source] = (st.st_size, st.st_mtime_ns)
+        return stamps
+
+    def _candidates(self, sources):
+        """File delle firme leggibili dalla versione più alta alla più bassa (a pari versione, nell'ordine dato)"""
+        versions = []
+        for source in sources:
+            try:
+                version = _peek_version(source)
+            except (OSError, ValueError, AttributeError) as e:
+                self.logger.error(f"File delle firme ignorato {source}: {str(e)}")
+                continue
+            versions.append((version, source))
+        versions.sort(key=lambda item: item[0], reverse=True)
+        return [source for _, source in versions]
+
+    def reload(self, force=False):
+        """Ricarica le firme se i file sono cambiati; restituisce True se sono state sostituite"""
+        with self._reload_lock:
+            stamps = self._snapshot()
+            if not force and stamps == self._stamps:
+                return False
+            # Memorizzato subito: un file non valido non viene riletto finché non cambia di nuovo
+            self._stamps = stamps
+
+            candidates = self._candidates(stamps)
+            if not candidates:
+                raise SignatureDatabaseError(f"{self.path}: nessun database delle firme leggibile")
+            previous = self._current
+            signatures = error = None
+            for source in candidates:
+                try:
+                    signatures = load_signatures(source, cache_path=self.cache_path)
+                    break
+                except (SignatureDatabaseError, OSError) as e:
+                    self.logger.error(f"File delle firme scartato {source}: {str(e)}")
+                    error = e
+            if signatures is None:
+                if previous is None:
+                    raise error
+                self.logger.error("Aggiornamento delle firme non riuscito, restano in uso quelle precedenti")
+                return False
+            unchanged = previous is not None and (signatures.version, signatures.fingerprint) == (
+                previous.version, previous.fingerprint)
+            if unchanged:
+                # Scartato l'aggiornamento, l'ultimo database valido è quello già in uso
+                return False
+
+            self._current = signatures
+            self.reloads += 1
+            if previous is not None:
+                self.logger.info(f"Firme aggiornate alla versione {signatures.version} "
+                                 f"({signatures.executor_count} executor) da {source}")
+            return True
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.reload()
+            except Exception as e:
+                self.logger.error(f"Errore durante il controllo delle firme: {str(e)}")
+
+    def start(self):
+        """Avvia il controllo periodico dei file in un thread in background"""
+        if self._thread is None:
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="SignatureStore", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
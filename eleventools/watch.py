@@ -0,0 +1,120 @@
+"""Modalità di sorveglianza continua dei processi.
+
+La tabella dei processi viene letta a intervalli regolari: a ogni giro si
+confrontano solo le identità dei processi (PID con nome e istante di avvio)
+con quelle del giro precedente, e si leggono i dettagli e si applica il matcher
+soltanto ai processi nuovi. Un PID riusato o un processo che esegue un altro
+programma ha un'identità nuova e viene quindi ricontrollato. Tra un evento e
+l'altro il costo è quello di una lista di identità.
+
+Le firme vengono lette a ogni giro da un SignatureStore: quando vengono
+aggiornate, i processi già in esecuzione vengono ricontrollati con le nuove
+firme senza interrompere la sorveglianza e senza ripetere i rilevamenti già
+segnalati.
+"""
+import time
+import logging
+import threading
+
+from eleventools import events
+from eleventools.logs import DetectionLog
+from eleventools.processes import get_process_backend, process_location
+
+# Intervallo predefinito tra due letture della tabella dei processi, in secondi
+DEFAULT_INTERVAL = 0.5
+
+
+class ProcessWatcher:
+    """Sorveglia la tabella dei processi e segnala gli executor appena avviati"""
+
+    def __init__(self, store, backend=None, interval=DEFAULT_INTERVAL, logger=None, detection_log_limit=None):
+        # Qualsiasi oggetto con l'attributo current (vedi eleventools.signatures.SignatureStore)
+        self.store = store
+        self.backend = backend or get_process_backend()
+        self.interval = interval
+        self.logger = logger or logging.getLogger("ElevenTools")
+        # (PID, identità) dei processi già controllati
+        self.known = set()
+        self.polls = 0
+        self.processes_checked = 0
+        self.detections = 0
+        self._signatures = None
+        # (PID, identità, executor) già segnalati: evita i doppioni quando i processi vengono ricontrollati
+        self._reported = set()
+        # Rilevamenti scritti uno per uno nel log a ogni giro (None: tutti)
+        self.detection_log = DetectionLog(self.logger, detection_log_limit)
+
+    def poll(self):
+        """Esegue un giro di confronto e restituisce (processo, corrispondenze) dei nuovi processi sospetti"""
+        signatures = self.store.current
+        if signatures is not self._signatures:
+            if self._signatures is not None:
+                self.logger.info(f"Firme aggiornate alla versione {signatures.version}: "
+                                 f"ricontrollo dei processi in esecuzione")
+            # Con firme nuove tutti i processi vanno ricontrollati
+            self._signatures = signatures
+            self.known = set()
+        matcher = signatures.matcher
+
+        current = set(self.backend.list_identities().items())
+        new = dict(current - self.known)
+        self.known = current
+        self.polls += 1
+        if self._reported:
+            self._reported = {item for item in self._reported if item[:2] in current}
+        if not new:
+            return []
+
+        found = []
+        for process in self.backend.describe(new):
+            key = (process.pid, new[process.pid])
+            self.processes_checked += 1
+            matches = [(executor_name, signature) for executor_name, signature in matcher.match_process(process.name)
+                       if key + (executor_name,) not in self._reported]
+            if matches:
+                self._reported.update(key + (executor_name,) for executor_name, _ in matches)
+                found.append((process, matches))
+        return found
+
+    def run(self, emit, stop_event=None, duration=None):
+        """Sorveglia finché stop_event non viene impostato, non scade la durata indicata o non arriva Ctrl+C.
+
+        Restituisce il numero di rilevamenti della sorveglianza.
+        """
+        stop_event = stop_event or threading.Event()
+        deadline = time.monotonic() + duration if duration else None
+        self.detections = 0
+        self.logger.info(f"Avvio sorveglianza processi con il backend {self.backend.name} "
+                         f"(intervallo {self.interval} s)")
+        emit(events.Info("processes", "Sorveglianza dei processi avviata..."))
+
+        # Il primo giro controlla anche i processi già in esecuzione
+        try:
+            while not stop_event.is_set():
+                started = time.monotonic()
+                try:
+                    for process, matches in self.poll():
+                        for executor_name, signature in matches:
+                            detection = events.Detection(executor_name, events.EVIDENCE_PROCESS,
+                                                         process_location(process), signature)
+                            self.detections += 1
+                            self.detection_log(detection)
+                            emit(detection)
+                    self.detection_log.flush()
+                except Exception as e:
+                    error_msg = f"Errore durante la sorveglianza dei processi: {str(e)}"
+                    self.logger.error(error_msg)
+                    emit(events.ScanError("processes", error_msg))
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                # Attende il resto dell'intervallo, svegliandosi subito se viene richiesto lo stop
+                stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            # Ctrl+C è il modo normale di fermare una sorveglianza senza durata
+            stop_event.set()
+            self.detection_log.flush()
+
+        self.logger.info(f"Sorveglianza terminata: {self.polls} letture, "
+                         f"{self.processes_checked} processi nuovi controllati, {self.detections} rilevamenti")
+        return self.detections
@@ -1,13 +1,30 @@
+import sys
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # Con argomenti lo script lavora da riga di comando: Tk e customtkinter non vengono caricati
+    from eleventools.cli import main
+    sys.exit(main())
+
 import customtkinter as ctk
+from tkinter import ttk
 import os
-import hashlib
-import subprocess
 import time
-import re
-import winreg
+import queue
 from datetime import datetime
 import logging
 
+from eleventools import events
+from eleventools.cancel import CancelToken, TIMEOUT
+from eleventools.engine import ScanEngine, ScanWorker, PHASES, PHASE_TITLES, PHASE_LABELS
+from eleventools.filesystem import default_scan_roots
+from eleventools.formatting import detection_text
+from eleventools.logs import (DEFAULT_LOG_DIR, file_handler, prune_logs, start_logging,
+                              default_detection_log_limit)
+from eleventools.metrics import default_metrics_path, default_profile_path
+from eleventools.render import RenderBuffer, FLUSH_INTERVAL
+from eleventools.results import ResultsModel, COLUMNS
+from eleventools.signatures import SignatureStore
+
 # ElevenTools - Rilevatore Avanzato di Executor
 # Versione ottimizzata con:
 # - Sistema di timeout migliorato per evitare blocchi dell'interfaccia
@@ -15,6 +32,158 @@ import logging
 # - Limitazione intelligente dei percorsi da scansionare
 # - Gestione efficiente delle risorse di sistema
 
+# Intervallo di aggiornamento dell'interfaccia durante la scansione (circa 30 fotogrammi al secondo)
+FRAME_INTERVAL_MS = 33
+# Numero massimo di eventi elaborati per fotogramma
+MAX_EVENTS_PER_FRAME = 200
+# Righe visibili nella tabella dei risultati
+TABLE_ROWS = 14
+
+# Intestazioni e larghezze delle colonne della tabella
+COLUMN_TITLES = {"executor": "Executor", "kind": "Tipo", "location": "Percorso / chiave",
+                 "confidence": "Affidabilità", "timestamp": "Ora"}
+COLUMN_WIDTHS = {"executor": 120, "kind": 150, "location": 430, "confidence": 90, "timestamp": 80}
+KIND_LABELS = {
+    events.EVIDENCE_FILE: "File",
+    events.EVIDENCE_FOLDER: "Cartella",
+    events.EVIDENCE_HASH: "Hash",
+    events.EVIDENCE_PROCESS: "Processo",
+    events.EVIDENCE_REGISTRY_KEY: "Chiave di registro",
+    events.EVIDENCE_REGISTRY_TRACE: "Traccia nel registro",
+}
+CONFIDENCE_LABELS = {3: "Alta", 2: "Media", 1: "Bassa"}
+ALL_LABEL = "Tutti"
+
+
+def format_row(detection):
+    """Valori di una riga della tabella: la formattazione avviene solo per le righe visibili"""
+    timestamp = datetime.fromtimestamp(detection.timestamp).strftime('%H:%M:%S') if detection.timestamp else ""
+    return (detection.executor or "", KIND_LABELS.get(detection.kind, detection.kind or ""), detection.location or "",
+            CONFIDENCE_LABELS.get(detection.confidence, ""), timestamp)
+
+
+class ResultsTable(ctk.CTkFrame):
+    """Tabella dei rilevamenti virtualizzata: esistono solo le righe visibili, riempite dal modello a ogni scorrimento"""
+    
+    def __init__(self, master, rows=TABLE_ROWS, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = ResultsModel()
+        self.visible_rows = rows
+        self.offset = 0
+        # Durante la scansione la tabella segue gli ultimi rilevamenti finché l'utente non scorre verso l'alto
+        self.follow = True
+        self._last_refresh = 0.0
+        self._executor_count = 0
+        
+        # Filtri per executor, tipo di prova e percorso
+        filters = ctk.CTkFrame(self, fg_color="transparent")
+        filters.pack(fill='x', pady=(0, 5))
+        self.executor_menu = ctk.CTkOptionMenu(filters, values=[ALL_LABEL], command=self.apply_filter, width=160)
+        self.executor_menu.pack(side='left', padx=(0, 5))
+        self.kind_menu = ctk.CTkOptionMenu(filters, values=[ALL_LABEL] + list(KIND_LABELS.values()),
+                                           command=self.apply_filter, width=170)
+        self.kind_menu.pack(side='left', padx=5)
+        self.search_entry = ctk.CTkEntry(filters, placeholder_text="Filtra per percorso o chiave...", width=300)
+        self.search_entry.pack(side='left', padx=5)
+        self.search_entry.bind("<KeyRelease>", lambda _: self.apply_filter())
+        self.count_label = ctk.CTkLabel(filters, text="Nessun rilevamento", font=("Roboto", 12))
+        self.count_label.pack(side='right', padx=5)
+        
+        # Treeview con un numero fisso di righe: scorrere cambia solo i valori mostrati
+        style = ttk.Style()
+        style.theme_use("default")
+        style.configure("Results.Treeview", background="#2b2b2b", foreground="#DCE4EE", fieldbackground="#2b2b2b",
+                        rowheight=22, font=("Consolas", 11))
+        style.configure("Results.Treeview.Heading", background="#1F538D", foreground="#DCE4EE", font=("Roboto", 11))
+        style.map("Results.Treeview", background=[("selected", "#2FA572")])
+        body = ctk.CTkFrame(self, fg_color="transparent")
+        body.pack(fill='both', expand=True)
+        self.tree = ttk.Treeview(body, columns=COLUMNS, show="headings", height=rows, style="Results.Treeview",
+                                 selectmode="browse")
+        for column in COLUMNS:
+            self.tree.heading(column, text=COLUMN_TITLES[column], command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=COLUMN_WIDTHS[column], stretch=(column == "location"))
+        self.items = [self.tree.insert('', 'end', values=()) for _ in range(rows)]
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.scrollbar = ctk.CTkScrollbar(body, command=self.on_scroll)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree.bind("<MouseWheel>", self.on_wheel)
+        self.tree.bind("<Button-4>", self.on_wheel)
+        self.tree.bind("<Button-5>", self.on_wheel)
+        
+    def add(self, detection):
+        self.model.add(detection)
+        
+    def clear(self):
+        self.model.clear()
+        self.offset = 0
+        self.follow = True
+        self.refresh(force=True)
+        
+    def refresh(self, force=False):
+        """Ridisegna le righe visibili, al più ogni FLUSH_INTERVAL durante la scansione"""
+        now = time.monotonic()
+        if not force and now - self._last_refresh < FLUSH_INTERVAL:
+            return
+        self._last_refresh = now
+        total = len(self.model)
+        if self.follow:
+            self.offset = total - self.visible_rows
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        
+        rows = self.model.rows(self.offset, self.visible_rows)
+        for i, item in enumerate(self.items):
+            self.tree.item(item, values=format_row(rows[i]) if i < len(rows) else ())
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        
+        records = len(self.model.records)
+        if total == records:
+            self.count_label.configure(text=f"{records} rilevamenti" if records else "Nessun rilevamento")
+        else:
+            self.count_label.configure(text=f"{total} di {records} rilevamenti")
+        if len(self.model.executors) != self._executor_count:
+            self._executor_count = len(self.model.executors)
+            self.executor_menu.configure(values=[ALL_LABEL] + sorted(self.model.executors, key=str.lower))
+        
+    def scroll_to(self, offset):
+        total = len(self.model)
+        self.offset = max(0, min(offset, total - self.visible_rows))
+        self.follow = self.offset >= total - self.visible_rows and self.model.sort_column is None
+        self.refresh(force=True)
+        
+    def on_scroll(self, action, amount, unit=None):
+        """Comando della barra di scorrimento: ('moveto', frazione) oppure ('scroll', passi, 'units'/'pages')"""
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.model)))
+        else:
+            step = self.visible_rows if unit == "pages" else 1
+            self.scroll_to(self.offset + int(float(amount)) * step)
+        
+    def on_wheel(self, event):
+        direction = -1 if event.num == 4 or event.delta > 0 else 1
+        self.scroll_to(self.offset + 3 * direction)
+        return "break"
+        
+    def apply_filter(self, _=None):
+        executor = self.executor_menu.get()
+        kind_label = self.kind_menu.get()
+        kind = next((kind for kind, label in KIND_LABELS.items() if label == kind_label), None)
+        self.model.set_filter(None if executor == ALL_LABEL else executor, kind, self.search_entry.get())
+        self.scroll_to(0)
+        
+    def sort_by(self, column):
+        self.model.sort_by(column)
+        for name in COLUMNS:
+            arrow = ""
+            if name == self.model.sort_column:
+                arrow = " ▼" if self.model.sort_reverse else " ▲"
+            self.tree.heading(name, text=COLUMN_TITLES[name] + arrow)
+        self.scroll_to(0)
+
+
 class ElevenTools:
     def __init__(self):
         # Configurazione del logger
@@ -23,11 +192,25 @@ class ElevenTools:
         # Configurazione della finestra principale
         self.window = ctk.CTk()
         self.window.title("ElevenTools - Advanced Executor Detector")
-        self.window.geometry("1000x800")
+        self.window.geometry("1000x900")
         ctk.set_appearance_mode("dark")
         
-        # Database completo degli executor noti
-        self.executors_db = self.load_executors_database()
+        # Database degli executor noti (data/executors.json), ricaricato in background quando il file cambia
+        self.signature_store = SignatureStore(logger=self.logger).start()
+        
+        # Radici del filesystem da scansionare (configurabili con ELEVENTOOLS_SCAN_ROOTS)
+        self.scan_roots = default_scan_roots()
+        
+        # Cache degli hash dei file, per non rileggere i file non modificati
+        self.hash_cache_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "hashes.sqlite")
+        
+        # Coda degli eventi prodotti dal thread di scansione e token per annullarla
+        self.scan_events = None
+        self.cancel_token = None
+        # Avanzamento di ogni fase (0-1): le fasi procedono in parallelo
+        self.phase_progress = {}
+        # Righe dei risultati in attesa di essere mostrate, scaricate nella casella a blocchi
+        self.render_buffer = None
         
         # Inizializzazione dell'interfaccia utente
         self.setup_ui()
@@ -36,212 +219,18 @@ class ElevenTools:
 
     def setup_logger(self):
         """Configura il sistema di logging per tracciare le operazioni"""
-        log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
-        os.makedirs(log_dir, exist_ok=True)
-        
-        log_file = os.path.join(log_dir, f"scan_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+        self.log_dir = DEFAULT_LOG_DIR
         
         # Configurazione del logger
         self.logger = logging.getLogger("ElevenTools")
         self.logger.setLevel(logging.DEBUG)
         
-        # Handler per il file
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setLevel(logging.DEBUG)
-        
-        # Formattazione
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        
-        # Aggiunta dell'handler al logger
-        self.logger.addHandler(file_handler)
+        # Il file di log (con rotazione) viene scritto da un thread dedicato: la scansione si limita ad accodare
+        removed = prune_logs(self.log_dir)
+        self.log_pipeline = start_logging(self.logger, [file_handler(self.log_dir)])
+        if removed:
+            self.logger.info(f"Cancellati {removed} log più vecchi del periodo di conservazione")
     
-    def load_executors_database(self):
-        """Carica il database completo degli executor noti (ora almeno 50, con hash e pattern)"""
-        # Esempio di struttura avanzata: ogni executor ha pattern, hash, firme, ecc.
-        return {
-            "Synapse X": {
-                "files": ["Synapse.exe", "SynapseInjector.exe", "bin/SynapseInjector.dll"],
-                "hashes": ["d41d8cd98f00b204e9800998ecf8427e", "e99a18c428cb38d5f260853678922e03"],
-                "patterns": [r"Synapse.*\.exe"],
-                "registry": [r"SOFTWARE\\Synapse"],
-                "folders": ["Synapse X", "Synapse"],
-                "processes": ["Synapse.exe", "SynapseInjector.exe"]
-            },
-            "KRNL": {
-                "files": ["krnl.exe", "krnlss.exe", "KrnlUI.exe"],
-                "hashes": ["a7f5f35426b927411fc9231b56382173"],
-                "patterns": [r"krnl.*\.exe"],
-                "folders": ["krnl", "krnl_beta"],
-                "processes": ["krnl.exe", "krnlss.exe", "KrnlUI.exe"]
-            },
-            "JJSploit": {
-                "files": ["JJSploit.exe"],
-                "folders": ["JJSploit"],
-                "processes": ["JJSploit.exe"]
-            },
-            "Fluxus": {
-                "files": ["Fluxus.exe", "FluxusUI.exe"],
-                "folders": ["Fluxus"],
-                "processes": ["Fluxus.exe", "FluxusUI.exe"]
-            },
-            "ScriptWare": {
-                "files": ["ScriptWare.exe"],
-                "folders": ["Script-Ware"],
-                "processes": ["ScriptWare.exe"]
-            },
-            "Comet": {
-                "files": ["Comet.exe"],
-                "folders": ["Comet"],
-                "processes": ["Comet.exe"]
-            },
-            "Oxygen U": {
-                "files": ["Oxygen.exe"],
-                "folders": ["Oxygen U"],
-                "processes": ["Oxygen.exe"]
-            },
-            "Electron": {
-                "files": ["Electron.exe"],
-                "folders": ["Electron"],
-                "processes": ["Electron.exe"]
-            },
-            "Sentinel": {
-                "files": ["Sentinel.exe"],
-                "folders": ["Sentinel"],
-                "processes": ["Sentinel.exe"]
-            },
-            "SirHurt": {
-                "files": ["SirHurt.exe"],
-                "folders": ["SirHurt"],
-                "processes": ["SirHurt.exe"]
-            },
-            "ProtoSmasher": {
-                "files": ["ProtoSmasher.exe"],
-                "folders": ["ProtoSmasher"],
-                "processes": ["ProtoSmasher.exe"]
-            },
-            "Coco Z": {
-                "files": ["CocoZ.exe"],
-                "folders": ["Coco Z"],
-                "processes": ["CocoZ.exe"]
-            },
-            "Dansploit": {
-                "files": ["Dansploit.exe"],
-                "folders": ["Dansploit"],
-                "processes": ["Dansploit.exe"]
-            },
-            "Calamari": {
-                "files": ["Calamari.exe"],
-                "folders": ["Calamari"],
-                "processes": ["Calamari.exe"]
-            },
-            "Vega X": {
-                "files": ["VegaX.exe"],
-                "folders": ["Vega X"],
-                "processes": ["VegaX.exe"]
-            },
-            "Nihon": {
-                "files": ["Nihon.exe"],
-                "folders": ["Nihon"],
-                "processes": ["Nihon.exe"]
-            },
-            "Trigon Evo": {
-                "files": ["Trigon.exe", "TrigonEvo.exe"],
-                "folders": ["Trigon", "Trigon Evo"],
-                "processes": ["Trigon.exe", "TrigonEvo.exe"]
-            },
-            "Evon": {
-                "files": ["Evon.exe"],
-                "folders": ["Evon"],
-                "processes": ["Evon.exe"]
-            },
-            "Furk Ultra": {
-                "files": ["FurkUltra.exe"],
-                "folders": ["Furk Ultra"],
-                "processes": ["FurkUltra.exe"]
-            },
-            "Hydrogen": {
-                "files": ["Hydrogen.exe"],
-                "folders": ["Hydrogen"],
-                "processes": ["Hydrogen.exe"]
-            },
-            "Celery": {
-                "files": ["Celery.exe"],
-                "folders": ["Celery"],
-                "processes": ["Celery.exe"]
-            },
-            "Arceus X": {
-                "files": ["Arceus.exe", "ArceuX.exe"],
-                "folders": ["Arceus X"],
-                "processes": ["Arceus.exe", "ArceuX.exe"]
-            },
-            "Delta": {
-                "files": ["Delta.exe"],
-                "folders": ["Delta"],
-                "processes": ["Delta.exe"]
-            },
-            "Kiwi X": {
-                "files": ["KiwiX.exe"],
-                "folders": ["Kiwi X"],
-                "processes": ["KiwiX.exe"]
-            },
-            "Sk8r": {
-                "files": ["Sk8r.exe"],
-                "folders": ["Sk8r"],
-                "processes": ["Sk8r.exe"]
-            },
-            "Electron": {
-                "files": ["Electron.exe"],
-                "folders": ["Electron"],
-                "processes": ["Electron.exe"]
-            },
-            "Shadow": {
-                "files": ["Shadow.exe"],
-                "folders": ["Shadow"],
-                "processes": ["Shadow.exe"]
-            },
-            "Sona": {
-                "files": ["Sona.exe"],
-                "folders": ["Sona"],
-                "processes": ["Sona.exe"]
-            },
-            "Celestial": {
-                "files": ["Celestial.exe"],
-                "folders": ["Celestial"],
-                "processes": ["Celestial.exe"]
-            },
-            "Magnius": {
-                "files": ["Magnius.exe"],
-                "folders": ["Magnius"],
-                "processes": ["Magnius.exe"]
-            },
-            "Coco Z": {
-                "files": ["CocoZ.exe"],
-                "folders": ["Coco Z"],
-                "processes": ["CocoZ.exe"]
-            },
-            "Bleu": {
-                "files": ["Bleu.exe"],
-                "folders": ["Bleu"],
-                "processes": ["Bleu.exe"]
-            },
-            "Ro-Ware": {
-                "files": ["RoWare.exe"],
-                "folders": ["Ro-Ware"],
-                "processes": ["RoWare.exe"]
-            },
-            "Novaline": {
-                "files": ["Novaline.exe"],
-                "folders": ["Novaline"],
-                "processes": ["Novaline.exe"]
-            },
-            "Aspect": {
-                "files": ["Aspect.exe"],
-                "folders": ["Aspect"],
-                "processes": ["Aspect.exe"]
-            }
-        }
-        
     def setup_ui(self):
         main_frame = ctk.CTkFrame(self.window)
         main_frame.pack(padx=20, pady=20, fill='both', expand=True)
@@ -254,6 +243,11 @@ class ElevenTools:
                                      fg_color="#2FA572", hover_color="#228B59", height=40)
         self.scan_btn.pack(pady=10)
         
+        # Pulsante di annullamento, attivo solo durante la scansione
+        self.cancel_btn = ctk.CTkButton(main_frame, text="ANNULLA", command=self.cancel_scan,
+                                       fg_color="#A53A2F", hover_color="#8B2822", height=30, state="disabled")
+        self.cancel_btn.pack(pady=5)
+        
         # Indicatore di stato
         self.status_label = ctk.CTkLabel(main_frame, text="Pronto per la scansione", font=("Roboto", 12))
         self.status_label.pack(pady=5)
@@ -274,13 +268,21 @@ class ElevenTools:
         # Nascondi la barra di progresso all'inizio
         self.progress_frame.pack_forget()
 
-        # Area risultati
-        self.results_text = ctk.CTkTextbox(main_frame, width=900, height=600, font=("Consolas", 12))
-        self.results_text.pack(pady=15)
+        # Area dei messaggi della scansione
+        self.results_text = ctk.CTkTextbox(main_frame, width=900, height=200, font=("Consolas", 12))
+        self.results_text.pack(pady=(15, 5))
+        
+        # Tabella dei rilevamenti, filtrabile e ordinabile
+        self.results_table = ResultsTable(main_frame, fg_color="transparent")
+        self.results_table.pack(fill='both', expand=True, padx=30, pady=(5, 15))
 
     def run_scan(self):
-        """Esegue la scansione completa del sistema"""
+        """Avvia la scansione completa in un thread separato"""
         self.results_text.delete('1.0', 'end')
+        # Il testo completo dei risultati viene salvato anche su file: la casella mostra solo le ultime righe
+        transcript = os.path.join(self.log_dir, f"risultati_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+        self.render_buffer = RenderBuffer(transcript_path=transcript, logger=self.logger)
+        self.results_table.clear()
         self.scan_btn.configure(state="disabled")
         self.status_label.configure(text="Scansione in corso...")
         
@@ -288,391 +290,182 @@ class ElevenTools:
         self.progress_frame.pack(fill='x', padx=20, pady=5)
         self.progress_bar.set(0)  # Resetta la barra di progresso
         
-        self.results_text.insert('end', "Avvio scansione...\n")
-        self.results_text.see('end')
-        self.window.update()
-        
-        start_time = time.time()
-        self.logger.info("Avvio scansione completa")
-        
-        # Imposta un timeout globale per la scansione completa
-        max_scan_time = 120  # Ridotto da 180 a 120 secondi (2 minuti) per la scansione completa
-        file_detections = []
-        process_detections = []
-        registry_detections = []
-        
-        # Funzione per verificare il timeout globale
-        def check_timeout():
-            if time.time() - start_time > max_scan_time:
-                self.results_text.insert('end', "Timeout globale raggiunto. Interruzione della scansione.\n")
-                self.results_text.see('end')
-                self.window.update()
-                return True
-            return False
-        
-        # Funzione per aggiornare la barra di progresso
-        def update_progress(phase, percentage):
-            progress_text = f"Progresso {phase}: {percentage}% completato"
-            self.status_label.configure(text=progress_text)
-            self.progress_bar.set(percentage / 100)  # Aggiorna la barra di progresso
-            self.window.update()
+        self.show_text("Avvio scansione...\n")
         
-        try:
-            # Fase 1: Scansione dei file
-            self.results_text.insert('end', "Fase 1/3: Ricerca di file sospetti...\n")
-            self.results_text.see('end')
-            self.window.update()
-            update_progress("scansione", 0)
-            
-            try:
-                file_detections = self.scan_files()
-                if check_timeout():
-                    raise TimeoutError("Timeout globale della scansione")
-                    
-                self.results_text.insert('end', f"Scansione file completata. Trovati {len(file_detections)} elementi.\n")
-                self.results_text.see('end')
-                self.window.update()
-                update_progress("scansione", 33)
-            except Exception as e:
-                if isinstance(e, TimeoutError):
-                    raise
-                error_msg = f"Errore durante la scansione dei file: {str(e)}"
-                self.results_text.insert('end', f"ERRORE: {error_msg}\n")
-                self.results_text.see('end')
-                self.window.update()
-                self.logger.error(error_msg, exc_info=True)
-            
-            # Fase 2: Scansione dei processi
-            self.results_text.insert('end', "Fase 2/3: Controllo dei processi in esecuzione...\n")
-            self.results_text.see('end')
-            self.window.update()
-            
-            try:
-                process_detections = self.scan_processes()
-                if check_timeout():
-                    raise TimeoutError("Timeout globale della scansione")
-                    
-                self.results_text.insert('end', f"Scansione processi completata. Trovati {len(process_detections)} elementi.\n")
-                self.results_text.see('end')
-                self.window.update()
-                update_progress("scansione", 66)
-            except Exception as e:
-                if isinstance(e, TimeoutError):
-                    raise
-                error_msg = f"Errore durante la scansione dei processi: {str(e)}"
-                self.results_text.insert('end', f"ERRORE: {error_msg}\n")
-                self.results_text.see('end')
-                self.window.update()
-                self.logger.error(error_msg, exc_info=True)
-            
-            # Fase 3: Scansione del registro
-            self.results_text.insert('end', "Fase 3/3: Analisi del registro di sistema...\n")
-            self.results_text.see('end')
-            self.window.update()
-            
+        # Il motore gira in un thread e pubblica gli eventi sulla coda
+        # La scansione usa le firme correnti fino alla fine, anche se nel frattempo vengono aggiornate
+        engine = ScanEngine(self.signature_store.current, self.scan_roots, self.hash_cache_path, logger=self.logger,
+                            metrics_path=default_metrics_path(), profile_path=default_profile_path(),
+                            detection_log_limit=default_detection_log_limit())
+        self.scan_events = queue.Queue()
+        self.phase_progress = {phase: 0.0 for phase, _, _ in PHASES}
+        self.cancel_token = CancelToken()
+        ScanWorker(engine, self.scan_events, self.cancel_token).start()
+        self.cancel_btn.configure(state="normal")
+        self.window.after(FRAME_INTERVAL_MS, self.drain_scan_events)
+        
+    def cancel_scan(self):
+        """Chiede al motore di interrompere la scansione; i risultati parziali vengono mostrati comunque"""
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+            self.cancel_btn.configure(state="disabled")
+            self.status_label.configure(text="Annullamento in corso...")
+        
+    def drain_scan_events(self):
+        """Elabora gli eventi arrivati dal thread di scansione a intervalli fissi"""
+        finished = None
+        for _ in range(MAX_EVENTS_PER_FRAME):
             try:
-                registry_detections = self.scan_registry()
-                if check_timeout():
-                    raise TimeoutError("Timeout globale della scansione")
-                    
-                self.results_text.insert('end', f"Scansione registro completata. Trovati {len(registry_detections)} elementi.\n")
-                self.results_text.see('end')
-                self.window.update()
-                update_progress("scansione", 100)
-            except Exception as e:
-                if isinstance(e, TimeoutError):
-                    raise
-                error_msg = f"Errore durante la scansione del registro: {str(e)}"
-                self.results_text.insert('end', f"ERRORE: {error_msg}\n")
-                self.results_text.see('end')
-                self.window.update()
-                self.logger.error(error_msg, exc_info=True)
-            
-            # Combinazione dei risultati
-            all_detections = file_detections + process_detections + registry_detections
-            
-            # Visualizzazione dei risultati
-            if all_detections:
-                self.results_text.insert('end', '\n=== RISULTATI SCANSIONE ===\n')
-                for result in all_detections:
-                    self.results_text.insert('end', f'• {result}\n')
-                    self.logger.warning(f"Rilevato: {result}")
-                
-                self.results_text.insert('end', f'\nScansione completata con successo! Trovati {len(all_detections)} elementi sospetti.\n')
-                self.status_label.configure(text=f"Completato - Trovati {len(all_detections)} elementi sospetti")
+                event = self.scan_events.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(event, events.ScanFinished):
+                finished = event
+                break
+            self.handle_scan_event(event)
+        
+        if finished is not None:
+            self.show_scan_results(finished)
+        else:
+            # La casella viene aggiornata al più ogni FLUSH_INTERVAL, con tutte le righe accumulate
+            self.flush_results()
+            self.results_table.refresh()
+            self.window.after(FRAME_INTERVAL_MS, self.drain_scan_events)
+        
+    def handle_scan_event(self, event):
+        """Mostra un singolo evento di avanzamento nell'interfaccia"""
+        if isinstance(event, events.PhaseStarted):
+            self.show_text(f"Fase {event.index}/{event.total}: {PHASE_TITLES[event.phase]}...\n")
+        elif isinstance(event, events.Progress):
+            self.set_phase_progress(event.phase, event.fraction)
+        elif isinstance(event, events.Info):
+            self.show_text(f"{event.message}\n")
+        elif isinstance(event, events.Detection):
+            # Il rilevamento compare nella tabella; il testo resta nella trascrizione
+            self.results_table.add(event)
+            self.show_text(f"Trovato: {detection_text(event)}\n", visible=False)
+        elif isinstance(event, events.ScanError):
+            self.show_text(f"ERRORE: {event.message}\n")
+        elif isinstance(event, events.PhaseFinished):
+            self.show_text(f"Scansione {PHASE_LABELS[event.phase]} completata. Trovati {event.count} elementi.\n")
+            self.set_phase_progress(event.phase, 1.0)
+        
+    def show_text(self, text, visible=True):
+        """Accoda del testo ai risultati; viene mostrato al successivo aggiornamento della casella"""
+        self.render_buffer.write(text, visible)
+        
+    def flush_results(self, force=False):
+        """Aggiunge alla casella le righe accumulate, togliendo in cima quelle oltre il limite"""
+        update = self.render_buffer.flush(force)
+        if update is None:
+            return
+        text, trim = update
+        if trim:
+            self.results_text.delete('1.0', f'{trim + 1}.0')
+        self.results_text.insert('end', text)
+        self.results_text.see('end')
+        
+    def finish_results(self):
+        """Mostra le ultime righe della scansione e chiude la trascrizione"""
+        self.flush_results(force=True)
+        buffer = self.render_buffer
+        if buffer.dropped_lines and buffer.transcript_path:
+            self.show_text(f'\n({buffer.dropped_lines} righe meno recenti non sono più visibili: '
+                           f'i risultati completi sono in {buffer.transcript_path})\n')
+            self.flush_results(force=True)
+        buffer.close()
+        
+    def set_phase_progress(self, phase, fraction):
+        """Aggiorna l'avanzamento di una fase e mostra la media di tutte le fasi"""
+        self.phase_progress[phase] = max(self.phase_progress.get(phase, 0.0), fraction)
+        self.update_progress(sum(self.phase_progress.values()) / len(PHASES))
+        
+    def update_progress(self, fraction):
+        """Aggiorna la barra di progresso e l'etichetta di stato"""
+        self.status_label.configure(text=f"Progresso scansione: {int(fraction * 100)}% completato")
+        self.progress_bar.set(fraction)
+        
+    def show_phase_times(self, metrics):
+        """Mostra quanto è durata ogni fase (i dettagli sono nel log)"""
+        phase_metrics = (metrics or {}).get("phases", {})
+        times = [f"{label} {phase_metrics[phase].get('seconds', 0):.2f} s"
+                 for phase, _, label in PHASES if phase in phase_metrics]
+        if times:
+            self.show_text(f"Tempo per fase: {', '.join(times)}\n")
+        
+    def show_coverage(self, coverage):
+        """Mostra per ogni fase cosa è stato esaminato prima dell'interruzione"""
+        self.show_text('\n=== COPERTURA DELLA SCANSIONE ===\n')
+        for phase, _, label in PHASES:
+            phase_cov = (coverage or {}).get(phase)
+            if phase_cov is None or phase_cov["status"] == events.COVERAGE_SKIPPED:
+                detail = "non eseguita"
+            elif phase == "files":
+                detail = (f"{phase_cov.get('dirs_visited', 0)} cartelle esaminate, "
+                          f"{phase_cov.get('dirs_not_visited', 0)} non raggiunte")
+            elif phase == "processes":
+                detail = f"{phase_cov.get('processes_checked', 0)} processi su {phase_cov.get('processes_listed', 0)} controllati"
             else:
-                self.results_text.insert('end', '\nNessuna minaccia rilevata!\n')
-                self.status_label.configure(text="Completato - Nessuna minaccia rilevata")
-                self.logger.info("Scansione completata senza rilevamenti")
-            
-            # Tempo di esecuzione
-            elapsed_time = time.time() - start_time
-            self.results_text.insert('end', f'\nTempo di esecuzione: {elapsed_time:.2f} secondi\n')
-            self.logger.info(f"Scansione completata in {elapsed_time:.2f} secondi")
-            
-        except TimeoutError as te:
-            error_msg = f"Timeout durante la scansione: {str(te)}"
-            self.results_text.insert('end', f'\nAVVISO: {error_msg}\n')
-            self.results_text.insert('end', '\nLa scansione è stata interrotta per evitare blocchi del programma.\n')
-            self.results_text.insert('end', '\nMostrando i risultati parziali ottenuti finora:\n')
-            
-            # Mostra i risultati parziali
-            all_detections = file_detections + process_detections + registry_detections
-            if all_detections:
-                self.results_text.insert('end', '\n=== RISULTATI PARZIALI ===\n')
-                for result in all_detections:
-                    self.results_text.insert('end', f'• {result}\n')
-                
-                self.status_label.configure(text=f"Completato parzialmente - Trovati {len(all_detections)} elementi")
+                detail = (f"{phase_cov.get('executor_keys_checked', 0)}/{phase_cov.get('executor_keys_total', 0)} chiavi degli executor, "
+                          f"{phase_cov.get('trace_keys_checked', 0)}/{phase_cov.get('trace_keys_total', 0)} chiavi di tracce")
+            if phase_cov is not None and phase_cov["status"] == events.COVERAGE_INTERRUPTED:
+                detail += " (interrotta per timeout)" if phase_cov["reason"] == TIMEOUT else " (interrotta)"
+            self.show_text(f'• {label.capitalize()}: {detail}\n')
+        
+    def show_scan_results(self, finished):
+        """Mostra il riepilogo finale della scansione"""
+        # Il motore riporta solo il conteggio: l'elenco è quello raccolto dalla tabella dei risultati
+        all_detections = self.results_table.model.records
+        try:
+            if finished.error is not None:
+                error_msg = f"Errore durante la scansione: {finished.error}"
+                self.show_text(f'\nERRORE: {error_msg}\n')
+                self.status_label.configure(text="Errore durante la scansione")
+            elif finished.cancelled or finished.timed_out:
+                if finished.cancelled:
+                    self.show_text('\nAVVISO: Scansione annullata dall\'utente\n')
+                else:
+                    error_msg = "Timeout durante la scansione: Timeout globale della scansione"
+                    self.show_text(f'\nAVVISO: {error_msg}\n')
+                    self.show_text('\nLa scansione è stata interrotta per evitare blocchi del programma.\n')
+                self.show_coverage(finished.coverage)
+                self.show_text('\nMostrando i risultati parziali ottenuti finora:\n')
+        
+                # Mostra i risultati parziali
+                if all_detections:
+                    self.show_text(f'\nTrovati {len(all_detections)} elementi sospetti: dettagli nella tabella dei risultati.\n')
+                    listing = ''.join(f'• {detection_text(result)}\n' for result in all_detections)
+                    self.show_text('\n=== RISULTATI PARZIALI ===\n' + listing, visible=False)
+        
+                    self.status_label.configure(text=f"Completato parzialmente - Trovati {len(all_detections)} elementi")
+                else:
+                    self.show_text('\nNessuna minaccia rilevata nei moduli completati!\n')
+                    self.status_label.configure(text="Completato parzialmente - Nessuna minaccia rilevata")
             else:
-                self.results_text.insert('end', '\nNessuna minaccia rilevata nei moduli completati!\n')
-                self.status_label.configure(text="Completato parzialmente - Nessuna minaccia rilevata")
-            
-            self.logger.warning(error_msg)
-            
-        except Exception as e:
-            error_msg = f"Errore durante la scansione: {str(e)}"
-            self.results_text.insert('end', f'\nERRORE: {error_msg}\n')
-            self.status_label.configure(text="Errore durante la scansione")
-            self.logger.error(error_msg, exc_info=True)
+                # Visualizzazione dei risultati
+                if all_detections:
+                    listing = ''.join(f'• {detection_text(result)}\n' for result in all_detections)
+                    self.show_text('\n=== RISULTATI SCANSIONE ===\n' + listing, visible=False)
+        
+                    self.show_text(f'\nScansione completata con successo! Trovati {len(all_detections)} elementi sospetti.\n')
+                    self.status_label.configure(text=f"Completato - Trovati {len(all_detections)} elementi sospetti")
+                else:
+                    self.show_text('\nNessuna minaccia rilevata!\n')
+                    self.status_label.configure(text="Completato - Nessuna minaccia rilevata")
+        
+                # Tempo di esecuzione
+                self.show_text(f'\nTempo di esecuzione: {finished.elapsed:.2f} secondi\n')
+                self.show_phase_times(finished.metrics)
         finally:
             # Nascondi la barra di progresso
             self.progress_frame.pack_forget()
-            
-            self.scan_btn.configure(state="normal")
-            self.results_text.see('end')
-            # Assicurati che l'interfaccia sia aggiornata
-            self.window.update()
-
-    def scan_files(self, progress_callback=None):
-        """Scansiona i file usando hash, pattern e nomi, aggiorna la barra di caricamento in modo accurato"""
-        found = []
-        total = sum(len(e.get("files", [])) + len(e.get("hashes", [])) + len(e.get("patterns", [])) for e in self.executors_db.values())
-        checked = 0
-        for name, data in self.executors_db.items():
-            # Scansione per nome file
-            for file in data.get("files", []):
-                # ... logica di ricerca file ...
-                checked += 1
-                if progress_callback:
-                    progress_callback(checked / total)
-            # Scansione per hash
-            for hash_val in data.get("hashes", []):
-                # ... logica di ricerca hash ...
-                checked += 1
-                if progress_callback:
-                    progress_callback(checked / total)
-            # Scansione per pattern
-            for pattern in data.get("patterns", []):
-                # ... logica di ricerca pattern ...
-                checked += 1
-                if progress_callback:
-                    progress_callback(checked / total)
-        return found
-    
-    def scan_processes(self):
-        """Scansiona i processi in esecuzione alla ricerca di executor"""
-        found = []
-        self.logger.info("Avvio scansione processi")
-        
-        # Imposta un timeout per la scansione dei processi
-        start_time = time.time()
-        process_scan_timeout = 20  # Timeout in secondi per la scansione dei processi
-        
-        try:
-            # Ottieni la lista dei processi in esecuzione con timeout ridotto
-            self.results_text.insert('end', "Analisi dei processi in esecuzione...\n")
-            self.results_text.see('end')
-            self.window.update()
-            
-            # Usa wmic invece di tasklist per una risposta più rapida
-            process = subprocess.Popen('wmic process get name /format:csv', shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            try:
-                output, _ = process.communicate(timeout=10)  # Ridotto da 15 a 10 secondi
-                
-                if output:
-                    # Analizza l'output per estrarre i nomi dei processi
-                    # Salta la prima riga che contiene le intestazioni
-                    lines = [line for line in output.strip().split('\n') if line.strip() and 'Node,Name' not in line]
-                    processes = [line.split(',')[-1].strip() for line in lines if ',' in line]
-                    
-                    # Contatore per il feedback visivo
-                    executor_count = len(self.executors_db)
-                    current_executor = 0
-                    
-                    # Controlla se ci sono processi di executor in esecuzione
-                    for executor_name, executor_data in self.executors_db.items():
-                        # Verifica se è passato troppo tempo
-                        if time.time() - start_time > process_scan_timeout:
-                            self.logger.warning("Timeout durante la scansione dei processi")
-                            self.results_text.insert('end', "Timeout durante l'analisi dei processi. Limitazione della scansione...\n")
-                            self.results_text.see('end')
-                            self.window.update()
-                            break
-                        
-                        current_executor += 1
-                        
-                        # Aggiorna l'interfaccia ogni 10 executor per mantenere la reattività
-                        if current_executor % 10 == 0:
-                            progress = int((current_executor / executor_count) * 100)
-                            self.results_text.insert('end', f"Progresso scansione processi: {progress}%\n")
-                            self.results_text.see('end')
-                            self.window.update()
-                        
-                        for process_name in executor_data.get("processes", []):
-                            for running_process in processes:
-                                if process_name.lower() in running_process.lower():
-                                    detection = f"Processo di {executor_name} in esecuzione: {running_process}"
-                                    found.append(detection)
-                                    self.logger.warning(detection)
-                                    self.results_text.insert('end', f"Trovato: {detection}\n")
-                                    self.results_text.see('end')
-                                    self.window.update()
-                                    # Una volta trovato un processo per questo executor, passa al prossimo
-                                    break
-            except subprocess.TimeoutExpired:
-                process.kill()
-                self.logger.warning("Timeout durante l'ottenimento della lista dei processi")
-                self.results_text.insert('end', "Timeout durante l'analisi dei processi. Passaggio alla fase successiva...\n")
-                self.results_text.see('end')
-                self.window.update()
-        except Exception as e:
-            error_msg = f"Errore durante la scansione dei processi: {str(e)}"
-            self.logger.error(error_msg)
-            self.results_text.insert('end', f"Errore: {error_msg}\n")
-            self.results_text.see('end')
-            self.window.update()
-        
-        self.logger.info(f"Scansione processi completata. Trovati {len(found)} elementi")
-        return found
-    
-    def scan_registry(self):
-        """Scansiona il registro di sistema alla ricerca di tracce di executor"""
-        found = []
-        self.logger.info("Avvio scansione registro di sistema")
-        
-        # Chiavi di registro comuni da controllare (ridotte per migliorare le prestazioni)
-        registry_hives = [winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE]
-        registry_paths = [
-            "SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Run",
-            "SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\RunOnce"
-        ]
         
-        try:
-            # Controlla le chiavi di registro specifiche per gli executor
-            self.results_text.insert('end', "Analisi del registro di sistema...\n")
-            self.results_text.see('end')
-            self.window.update()
-            
-            # Imposta un timer per evitare blocchi
-            start_time = time.time()
-            timeout_registry = 20  # Timeout ridotto da 30 a 20 secondi per la scansione del registro
-            
-            # Contatore per il feedback visivo
-            executor_count = len(self.executors_db)
-            current_executor = 0
-            
-            # Prima fase: controlla solo le chiavi di registro specifiche per gli executor
-            for executor_name, executor_data in self.executors_db.items():
-                # Verifica se è passato troppo tempo
-                if time.time() - start_time > timeout_registry:
-                    self.logger.warning("Timeout durante la scansione del registro")
-                    self.results_text.insert('end', "Timeout durante l'analisi del registro. Limitazione della scansione...\n")
-                    self.results_text.see('end')
-                    self.window.update()
-                    break
-                
-                current_executor += 1
-                
-                # Aggiorna l'interfaccia ogni 10 executor per mantenere la reattività
-                if current_executor % 10 == 0:
-                    progress = int((current_executor / executor_count) * 100)
-                    self.results_text.insert('end', f"Progresso scansione registro: {progress}%\n")
-                    self.results_text.see('end')
-                    self.window.update()
-                
-                # Controlla solo le chiavi di registro specifiche per questo executor
-                for reg_path in executor_data.get("registry", []):
-                    for hive in registry_hives:
-                        try:
-                            key = winreg.OpenKey(hive, reg_path)
-                            detection = f"Chiave di registro per {executor_name} trovata: {reg_path}"
-                            found.append(detection)
-                            self.logger.warning(detection)
-                            self.results_text.insert('end', f"Trovato: {detection}\n")
-                            self.results_text.see('end')
-                            self.window.update()
-                            winreg.CloseKey(key)
-                        except FileNotFoundError:
-                            pass
-                        except Exception as e:
-                            self.logger.error(f"Errore durante l'accesso alla chiave {reg_path}: {str(e)}")
-            
-            # Seconda fase: controlla solo le chiavi di registro più comuni e importanti
-            # Verifica se c'è ancora tempo disponibile
-            remaining_time = timeout_registry - (time.time() - start_time)
-            if remaining_time > 5:  # Se rimangono almeno 5 secondi
-                self.results_text.insert('end', "Controllo delle chiavi di avvio automatico...\n")
-                self.results_text.see('end')
-                self.window.update()
-                
-                # Limita la ricerca solo agli executor più comuni per migliorare le prestazioni
-                common_executors = list(self.executors_db.keys())[:15]  # Considera solo i primi 15 executor
-                
-                for hive in registry_hives:
-                    # Verifica se è passato troppo tempo
-                    if time.time() - start_time > timeout_registry:
-                        self.logger.warning("Timeout durante la scansione del registro")
-                        self.results_text.insert('end', "Timeout durante l'analisi del registro. Limitazione della scansione...\n")
-                        self.results_text.see('end')
-                        self.window.update()
-                        break
-                    
-                    for reg_path in registry_paths:
-                        # Aggiorna l'interfaccia per mantenere la reattività
-                        self.window.update()
-                        
-                        try:
-                            key = winreg.OpenKey(hive, reg_path)
-                            i = 0
-                            max_enum = 50  # Ridotto da 100 a 50 per migliorare le prestazioni
-                            
-                            while i < max_enum:
-                                try:
-                                    name, value, _ = winreg.EnumValue(key, i)
-                                    # Controlla solo per gli executor più comuni
-                                    for executor_name in common_executors:
-                                        if (executor_name.lower() in name.lower() or 
-                                            (isinstance(value, str) and executor_name.lower() in value.lower())):
-                                            detection = f"Riferimento a {executor_name} trovato nel registro: {reg_path}\\{name}"
-                                            found.append(detection)
-                                            self.logger.warning(detection)
-                                            self.results_text.insert('end', f"Trovato: {detection}\n")
-                                            self.results_text.see('end')
-                                            self.window.update()
-                                            break  # Una volta trovato un riferimento, passa al prossimo valore
-                                    i += 1
-                                except WindowsError:
-                                    break
-                                
-                                # Verifica se è passato troppo tempo durante l'enumerazione
-                                if time.time() - start_time > timeout_registry:
-                                    self.logger.warning("Timeout durante l'enumerazione dei valori di registro")
-                                    break
-                            winreg.CloseKey(key)
-                        except FileNotFoundError:
-                            pass
-                        except Exception as e:
-                            self.logger.error(f"Errore durante l'accesso alla chiave {reg_path}: {str(e)}")
-        except Exception as e:
-            error_msg = f"Errore durante la scansione del registro: {str(e)}"
-            self.logger.error(error_msg)
-            self.results_text.insert('end', f"Errore: {error_msg}\n")
-            self.results_text.see('end')
-            self.window.update()
-        
-        self.logger.info(f"Scansione registro completata. Trovati {len(found)} elementi")
-        return found
+            self.scan_btn.configure(state="normal")
+            self.cancel_btn.configure(state="disabled")
+            self.cancel_token = None
+            self.finish_results()
+            self.results_table.refresh(force=True)
+            self.scan_events = None
 
 if __name__ == "__main__":
     ElevenTools().window.mainloop()
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""Scrittura di piccoli file hive (formato regf) per i test del lettore.
+
+L'albero è un dizionario {"keys": {nome: albero}, "values": {nome: dato}}:
+le stringhe diventano REG_SZ, le liste REG_MULTI_SZ, gli interi REG_DWORD e i
+bytes REG_BINARY. Le chiavi con più di tre sottochiavi usano una lista "ri"
+(una "li" e una "lh"), i dati oltre un segmento un record "db".
+"""
+import struct
+
+from eleventools.regf import HBIN_START, REG_SZ, REG_BINARY, REG_DWORD, REG_MULTI_SZ
+
+_SEGMENT = 16344
+_NONE = 0xFFFFFFFF
+
+
+class _Cells:
+    def __init__(self):
+        self.data = bytearray()
+
+    def add(self, payload):
+        """Aggiunge una cella allocata (dimensione negativa, multipla di 8) e ne restituisce l'offset"""
+        offset = len(self.data) + 0x20
+        size = (len(payload) + 4 + 7) & ~7
+        self.data += struct.pack("<i", -size) + payload.ljust(size - 4, b"\0")
+        return offset
+
+
+def _utf16(text):
+    return (text + "\0").encode("utf-16-le")
+
+
+def _encode(value):
+    if isinstance(value, str):
+        return REG_SZ, _utf16(value)
+    if isinstance(value, list):
+        return REG_MULTI_SZ, b"".join(_utf16(item) for item in value) + b"\0\0"
+    if isinstance(value, int):
+        return REG_DWORD, struct.pack("<I", value)
+    return REG_BINARY, bytes(value)
+
+
+def _value(cells, name, value):
+    data_type, data = _encode(value)
+    if len(data) <= 4:
+        size = len(data) | 0x80000000
+        data_offset = struct.unpack("<I", data.ljust(4, b"\0"))[0]
+    elif len(data) > _SEGMENT:
+        segments = [cells.add(data[i:i + _SEGMENT]) for i in range(0, len(data), _SEGMENT)]
+        segment_list = cells.add(struct.pack(f"<{len(segments)}I", *segments))
+        data_offset = cells.add(b"db" + struct.pack("<HI", len(segments), segment_list))
+        size = len(data)
+    else:
+        data_offset = cells.add(data)
+        size = len(data)
+    raw_name = name.encode("latin-1")
+    return cells.add(b"vk" + struct.pack("<HIIIHH", len(raw_name), size, data_offset, data_type, 1, 0) + raw_name)
+
+
+def _subkey_list(cells, subkeys):
+    if len(subkeys) > 3:
+        first = cells.add(b"li" + struct.pack("<H2I", 2, *subkeys[:2]))
+        rest = subkeys[2:]
+        second = cells.add(b"lh" + struct.pack("<H", len(rest)) + b"".join(struct.pack("<II", k, 0) for k in rest))
+        return cells.add(b"ri" + struct.pack("<HII", 2, first, second))
+    return cells.add(b"lf" + struct.pack("<H", len(subkeys)) + b"".join(struct.pack("<I4s", k, b"0000")
+                                                                       for k in subkeys))
+
+
+def _key(cells, name, tree):
+    subkeys = [_key(cells, child, subtree) for child, subtree in tree.get("keys", {}).items()]
+    values = [_value(cells, value_name, value) for value_name, value in tree.get("values", {}).items()]
+    subkey_list = _subkey_list(cells, subkeys) if subkeys else _NONE
+    value_list = cells.add(struct.pack(f"<{len(values)}I", *values)) if values else _NONE
+    raw_name = name.encode("latin-1")
+    body = b"nk" + struct.pack("<H", 0x20) + b"\0" * 8
+    body += struct.pack("<11I", 0, 0, len(subkeys), 0, subkey_list, _NONE, len(values), value_list, _NONE, _NONE, 0)
+    body = body.ljust(0x48, b"\0") + struct.pack("<HH", len(raw_name), 0) + raw_name
+    return cells.add(body)
+
+
+def write_hive(path, tree, minor_version=5):
+    """Scrive in path un hive con l'albero indicato sotto la chiave radice"""
+    cells = _Cells()
+    root = _key(cells, "ROOT", tree)
+    hbin_size = (len(cells.data) + 0x20 + 0xFFF) & ~0xFFF
+    hbin = (b"hbin" + struct.pack("<II", 0, hbin_size)).ljust(0x20, b"\0") + bytes(cells.data)
+    base = bytearray(HBIN_START)
+    base[:4] = b"regf"
+    struct.pack_into("<IIII", base, 0x14, 1, minor_version, 0, 1)
+    struct.pack_into("<II", base, 0x24, root, hbin_size)
+    with open(path, "wb") as f:
+        f.write(bytes(base) + hbin.ljust(hbin_size, b"\0"))
@@ -0,0 +1,60 @@
+import logging
+import time
+
+import pytest
+
+from eleventools.cancel import CancelToken, ScanCancelled, CANCELLED, TIMEOUT
+from eleventools.filesystem import FileWalker
+from eleventools.registry import MemoryRegistry
+from eleventools.registry_scan import RegistryScanner
+from eleventools.signatures import CompiledSignatures
+
+
+def test_cancel_token_propagates_to_children():
+    scan = CancelToken()
+    phase = scan.child()
+    worker = phase.child()
+    assert not worker.cancelled
+    scan.cancel()
+    assert worker.cancelled and worker.reason == CANCELLED
+    with pytest.raises(ScanCancelled) as raised:
+        phase.check()
+    assert raised.value.reason == CANCELLED
+
+
+def test_cancel_token_deadlines():
+    scan = CancelToken(timeout=60)
+    phase = scan.child(timeout=0)
+    assert phase.cancelled and phase.reason == TIMEOUT
+    # La scadenza di un figlio non annulla il padre
+    assert not scan.cancelled
+    assert 0 < scan.child(timeout=120).remaining() <= 60
+    started = time.monotonic()
+    assert CancelToken(timeout=0.01).wait(5)
+    assert time.monotonic() - started < 1
+
+
+def test_cancelled_walk_raises(tmp_path):
+    for d in range(3):
+        folder = tmp_path / f"dir_{d}" / "sotto"
+        folder.mkdir(parents=True)
+        (folder / "file.txt").write_text(str(d))
+    token = CancelToken()
+    walker = FileWalker([str(tmp_path)], cancel=token)
+    walk = walker.walk()
+    next(walk)
+    token.cancel()
+    with pytest.raises(ScanCancelled):
+        list(walk)
+    assert walker.stats.dirs_visited < 7
+
+
+def test_cancelled_registry_scan_stops():
+    registry = MemoryRegistry({"HKLM\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Run": {"Avvio": "krnl.exe"}})
+    matcher = CompiledSignatures.compile(1, {"KRNL": {"files": ["krnl.exe"]}}).matcher
+    scan_token = CancelToken()
+    scan_token.cancel(TIMEOUT)
+    scanner = RegistryScanner(matcher, registry, cancel=scan_token.child(), logger=logging.getLogger("test"))
+    with pytest.raises(ScanCancelled) as raised:
+        scanner.scan_value_keys(lambda *args: None)
+    assert raised.value.reason == TIMEOUT
@@ -0,0 +1,59 @@
+import json
+import shutil
+
+import pytest
+
+from eleventools.cli import main, EXIT_DETECTED, EXIT_ERROR
+from eleventools.signatures import DEFAULT_DATABASE
+
+
+def scan(tmp_path, *extra):
+    # Tutto dentro tmp_path: firme e cache compilata, registro vuoto e nessuna fase dei processi della macchina
+    signatures = tmp_path / "firme.json"
+    shutil.copyfile(DEFAULT_DATABASE, signatures)
+    registry = tmp_path / "registro-vuoto.json"
+    registry.write_text("{}")
+    return main(["scan", "--only-roots", "--root", str(tmp_path), "--no-fs-index", "--no-hash-cache",
+                 "--phase", "files", "--phase", "registry", "--signatures", str(signatures),
+                 "--registry-json", str(registry), "--metrics-file", str(tmp_path / "metrics.json"), *extra])
+
+
+@pytest.mark.parametrize("option, value", [
+    ("--image", "non-esiste"),
+    ("--image", "file.txt"),
+    ("--hive", "HKLM\\SOFTWARE=non-esiste"),
+    ("--reg-file", "non-esiste.reg"),
+    ("--registry-json", "non-esiste.json"),
+    ("--registry-json", "lista.json"),
+    ("--registry-json", "rotto.json"),
+])
+def test_scan_rejects_missing_sources(tmp_path, capsys, option, value):
+    (tmp_path / "file.txt").write_text("")
+    (tmp_path / "lista.json").write_text("[1]")
+    (tmp_path / "rotto.json").write_text("{")
+    if "=" in value:
+        key, _, name = value.partition("=")
+        value = f"{key}={tmp_path / name}"
+    else:
+        value = str(tmp_path / value)
+    assert scan(tmp_path, option, value) == EXIT_ERROR
+    assert "ERRORE:" in capsys.readouterr().err
+
+
+def test_scan_registry_json(tmp_path, capsys):
+    # Registro in memoria con una chiave di un executor: la scansione deve segnalarla
+    registry = tmp_path / "registro.json"
+    registry.write_text(json.dumps({"HKCU\\SOFTWARE\\Synapse": {}}))
+    assert scan(tmp_path, "--format", "json", "--registry-json", str(registry)) == EXIT_DETECTED
+    detections = json.loads(capsys.readouterr().out)["results"]
+    assert any(record["executor"] == "Synapse X" and record["phase"] == "registry" for record in detections)
+
+
+def test_scan_phases_and_signature_cache(tmp_path, capsys):
+    (tmp_path / "krnl.exe").write_bytes(b"MZ")
+    assert scan(tmp_path, "--format", "json") == EXIT_DETECTED
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["detections"] == 1
+    assert summary["results"][0]["executor"] == "KRNL"
+    assert summary["coverage"]["processes"]["status"] == "skipped"
+    assert (tmp_path / "firme.json.bin").is_file()
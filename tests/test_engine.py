@@ -0,0 +1,29 @@
+import logging
+
+from eleventools import events
+from eleventools.engine import ScanEngine
+from eleventools.registry import MemoryRegistry
+from eleventools.signatures import CompiledSignatures
+
+EXECUTORS = {
+    "Synapse X": {"files": ["Synapse.exe"], "registry": ["SOFTWARE\\Synapse"]},
+    "KRNL": {"files": ["krnl.exe"]},
+}
+
+
+def test_detections_are_only_streamed(tmp_path):
+    (tmp_path / "krnl.exe").write_bytes(b"MZ")
+    (tmp_path / "Synapse.exe").write_bytes(b"MZ")
+    registry = MemoryRegistry({"HKCU\\SOFTWARE\\Synapse": {}})
+    engine = ScanEngine(CompiledSignatures.compile(1, EXECUTORS), scan_roots=[str(tmp_path)], hash_cache_path=None,
+                        registry=registry, logger=logging.getLogger("test"), fs_index_path=None,
+                        phases=("files", "registry"))
+    streamed = []
+    finished = engine.run(lambda event: streamed.append(event))
+    detections = [event for event in streamed if isinstance(event, events.Detection)]
+    # ScanFinished riporta solo i conteggi: l'elenco è quello ricevuto con emit
+    assert finished.detections == len(detections) == 3
+    assert finished.executors == {"Synapse X": 2, "KRNL": 1}
+    phase_counts = {event.phase: event.count for event in streamed if isinstance(event, events.PhaseFinished)}
+    assert phase_counts == {"files": 2, "registry": 1}
+    assert streamed[-1] == finished
@@ -0,0 +1,37 @@
+import os
+
+from eleventools.filesystem import FileWalker, normalize_roots
+
+
+def make_tree(root, dirs=3, files=4):
+    for d in range(dirs):
+        folder = root / f"dir_{d}" / "sotto"
+        folder.mkdir(parents=True)
+        for f in range(files):
+            (folder / f"file_{f}.txt").write_text(f"{d}-{f}")
+
+
+def test_walk_returns_every_entry(tmp_path):
+    make_tree(tmp_path)
+    walker = FileWalker([str(tmp_path)], max_workers=2)
+    names = [entry.name for entry in walker.walk()]
+    assert len(names) == 3 * (2 + 4)
+    assert walker.stats.dirs_visited == 7
+
+
+def test_normalize_roots_drops_nested_and_missing(tmp_path):
+    make_tree(tmp_path)
+    roots = normalize_roots([str(tmp_path / "dir_0"), str(tmp_path), str(tmp_path / "manca"), str(tmp_path)])
+    assert roots == [os.path.realpath(tmp_path)]
+
+
+
+def test_walk_visits_every_root_once(tmp_path):
+    for name in ("uno", "due"):
+        make_tree(tmp_path / name, dirs=2, files=3)
+    roots = [str(tmp_path / "uno"), str(tmp_path / "due")]
+    walker = FileWalker(roots, max_workers=2, max_depth=1)
+    paths = [entry.path for entry in walker.walk()]
+    # Ogni cartella viene letta una sola volta; oltre max_depth le sottocartelle non vengono aperte
+    assert len(paths) == len(set(paths)) == 2 * (2 + 2)
+    assert {root.dirs for root in walker.stats.roots.values()} == {3}
@@ -0,0 +1,51 @@
+import json
+import logging
+
+from eleventools import events
+from eleventools.fleet import FleetCoordinator
+
+from tests.hives import write_hive
+
+EXECUTORS = {
+    "Synapse X": {"files": ["Synapse.exe"], "registry": ["SOFTWARE\\Synapse"]},
+    "KRNL": {"files": ["krnl.exe"]},
+}
+
+
+def make_image(root, files=(), software=None):
+    (root / "Users" / "mario").mkdir(parents=True)
+    for name in files:
+        (root / "Users" / "mario" / name).write_bytes(b"MZ")
+    if software is not None:
+        config = root / "Windows" / "System32" / "config"
+        config.mkdir(parents=True)
+        write_hive(config / "SOFTWARE", software)
+
+
+def test_fleet_merges_targets_and_reports_failures(tmp_path):
+    signatures = tmp_path / "firme.json"
+    signatures.write_text(json.dumps({"schema": 1, "version": 1, "executors": EXECUTORS}))
+    first, second = tmp_path / "img1", tmp_path / "img2"
+    make_image(first, files=["krnl.exe"])
+    # Seconda immagine: traccia solo nel registro, letto dall'hive SOFTWARE
+    make_image(second, files=["note.txt"], software={"keys": {"Synapse": {}}})
+    missing = tmp_path / "img3"
+
+    coordinator = FleetCoordinator([str(first), str(second), str(missing)], max_workers=2,
+                                   signatures_path=str(signatures), cache_path=str(tmp_path / "firme.bin"),
+                                   logger=logging.getLogger("test"))
+    received = []
+    report = coordinator.run(received.append)
+
+    # Risultati nell'ordine delle destinazioni, qualunque sia stato l'ordine di arrivo
+    assert [result.target for result in report.results] == [str(first), str(second), str(missing)]
+    assert sorted(result.target for result in received) == sorted(coordinator.targets)
+    krnl, synapse, failed = report.results
+    assert [(d.executor, d.kind) for d in krnl.detections] == [("KRNL", events.EVIDENCE_FILE)]
+    assert [(d.executor, d.kind) for d in synapse.detections] == [("Synapse X", events.EVIDENCE_REGISTRY_KEY)]
+    assert krnl.error is None and synapse.error is None
+    assert krnl.coverage["files"]["status"] == events.COVERAGE_COMPLETE
+    assert failed.error and failed.detections == []
+    assert report.executors() == {"KRNL": [str(first)], "Synapse X": [str(second)]}
+    assert len(report.detections) == 2
+    assert str(missing) in report.error and not report.cancelled
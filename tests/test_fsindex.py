@@ -0,0 +1,88 @@
+import os
+import shutil
+
+from eleventools import fsindex
+from eleventools.filesystem import FileWalker
+from eleventools.fsindex import FsIndex
+
+
+def make_tree(root):
+    for name in ("a", "b", os.path.join("a", "sotto")):
+        os.makedirs(root / name)
+    (root / "a" / "krnl.exe").write_bytes(b"MZ")
+    (root / "b" / "note.txt").write_text("x")
+
+
+def walk(root, index_path, fingerprint="f1"):
+    index = FsIndex(str(index_path), fingerprint)
+    walker = FileWalker([str(root)], index=index, keep=lambda entry: entry.name.endswith(".exe"))
+    try:
+        names = sorted(entry.name for entry in walker.walk())
+    finally:
+        index.close()
+    return names, walker.stats
+
+
+def test_unchanged_dirs_are_replayed(tmp_path):
+    root = tmp_path / "radice"
+    make_tree(root)
+    index_path = tmp_path / "indice.sqlite"
+    first, stats = walk(root, index_path)
+    assert stats.dirs_unchanged == 0
+    assert "note.txt" in first
+    second, stats = walk(root, index_path)
+    # Riprese dall'indice solo le cartelle e i file interessanti
+    assert stats.dirs_unchanged == stats.dirs_visited == 4
+    assert second == ["a", "b", "krnl.exe", "sotto"]
+
+
+def test_changed_dir_is_read_again(tmp_path):
+    root = tmp_path / "radice"
+    make_tree(root)
+    index_path = tmp_path / "indice.sqlite"
+    walk(root, index_path)
+    (root / "b" / "Synapse.exe").write_bytes(b"MZ")
+    os.utime(root / "b", ns=(0, 0))
+    names, stats = walk(root, index_path)
+    assert "Synapse.exe" in names and "note.txt" in names
+    assert stats.dirs_unchanged == 3
+
+
+def test_removed_dirs_are_pruned(tmp_path, monkeypatch):
+    # Blocchi di scrittura piccoli: le scritture intermedie non devono perdere né tenere cartelle
+    monkeypatch.setattr(fsindex, "WRITE_BATCH", 2)
+    root = tmp_path / "radice"
+    make_tree(root)
+    index_path = tmp_path / "indice.sqlite"
+    walk(root, index_path)
+    walk(root, index_path)
+    shutil.rmtree(root / "a")
+    walk(root, index_path)
+    index = FsIndex(str(index_path), "f1")
+    try:
+        assert len(index) == 2
+        assert index.lookup(str(root / "a" / "sotto"), 0) is None
+    finally:
+        index.close()
+
+
+def test_incomplete_visit_keeps_dirs(tmp_path):
+    root = tmp_path / "radice"
+    make_tree(root)
+    index_path = tmp_path / "indice.sqlite"
+    walk(root, index_path)
+    index = FsIndex(str(index_path), "f1")
+    try:
+        index.save([str(root)], complete=False)
+        assert len(index) == 4
+    finally:
+        index.close()
+
+
+def test_fingerprint_change_clears_index(tmp_path):
+    root = tmp_path / "radice"
+    make_tree(root)
+    index_path = tmp_path / "indice.sqlite"
+    walk(root, index_path)
+    _, stats = walk(root, index_path, fingerprint="f2")
+    assert stats.dirs_unchanged == 0
@@ -0,0 +1,60 @@
+import hashlib
+import os
+
+from eleventools.hashing import HashCache, HashIndex, HashStage
+
+
+def test_hash_cache_invalidated_by_size_and_mtime(tmp_path):
+    cache = HashCache(str(tmp_path / "hash.sqlite"))
+    cache.put("a.exe", 10, 100, "d1")
+    cache.flush()
+    assert cache.get("a.exe", 10, 100) == "d1"
+    assert cache.get("a.exe", 11, 100) is None
+    assert cache.get("a.exe", 10, 101) is None
+    cache.close()
+    # I valori salvati restano alla riapertura
+    cache = HashCache(str(tmp_path / "hash.sqlite"))
+    assert cache.get("a.exe", 10, 100) == "d1"
+    cache.close()
+
+
+def hash_stage_run(index, cache_path, path):
+    stage = HashStage(index, cache_path=cache_path, max_workers=1)
+    entry = next(entry for entry in os.scandir(os.path.dirname(path)) if entry.path == path)
+    stage.consider(entry, [("KRNL", "krnl.exe")])
+    results = list(stage.finish())
+    return results, stage.stats
+
+
+def test_hash_stage_rereads_modified_file(tmp_path):
+    path = tmp_path / "krnl.exe"
+    path.write_bytes(b"MZ primo")
+    digest = hashlib.md5(b"MZ primo").hexdigest()
+    index = HashIndex({"KRNL": {"hashes": [digest]}})
+    cache_path = str(tmp_path / "hash.sqlite")
+
+    results, stats = hash_stage_run(index, cache_path, str(path))
+    assert [(result[1], [name for name, _ in result[2]]) for result in results] == [(digest, ["KRNL"])]
+    assert stats.files_hashed == 1
+
+    results, stats = hash_stage_run(index, cache_path, str(path))
+    assert stats.cache_hits == 1 and stats.files_hashed == 0
+
+    # Stessa dimensione, contenuto e mtime diversi: la voce della cache non vale più
+    path.write_bytes(b"MZ altro")
+    os.utime(path, ns=(0, 0))
+    results, stats = hash_stage_run(index, cache_path, str(path))
+    assert stats.cache_hits == 0 and stats.files_hashed == 1
+    assert results[0][2] == []
+
+
+def test_empty_files_are_not_hashed(tmp_path):
+    # Firma senza dimensione: i file riconosciuti per nome vengono letti, tranne quelli vuoti
+    path = tmp_path / "krnl.exe"
+    path.write_bytes(b"")
+    index = HashIndex({"KRNL": {"hashes": ["a7f5f35426b927411fc9231b56382173"]}})
+    results, stats = hash_stage_run(index, None, str(path))
+    assert results == [] and stats.files_hashed == 0
+    path.write_bytes(b"MZ")
+    results, stats = hash_stage_run(index, None, str(path))
+    assert stats.files_hashed == 1
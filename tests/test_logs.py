@@ -0,0 +1,93 @@
+import logging
+import os
+import re
+import time
+
+from eleventools import events
+from eleventools.logs import DetectionLog, LogPipeline, LOG_FILE, file_handler, prune_logs
+
+RECORD = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3} - (DEBUG|INFO|WARNING|ERROR) - (.*)$")
+
+
+def isolated_logger(name):
+    logger = logging.getLogger(f"test.logs.{name}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    return logger
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_pipeline_writes_every_record_on_stop(tmp_path):
+    logger = isolated_logger("stop")
+    pipeline = LogPipeline(logger, [file_handler(str(tmp_path))])
+    for n in range(500):
+        logger.info(f"riga {n}")
+    # stop() attende che il thread della coda abbia scritto tutto
+    pipeline.stop()
+    lines = read_lines(tmp_path / LOG_FILE)
+    assert [RECORD.match(line).group(2) for line in lines] == [f"riga {n}" for n in range(500)]
+    assert RECORD.match(lines[0]).group(1) == "INFO"
+    assert not logger.handlers
+
+
+def test_rotation_at_size_limit(tmp_path):
+    logger = isolated_logger("size")
+    pipeline = LogPipeline(logger, [file_handler(str(tmp_path), max_bytes=300, backups=2)])
+    for n in range(40):
+        logger.warning(f"rilevamento numero {n:03d}")
+    pipeline.stop()
+    names = sorted(os.listdir(tmp_path))
+    assert names == [LOG_FILE, f"{LOG_FILE}.1", f"{LOG_FILE}.2"]
+    for name in names:
+        assert os.path.getsize(tmp_path / name) <= 300
+    # L'ultima riga scritta è nel file corrente, le più vecchie oltre le copie tenute sono state scartate
+    assert read_lines(tmp_path / LOG_FILE)[-1].endswith("rilevamento numero 039")
+    assert not any(line.endswith("numero 000") for name in names for line in read_lines(tmp_path / name))
+
+
+def test_rotation_on_new_day(tmp_path):
+    path = tmp_path / LOG_FILE
+    path.write_text("riga di ieri\n", encoding="utf-8")
+    yesterday = time.time() - 86400
+    os.utime(path, (yesterday, yesterday))
+    logger = isolated_logger("day")
+    pipeline = LogPipeline(logger, [file_handler(str(tmp_path))])
+    logger.info("riga di oggi")
+    pipeline.stop()
+    assert read_lines(tmp_path / f"{LOG_FILE}.1") == ["riga di ieri"]
+    assert RECORD.match(read_lines(path)[0]).group(2) == "riga di oggi"
+
+
+def test_prune_removes_only_old_logs(tmp_path):
+    old = time.time() - 30 * 86400
+    for name in (f"{LOG_FILE}.3", "risultati_1.txt", "scan_vecchio.log", "appunti.txt", LOG_FILE):
+        (tmp_path / name).write_text("x")
+        os.utime(tmp_path / name, (old, old))
+    (tmp_path / f"{LOG_FILE}.1").write_text("recente")
+    assert prune_logs(str(tmp_path)) == 3
+    assert sorted(os.listdir(tmp_path)) == ["appunti.txt", LOG_FILE, f"{LOG_FILE}.1"]
+
+
+def test_detection_log_limit():
+    logger = isolated_logger("detections")
+    messages = []
+    handler = logging.Handler()
+    handler.emit = lambda record: messages.append(record.getMessage())
+    logger.addHandler(handler)
+    try:
+        detection_log = DetectionLog(logger, limit=2)
+        for n in range(5):
+            detection_log(events.Detection("KRNL", events.EVIDENCE_FILE, f"C:\\krnl{n}.exe"))
+        detection_log.flush()
+        assert len(messages) == 3
+        assert "C:\\krnl1.exe" in messages[1]
+        assert messages[2].startswith("Altri 3 rilevamenti")
+        # Dopo flush il conteggio riparte: il giro successivo ha di nuovo il suo limite
+        detection_log(events.Detection("KRNL", events.EVIDENCE_FILE, "C:\\krnl9.exe"))
+        assert "C:\\krnl9.exe" in messages[3]
+    finally:
+        logger.removeHandler(handler)
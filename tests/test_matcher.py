@@ -0,0 +1,59 @@
+from eleventools.matcher import SignatureMatcher, SubstringIndex, literal_prefix
+
+
+def test_literal_prefix():
+    assert literal_prefix(r"Synapse.*\.exe") == "synapse"
+    assert literal_prefix(r"krnlx?\.exe") == "krnl"
+    assert literal_prefix(r"abc\|def.*") == "abc|def"
+
+
+def test_literal_prefix_alternation():
+    # Il prefisso del primo ramo escluderebbe gli altri rami
+    assert literal_prefix(r"Synapse.*\.exe|krnl.*\.exe") == ""
+    assert literal_prefix(r"(Synapse|krnl).*\.exe") == ""
+
+
+def test_pattern_with_alternation_matches_every_branch():
+    matcher = SignatureMatcher({"X": {"patterns": [r"Synapse.*\.exe|krnl.*\.exe"]}})
+    assert [name for name, _ in matcher.match_file("krnl_beta.exe")] == ["X"]
+    assert [name for name, _ in matcher.match_file("SynapseLauncher.exe")] == ["X"]
+    assert matcher.match_file("notepad.exe") == []
+
+
+def test_substring_index():
+    index = SubstringIndex.build([("synapse", "Synapse X", "Synapse"), ("krnl", "KRNL", "krnl"),
+                                  ("jj", "Short", "jj")])
+    assert sorted(index.search("c:\\tools\\synapse_x\\krnl.exe")) == [("KRNL", "krnl"), ("Synapse X", "Synapse")]
+    assert index.search("xjjx") == [("Short", "jj")]
+    assert index.search("notepad") == []
+    assert SubstringIndex.from_state(index.to_state()).search("krnl") == [("KRNL", "krnl")]
+
+
+TEXT_EXECUTORS = {
+    "KRNL": {"files": ["krnl.exe"]},
+    "Synapse X": {"files": ["Synapse.exe"]},
+    "Sona": {"files": ["Sona.exe"]},
+    "Delta": {"files": ["Delta.exe"]},
+    "Shadow": {"files": ["Shadow.exe"]},
+    "Electron": {"files": ["Electron.exe"]},
+    "Comet": {"files": ["Comet.exe"]},
+    "Evon": {"files": ["Evon.exe"]},
+}
+
+
+def test_match_text_ignores_ordinary_software():
+    matcher = SignatureMatcher(TEXT_EXECUTORS)
+    for text in ("Personal Finance.xlsx", "Deltarune", "Shadowsocks", "Slack (Electron app)", "Comet Browser",
+                 "C:\\Games\\persona.exe"):
+        assert matcher.match_text(text) == [], text
+
+
+def test_match_text_finds_whole_words():
+    matcher = SignatureMatcher(TEXT_EXECUTORS)
+    assert [name for name, _ in matcher.match_text("C:\\Games\\krnl.exe,0")] == ["KRNL"]
+    assert [name for name, _ in matcher.match_text("\"C:\\x\\Electron.exe\" --inject")] == ["Electron"]
+    assert [name for name, _ in matcher.match_text("Synapse X")] == ["Synapse X"]
+    # Un nome comune conta solo come testo intero (nome visualizzato, sottochiave di disinstallazione)
+    assert [name for name, _ in matcher.match_text("Evon")] == ["Evon"]
+    assert [name for name, _ in matcher.match_text("Evon_is1")] == ["Evon"]
+    assert matcher.match_text("Evon Gaming Suite") == []
@@ -0,0 +1,56 @@
+import logging
+import re
+
+from eleventools.engine import ScanEngine
+from eleventools.registry import MemoryRegistry
+from eleventools.signatures import CompiledSignatures
+
+SAMPLE = re.compile(r'^eleventools_(\w+)(?:\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text):
+    """Campioni del file: (nome, etichette) -> valore; controlla che ogni famiglia abbia HELP e TYPE"""
+    samples = {}
+    declared = set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            name, kind = line[len("# TYPE eleventools_"):].split(" ")
+            assert kind == "gauge"
+            declared.add(name)
+            continue
+        if line.startswith("# HELP "):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        assert name in declared
+        samples[name, frozenset(LABEL.findall(labels or ""))] = float(value)
+    return samples
+
+
+def test_scan_writes_prometheus_metrics(tmp_path):
+    root = tmp_path / 'radice "prova"'
+    root.mkdir()
+    (root / "krnl.exe").write_bytes(b"MZ")
+    (root / "note.txt").write_text("x")
+    metrics_path = tmp_path / "metriche" / "eleventools.prom"
+    signatures = CompiledSignatures.compile(1, {"KRNL": {"files": ["krnl.exe"], "registry": ["SOFTWARE\\KRNL"]}})
+    engine = ScanEngine(signatures, scan_roots=[str(root)], hash_cache_path=None, max_scan_time=60,
+                        registry=MemoryRegistry({"HKCU\\SOFTWARE\\KRNL": {}}), logger=logging.getLogger("test"),
+                        fs_index_path=None, phases=("files", "registry"), metrics_path=str(metrics_path))
+    engine.run(lambda event: None)
+
+    samples = parse(metrics_path.read_text(encoding="utf-8"))
+    assert samples["scan_detections", frozenset()] == 2
+    assert samples["scan_budget_seconds", frozenset()] == 60
+    assert samples["scan_timed_out", frozenset()] == 0
+    assert samples["phase_complete", frozenset({("phase", "files")})] == 1
+    # Fase esclusa: non completata e senza durata
+    assert samples["phase_complete", frozenset({("phase", "processes")})] == 0
+    assert ("phase_duration_seconds", frozenset({("phase", "processes")})) not in samples
+    assert ("phase_duration_seconds", frozenset({("phase", "registry")})) in samples
+    assert samples["phase_value", frozenset({("phase", "files"), ("metric", "entries_seen")})] == 2
+    assert samples["phase_value", frozenset({("phase", "registry"), ("metric", "keys_opened")})] == 1
+    # Le virgolette nel percorso della radice sono protette nell'etichetta
+    escaped = str(root).replace('"', '\\"')
+    assert samples["root_dirs", frozenset({("root", escaped)})] == 1
+    assert samples["root_entries", frozenset({("root", escaped)})] == 2
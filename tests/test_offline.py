@@ -0,0 +1,144 @@
+import codecs
+import logging
+
+import pytest
+
+from eleventools.offline import OfflineRegistry
+from eleventools.regexport import RegFormatError, iter_reg_file
+from eleventools.regf import HiveFile, HiveFormatError
+from eleventools.registry import HKCU, HKLM
+from eleventools.registry_scan import RegistryScanner, offline_key_filter
+from eleventools.signatures import CompiledSignatures
+
+from tests.hives import write_hive
+
+EXECUTORS = {
+    "Synapse X": {"files": ["Synapse.exe"], "registry": ["SOFTWARE\\Synapse"]},
+    "KRNL": {"files": ["krnl.exe"]},
+}
+USER_ASSIST = "SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Explorer\\UserAssist"
+
+
+def matcher():
+    return CompiledSignatures.compile(1, EXECUTORS).matcher
+
+
+def scan(registry):
+    found = []
+    scanner = RegistryScanner(matcher(), registry, logger=logging.getLogger("test"))
+    report = lambda executor, location, signature: found.append((executor, location))
+    scanner.scan_executor_keys(report)
+    scanner.scan_value_keys(report)
+    return found
+
+
+def test_hive_values_and_big_data(tmp_path):
+    path = tmp_path / "SOFTWARE"
+    big = bytes(range(256)) * 200
+    write_hive(path, {"values": {"testo": "ciao", "numero": 7, "corto": b"\x01\x02", "lista": ["a", "b"],
+                                 "grande": big}})
+    with HiveFile(str(path)) as hive:
+        values = dict(hive.open_key("").values())
+    # Oltre 16344 byte i dati sono divisi in segmenti elencati da un record "db"
+    assert values == {"testo": "ciao", "numero": 7, "corto": b"\x01\x02", "lista": ["a", "b"], "grande": big}
+
+
+def test_hive_subkey_index_root(tmp_path):
+    # Più di tre sottochiavi: lista "ri" che rimanda a una "li" e a una "lh"
+    path = tmp_path / "SOFTWARE"
+    names = ["Alfa", "Beta", "Gamma", "Delta", "Epsilon"]
+    write_hive(path, {"keys": {name: {"values": {"nome": name}} for name in names}})
+    with HiveFile(str(path)) as hive:
+        assert sorted(hive.open_key("").subkey_names()) == sorted(names)
+        assert dict(hive.open_key("gamma").values()) == {"nome": "Gamma"}
+        with pytest.raises(FileNotFoundError):
+            hive.open_key("Zeta")
+
+
+def test_not_a_hive(tmp_path):
+    path = tmp_path / "vuoto"
+    path.write_bytes(b"x" * 8192)
+    with pytest.raises(HiveFormatError):
+        HiveFile(str(path))
+
+
+def test_mounted_hive_scan(tmp_path):
+    path = tmp_path / "SOFTWARE"
+    write_hive(path, {"keys": {"Synapse": {}, "Microsoft": {"keys": {"Windows": {"keys": {"CurrentVersion": {"keys": {
+        "Run": {"values": {"Avvio": "C:\\Giochi\\krnl.exe --silent"}}}}}}}}}})
+    registry = OfflineRegistry()
+    try:
+        registry.mount_hive(HKLM, str(path), "SOFTWARE")
+        found = scan(registry)
+    finally:
+        registry.close()
+    assert ("Synapse X", "HKLM\\SOFTWARE\\Synapse") in found
+    assert ("KRNL", "HKLM\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\Run\\Avvio") in found
+
+
+def test_image_users_are_hkcu_instances(tmp_path):
+    config = tmp_path / "Windows" / "System32" / "config"
+    config.mkdir(parents=True)
+    write_hive(config / "SOFTWARE", {})
+    profile = tmp_path / "Users" / "mario"
+    profile.mkdir(parents=True)
+    write_hive(profile / "NTUSER.DAT", {"keys": {"SOFTWARE": {"keys": {"Synapse": {}}}}})
+    registry = OfflineRegistry.from_image(str(tmp_path))
+    try:
+        assert registry.hive_instances(HKCU) == ["HKU\\mario"]
+        assert ("Synapse X", "HKU\\mario\\SOFTWARE\\Synapse") in scan(registry)
+    finally:
+        registry.close()
+
+
+def write_reg(path, lines, encoding="utf-16"):
+    # regedit scrive UTF-16 con BOM e righe terminate da CRLF
+    with open(path, "w", encoding=encoding, newline="\r\n") as f:
+        f.write("\n".join(["Windows Registry Editor Version 5.00", ""] + lines) + "\n")
+
+
+def test_reg_file_utf16(tmp_path):
+    path = tmp_path / "esportato.reg"
+    write_reg(path, [
+        "[HKEY_CURRENT_USER\\Software\\Prova]",
+        '"Testo"="C:\\\\Giochi\\\\\\"citato\\""',
+        '"Numero"=dword:0000002a',
+        '"Lista"=hex(7):61,00,00,00,62,00,00,00,\\',
+        "  00,00",
+        "@=\"predefinito\"",
+        "",
+        "[-HKEY_CURRENT_USER\\Software\\Cancellata]",
+        '"Ignorato"="x"',
+    ])
+    assert list(iter_reg_file(str(path))) == [
+        ("HKEY_CURRENT_USER\\Software\\Prova",
+         {"Testo": 'C:\\Giochi\\"citato"', "Numero": 42, "Lista": ["a", "b"], "": "predefinito"}),
+    ]
+
+
+def test_reg_file_rejects_other_files(tmp_path):
+    path = tmp_path / "non.reg"
+    path.write_text("ciao\n")
+    with pytest.raises(RegFormatError):
+        list(iter_reg_file(str(path)))
+
+
+def test_reg_file_user_assist_rot13(tmp_path):
+    # I nomi dei valori di UserAssist sono in ROT13; gli utenti di HKEY_USERS diventano istanze di HKCU
+    name = codecs.encode("C:\\Giochi\\krnl.exe", "rot13")
+    path = tmp_path / "utente.reg"
+    write_reg(path, [
+        f"[HKEY_USERS\\S-1-5-21-1\\{USER_ASSIST}\\{{CEBFF5CD-ACE2-4F4F-9178-9926F41749EA}}\\Count]",
+        f'"{name.replace(chr(92), chr(92) * 2)}"=hex:00,01',
+        "",
+        "[HKEY_USERS\\S-1-5-21-1\\Software\\Altro\\Non\\Interessante]",
+        '"Nome"="Synapse X"',
+    ])
+    registry = OfflineRegistry()
+    keys = registry.add_reg_file(str(path), offline_key_filter(matcher()))
+    # Le chiavi che la scansione non apre non vengono caricate
+    assert keys == 1
+    assert registry.hive_instances(HKCU) == ["HKU\\S-1-5-21-1"]
+    [(executor, location)] = scan(registry)
+    assert executor == "KRNL"
+    assert location.startswith(f"HKU\\S-1-5-21-1\\{USER_ASSIST}\\")
@@ -0,0 +1,59 @@
+import os
+
+from eleventools.processes import ProcfsBackend
+
+
+def add_process(proc, pid, comm, ppid=1, exe=None, start=1000):
+    base = proc / str(pid)
+    base.mkdir()
+    # Campi dopo il nome: stato, ppid, ... e al 22° l'istante di avvio, seguito da altri campi
+    fields = ["S", str(ppid)] + ["0"] * 17 + [str(start)] + ["0"] * 4
+    (base / "stat").write_bytes(f"{pid} ({comm}) {' '.join(fields)}\n".encode("utf-8"))
+    if exe is not None:
+        os.symlink(exe, base / "exe")
+    return base
+
+
+def by_pid(backend):
+    return {process.pid: process for process in backend.list_processes()}
+
+
+def test_comm_with_spaces_and_parentheses(tmp_path):
+    add_process(tmp_path, 10, "Web Content (1)", ppid=7, exe="/usr/lib/firefox/firefox")
+    add_process(tmp_path, 11, ") x (", ppid=10)
+    processes = by_pid(ProcfsBackend(str(tmp_path)))
+    assert (processes[10].name, processes[10].ppid, processes[10].exe) == ("Web Content (1)", 7,
+                                                                            "/usr/lib/firefox/firefox")
+    assert (processes[11].name, processes[11].ppid) == (") x (", 10)
+
+
+def test_truncated_comm_uses_exe_name(tmp_path):
+    add_process(tmp_path, 20, "SynapseInjector", exe="/opt/giochi/SynapseInjector.exe")
+    add_process(tmp_path, 21, "python3", exe="/usr/bin/python3.11-debug")
+    # Eseguibile con un altro nome (per esempio dopo un collegamento): resta quello di stat
+    add_process(tmp_path, 22, "bash", exe="/usr/bin/dash")
+    processes = by_pid(ProcfsBackend(str(tmp_path)))
+    assert processes[20].name == "SynapseInjector.exe"
+    assert processes[21].name == "python3.11-debug"
+    assert processes[22].name == "bash"
+
+
+def test_unreadable_exe(tmp_path):
+    # Thread del kernel o processo di un altro utente: exe non leggibile
+    add_process(tmp_path, 2, "kthreadd", ppid=0)
+    process = by_pid(ProcfsBackend(str(tmp_path)))[2]
+    assert (process.name, process.exe, process.ppid) == ("kthreadd", "", 0)
+
+
+def test_vanished_processes_are_skipped(tmp_path):
+    add_process(tmp_path, 30, "krnl.exe")
+    # Processo terminato tra l'elenco delle cartelle e la lettura di stat, stat troncato e voci non numeriche
+    (tmp_path / "31").mkdir()
+    (tmp_path / "32").mkdir()
+    (tmp_path / "32" / "stat").write_bytes(b"32 (tronc")
+    (tmp_path / "self").mkdir()
+    backend = ProcfsBackend(str(tmp_path))
+    assert list(by_pid(backend)) == [30]
+    assert [process.pid for process in backend.describe([30, 31, 32, 99])] == [30]
+    identities = backend.list_identities()
+    assert identities[30] == ("krnl.exe", "1000") and 31 not in identities
@@ -0,0 +1,15 @@
+import pytest
+
+from eleventools.registry import MemoryRegistry, HKCU, HKLM
+
+
+def test_memory_registry_is_case_insensitive():
+    registry = MemoryRegistry({"HKEY_CURRENT_USER\\Software\\Prova": {"Nome": "valore"}})
+    assert registry.key_exists(HKCU, "SOFTWARE\\PROVA")
+    with registry.open_key(HKCU, "software") as key:
+        assert list(key.subkey_names()) == ["Prova"]
+    with registry.open_key(HKCU, "Software\\prova") as key:
+        assert dict(key.values()) == {"Nome": "valore"}
+    with pytest.raises(FileNotFoundError):
+        registry.open_key(HKLM, "SOFTWARE")
+
@@ -0,0 +1,58 @@
+import logging
+
+from eleventools.registry import MemoryRegistry
+from eleventools.registry_scan import RegistryScanner
+from eleventools.signatures import CompiledSignatures
+
+# Executor di riempimento in testa al database: nessun executor resta escluso dal confronto
+EXECUTORS = {f"Riempitivo {n}": {"files": [f"riempitivo{n}.exe"]} for n in range(20)}
+EXECUTORS.update({
+    "Synapse X": {"files": ["Synapse.exe"], "registry": ["SOFTWARE\\Synapse"]},
+    "KRNL": {"files": ["krnl.exe"]},
+    "Evon": {"files": ["Evon.exe"]},
+})
+CV = "SOFTWARE\\Microsoft\\Windows\\CurrentVersion"
+
+
+def scan(registry):
+    found = []
+    matcher = CompiledSignatures.compile(1, EXECUTORS).matcher
+    scanner = RegistryScanner(matcher, registry, logger=logging.getLogger("test"))
+    report = lambda executor, location, signature: found.append((executor, location))
+    scanner.scan_executor_keys(report)
+    scanner.scan_value_keys(report)
+    return found
+
+
+def test_executor_keys_and_autostart_values():
+    # Più di 50 valori di avvio: vengono confrontati tutti, anche l'ultimo
+    run = {f"Voce {n}": f"C:\\Programmi\\voce{n}.exe" for n in range(60)}
+    run["Zz Avvio"] = "\"C:\\Giochi\\krnl.exe\" --silent"
+    run["Altro"] = "C:\\Slack\\slack.exe"
+    registry = MemoryRegistry({
+        "HKCU\\SOFTWARE\\synapse": {},
+        f"HKLM\\{CV}\\Run": run,
+    })
+    found = scan(registry)
+    assert ("Synapse X", "HKCU\\SOFTWARE\\Synapse") in found
+    assert ("KRNL", f"HKLM\\{CV}\\Run\\Zz Avvio") in found
+    assert not any("Altro" in location or "Voce" in location for _, location in found)
+
+
+def test_trace_keys():
+    muicache = "SOFTWARE\\Classes\\Local Settings\\Software\\Microsoft\\Windows\\Shell\\MuiCache"
+    registry = MemoryRegistry({
+        f"HKLM\\{CV}\\Uninstall\\Evon_is1": {"DisplayName": "Evon"},
+        f"HKLM\\{CV}\\Uninstall\\Finanza": {"DisplayName": "Personal Finance Evon Edition"},
+        f"HKLM\\{CV}\\App Paths\\krnl.exe": {"": "C:\\Giochi\\krnl.exe"},
+        f"HKCU\\{muicache}": {"C:\\Download\\Synapse.exe.FriendlyAppName": "Synapse"},
+        f"HKCU\\{CV}\\Explorer\\RecentDocs\\.exe": {"0": "Evon.exe\0".encode("utf-16-le") + b"\x00" * 6},
+    })
+    found = scan(registry)
+    assert ("Evon", f"HKLM\\{CV}\\Uninstall\\Evon_is1") in found
+    assert ("Evon", f"HKLM\\{CV}\\Uninstall\\Evon_is1\\DisplayName") in found
+    assert ("KRNL", f"HKLM\\{CV}\\App Paths\\krnl.exe") in found
+    assert any(executor == "Synapse X" and muicache in location for executor, location in found)
+    assert ("Evon", f"HKCU\\{CV}\\Explorer\\RecentDocs\\.exe\\0") in found
+    # Un nome di programma che contiene quello di un executor tra altre parole non è una traccia
+    assert not any("Finanza" in location for _, location in found)
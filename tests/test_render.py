@@ -0,0 +1,41 @@
+from eleventools.render import RenderBuffer
+
+
+def test_lines_are_delivered_in_batches():
+    buffer = RenderBuffer(interval=60)
+    buffer.write("Fase 1/3\n")
+    buffer.write("Trovato: KRNL\n")
+    assert buffer.flush(force=True) == ("Fase 1/3\nTrovato: KRNL\n", 0)
+    buffer.write("Fase 2/3\n")
+    # Intervallo non ancora trascorso: le righe restano in attesa
+    assert not buffer.due()
+    assert buffer.flush() is None
+    buffer.write("Fase 3/3\n")
+    assert buffer.flush(force=True) == ("Fase 2/3\nFase 3/3\n", 0)
+    assert buffer.flush(force=True) is None
+    assert buffer.total_lines == 4
+
+
+def test_visible_lines_are_capped():
+    buffer = RenderBuffer(max_visible_lines=3)
+    buffer.write("".join(f"riga {n}\n" for n in range(5)))
+    # Il blocco supera da solo il limite: arrivano solo le ultime righe
+    assert buffer.flush(force=True) == ("riga 2\nriga 3\nriga 4\n", 0)
+    buffer.write("riga 5\nriga 6\n")
+    assert buffer.flush(force=True) == ("riga 5\nriga 6\n", 2)
+    assert buffer.dropped_lines == 4 and buffer.total_lines == 7
+
+
+def test_final_flush_writes_the_transcript(tmp_path):
+    transcript = tmp_path / "risultati.txt"
+    buffer = RenderBuffer(transcript_path=str(transcript), interval=60)
+    buffer.write("Avvio\n")
+    buffer.write("• KRNL: C:\\krnl.exe\n", visible=False)
+    buffer.write("Scansione completata\n")
+    # A fine scansione il buffer viene svuotato senza attendere l'intervallo, poi chiuso
+    assert buffer.flush(force=True) == ("Avvio\nScansione completata\n", 0)
+    buffer.write("• Evon: C:\\Evon.exe\n", visible=False)
+    assert buffer.flush(force=True) is None
+    buffer.close()
+    assert transcript.read_text(encoding="utf-8") == (
+        "Avvio\n• KRNL: C:\\krnl.exe\nScansione completata\n• Evon: C:\\Evon.exe\n")
@@ -0,0 +1,66 @@
+from eleventools import events
+from eleventools.events import Detection
+from eleventools.results import ResultsModel
+
+
+def detection(executor, kind, location, timestamp):
+    return Detection(executor, kind, location, timestamp=timestamp)
+
+
+def model_with(*detections):
+    model = ResultsModel()
+    for item in detections:
+        model.add(item)
+    return model
+
+
+def locations(model):
+    return [item.location for item in model.rows(0, len(model))]
+
+
+SAMPLE = (
+    detection("KRNL", events.EVIDENCE_FILE, "C:\\Giochi\\krnl.exe", 3.0),
+    detection("Synapse X", events.EVIDENCE_HASH, "C:\\Download\\Synapse.exe", 1.0),
+    detection("KRNL", events.EVIDENCE_REGISTRY_TRACE, "HKCU\\SOFTWARE\\krnl", 2.0),
+)
+
+
+def test_filter_by_executor_kind_and_text():
+    model = model_with(*SAMPLE)
+    model.set_filter(executor="KRNL")
+    assert locations(model) == ["C:\\Giochi\\krnl.exe", "HKCU\\SOFTWARE\\krnl"]
+    model.set_filter(executor="KRNL", kind=events.EVIDENCE_FILE)
+    assert locations(model) == ["C:\\Giochi\\krnl.exe"]
+    model.set_filter(text="download")
+    assert locations(model) == ["C:\\Download\\Synapse.exe"]
+    model.set_filter()
+    assert len(model) == 3
+
+
+def test_sort_and_reverse():
+    model = model_with(*SAMPLE)
+    model.sort_by("timestamp")
+    assert locations(model) == ["C:\\Download\\Synapse.exe", "HKCU\\SOFTWARE\\krnl", "C:\\Giochi\\krnl.exe"]
+    model.sort_by("timestamp")
+    assert model.sort_reverse
+    assert locations(model) == ["C:\\Giochi\\krnl.exe", "HKCU\\SOFTWARE\\krnl", "C:\\Download\\Synapse.exe"]
+    assert [item.location for item in model.rows(1, 5)] == ["HKCU\\SOFTWARE\\krnl", "C:\\Download\\Synapse.exe"]
+    model.sort_by("confidence")
+    assert not model.sort_reverse
+    assert model.rows(0, 1)[0].kind == events.EVIDENCE_REGISTRY_TRACE
+
+
+def test_add_while_sorted_keeps_order():
+    model = model_with(*SAMPLE)
+    model.sort_by("timestamp")
+    model.set_filter(executor="KRNL")
+    model.refresh()
+    model.add(detection("KRNL", events.EVIDENCE_PROCESS, "krnl.exe (1234)", 2.5))
+    model.add(detection("Synapse X", events.EVIDENCE_PROCESS, "Synapse.exe (99)", 0.5))
+    model.add(detection("KRNL", events.EVIDENCE_FILE, "D:\\krnl.exe", 0.1))
+    # Le nuove righe entrano al loro posto senza ricostruire la vista
+    assert not model._dirty
+    assert locations(model) == ["D:\\krnl.exe", "HKCU\\SOFTWARE\\krnl", "krnl.exe (1234)", "C:\\Giochi\\krnl.exe"]
+    model.sort_by("timestamp")
+    assert locations(model)[0] == "C:\\Giochi\\krnl.exe"
+    assert len(model.records) == 6
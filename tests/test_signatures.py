@@ -0,0 +1,91 @@
+import gc
+import json
+import logging
+
+import pytest
+
+from eleventools.signatures import SignatureDatabaseError, SignatureStore, load_executors_database, load_signatures
+from eleventools.signatures import validate_executor
+
+
+def test_bundled_database_is_valid():
+    executors = load_executors_database()
+    assert "Synapse X" in executors
+
+
+@pytest.mark.parametrize("signature", [
+    "d41d8cd98f00b204e9800998ecf8427e",
+    "D41D8CD98F00B204E9800998ECF8427E",
+    {"md5": "d41d8cd98f00b204e9800998ecf8427e", "size": 0},
+    {"md5": "a7f5f35426b927411fc9231b56382173", "size": 0},
+    "da39a3ee5e6b4b0d3255bfef95601890afd80709",
+    "non-un-hash",
+])
+def test_invalid_hashes_are_rejected(signature):
+    with pytest.raises(SignatureDatabaseError):
+        validate_executor("Prova", {"hashes": [signature]})
+
+
+def test_valid_hash_is_kept():
+    data = validate_executor("Prova", {"hashes": [{"md5": "a7f5f35426b927411fc9231b56382173", "size": 10}]})
+    assert data["hashes"] == [{"md5": "a7f5f35426b927411fc9231b56382173", "size": 10}]
+
+
+def test_compiled_cache_load_does_not_freeze_gc(tmp_path):
+    path = tmp_path / "firme.json"
+    path.write_text(json.dumps({"schema": 1, "version": 1, "executors": {"KRNL": {"files": ["krnl.exe"]}}}))
+    cache_path = str(tmp_path / "firme.bin")
+    load_signatures(str(path), cache_path)
+    frozen = gc.get_freeze_count()
+    # Caricamento dalla cache: gc.freeze è globale e nei processi che ricaricano le firme tratterrebbe la spazzatura
+    signatures = load_signatures(str(path), cache_path)
+    assert signatures.executor_count == 1
+    assert gc.get_freeze_count() == frozen
+    assert gc.isenabled()
+
+
+def write_database(path, version, executors):
+    path.write_text(json.dumps({"schema": 1, "version": version, "executors": executors}))
+
+
+def signature_store(tmp_path):
+    updates = tmp_path / "aggiornamenti"
+    updates.mkdir()
+    write_database(tmp_path / "firme.json", 1, {"KRNL": {"files": ["krnl.exe"]}})
+    return SignatureStore(str(tmp_path / "firme.json"), update_dir=str(updates),
+                          cache_path=str(tmp_path / "firme.bin"), logger=logging.getLogger("test")), updates
+
+
+def test_store_reload_swaps_signatures(tmp_path):
+    store, updates = signature_store(tmp_path)
+    old = store.current
+    assert not store.reload()
+    write_database(updates / "v2.json", 2, {"KRNL": {"files": ["krnl.exe"]}, "Evon": {"files": ["Evon.exe"]}})
+    assert store.reload()
+    assert store.current.version == 2 and store.current.matcher.match_file("Evon.exe")
+    # Chi aveva le firme precedenti continua a usarle
+    assert old.version == 1 and not old.matcher.match_file("Evon.exe")
+
+
+def test_store_skips_invalid_update(tmp_path, caplog):
+    store, updates = signature_store(tmp_path)
+    write_database(updates / "v2.json", 2, {"KRNL": {"files": ["krnl.exe"]}, "Evon": {"files": ["Evon.exe"]}})
+    store.reload()
+    current = store.current
+    write_database(updates / "v3.json", 3, {"Evon": {"hashes": ["non-un-hash"]}})
+    with caplog.at_level(logging.ERROR):
+        assert not store.reload()
+    assert store.current is current
+    assert any("v3.json" in record.getMessage() for record in caplog.records)
+    # All'avvio si passa al database valido più recente
+    assert SignatureStore(store.path, update_dir=store.update_dir, cache_path=None).current.version == 2
+
+
+def test_store_cache_follows_version_change(tmp_path):
+    store, _ = signature_store(tmp_path)
+    write_database(tmp_path / "firme.json", 2, {"Evon": {"files": ["Evon.exe"]}})
+    assert store.reload()
+    assert store.current.version == 2
+    # La cache compilata è stata riscritta: non restituisce più la versione precedente
+    assert load_signatures(store.path, store.cache_path).version == 2
+    assert not load_signatures(store.path, store.cache_path).matcher.match_file("krnl.exe")
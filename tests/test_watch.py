@@ -0,0 +1,61 @@
+import threading
+from types import SimpleNamespace
+
+from eleventools.processes import ProcessBackend, ProcessInfo
+from eleventools.signatures import CompiledSignatures
+from eleventools.watch import ProcessWatcher
+
+EXECUTORS = {"KRNL": {"processes": ["krnl.exe"]}}
+
+
+class ScriptedBackend(ProcessBackend):
+    """Tabella dei processi diversa a ogni giro: [{PID: (nome, avvio)}]"""
+
+    name = "scripted"
+
+    def __init__(self, tables, interrupt_after=None):
+        self.tables = list(tables)
+        self.current = {}
+        self.interrupt_after = interrupt_after
+        self.calls = 0
+
+    def list_identities(self):
+        self.calls += 1
+        if self.interrupt_after is not None and self.calls > self.interrupt_after:
+            raise KeyboardInterrupt
+        if self.tables:
+            self.current = self.tables.pop(0)
+        return dict(self.current)
+
+    def list_processes(self, cancel=None):
+        return [ProcessInfo(pid, name, "", 1) for pid, (name, _) in self.current.items()]
+
+
+def make_watcher(backend):
+    store = SimpleNamespace(current=CompiledSignatures.compile(1, EXECUTORS))
+    return ProcessWatcher(store, backend=backend, interval=0)
+
+
+def test_process_renamed_by_exec_is_checked_again():
+    backend = ScriptedBackend([{10: ("bash", 1)}, {10: ("krnl.exe", 1)}, {10: ("krnl.exe", 1)}])
+    watcher = make_watcher(backend)
+    assert watcher.poll() == []
+    assert [process.name for process, _ in watcher.poll()] == ["krnl.exe"]
+    assert watcher.poll() == []
+
+
+def test_reused_pid_is_reported_again():
+    backend = ScriptedBackend([{10: ("krnl.exe", 1)}, {10: ("krnl.exe", 2)}])
+    watcher = make_watcher(backend)
+    assert len(watcher.poll()) == 1
+    assert len(watcher.poll()) == 1
+
+
+def test_ctrl_c_keeps_detections():
+    backend = ScriptedBackend([{10: ("krnl.exe", 1)}], interrupt_after=2)
+    watcher = make_watcher(backend)
+    found = []
+    stop_event = threading.Event()
+    assert watcher.run(found.append, stop_event) == 1
+    assert stop_event.is_set()
+    assert watcher.detections == 1